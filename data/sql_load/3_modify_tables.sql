@@ -1,6 +1,16 @@
 /* ⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️⚠️
 Database Load Issues (follow if receiving permission denied when running SQL code below)
 
+Preferred: run the Python bulk loader instead of this file. It streams the CSVs through
+COPY FROM STDIN (no server-side file paths), truncates before loading so reruns never hit
+the duplicate key error, and defers indexes and foreign keys until after the load.
+Rows COPY would reject (bad types, duplicate or orphan keys) are set aside in data/quarantine/
+instead of failing the whole load.
+            python python_pipeline/load_tables.py --csv-dir data/csv_files
+New postings do not need a drop and full reload: after 5_incremental.sql and one full load,
+ingest each delta (only the new rows) on top of the loaded tables.
+            python python_pipeline/ingest_delta.py data/deltas/<date>
+
 Possible Errors: 
 - ERROR >>  duplicate key value violates unique constraint "company_dim_pkey"
 - ERROR >> could not open file "C:\Users\...\company_dim.csv" for reading: Permission denied
@@ -0,0 +1,34 @@
+-- Job category dimension used by sql_queries/companies.sql
+-- Run after 2_create_tables.sql. python_pipeline/load_tables.py (or python_pipeline/job_categories.py
+-- for an already loaded database) maps every distinct job_title_short to a category once, and the
+-- companies breakdown joins that mapping to company_cube (5_incremental.sql) instead of ILIKE matching.
+-- Databases set up with the earlier version of this file also stored the category on every posting; the
+-- column is not read anymore, drop it (and its index) with:
+--     ALTER TABLE public.job_postings_fact DROP COLUMN IF EXISTS job_category_id;
+
+CREATE TABLE public.job_category_dim
+(
+    job_category_id SMALLINT PRIMARY KEY,
+    category TEXT NOT NULL UNIQUE
+);
+
+-- Categories in the column order of query_results/companies.csv
+INSERT INTO public.job_category_dim (job_category_id, category) VALUES
+    (1, 'analyst'),
+    (2, 'scientist'),
+    (3, 'machine_learning'),
+    (4, 'cloud'),
+    (5, 'software'),
+    (6, 'other_engineer'),
+    (7, 'other');
+
+-- One row per distinct job_title_short, filled in by python_pipeline/job_categories.py
+CREATE TABLE public.job_title_category
+(
+    job_title_short VARCHAR(255) PRIMARY KEY,
+    job_category_id SMALLINT NOT NULL,
+    FOREIGN KEY (job_category_id) REFERENCES public.job_category_dim (job_category_id)
+);
+
+ALTER TABLE public.job_category_dim OWNER to postgres;
+ALTER TABLE public.job_title_category OWNER to postgres;
@@ -0,0 +1,51 @@
+-- Incremental ingestion state and the rollup cube maintained by python_pipeline/ingest_delta.py
+-- Run after 4_job_categories.sql and 7_source_dim.sql (requires PostgreSQL 15+ for NULLS NOT DISTINCT):
+-- posting_cube is keyed on the source_id column 7_source_dim.sql adds to job_postings_fact.
+-- load_tables.py rebuilds the cube and the watermark after every full load; ingest_delta.py
+-- then only adds the postings newer than the watermark and folds them into the cube.
+
+-- Newest (job_posted_date, job_id) already loaded; postings at or before it are skipped
+CREATE TABLE public.ingest_watermark
+(
+    source TEXT PRIMARY KEY,
+    last_posted_date TIMESTAMP NOT NULL,
+    last_job_id INT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Rollup cube of the postings that serves the exploration and jobs result queries.
+-- source_id is the source_dim id python_pipeline/load_tables.py and ingest_delta.py store on each posting.
+-- Every measure is a sum or a count, so a batch of new postings is folded in by adding to it.
+CREATE TABLE public.posting_cube
+(
+    posting_month DATE,
+    job_title_short VARCHAR(255),
+    job_country TEXT,
+    source_id INT,
+    job_work_from_home BOOLEAN,
+    postings BIGINT NOT NULL,
+    no_degree BIGINT NOT NULL,
+    degree BIGINT NOT NULL,
+    health_insurance BIGINT NOT NULL,
+    no_health_insurance BIGINT NOT NULL,
+    salary_year_sum NUMERIC NOT NULL,
+    salary_year_count BIGINT NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (posting_month, job_title_short, job_country, source_id, job_work_from_home)
+);
+
+-- Postings per company and job title for the companies result query. Kept apart from posting_cube:
+-- with company_id in its key the cube would hold about one row per posting.
+CREATE TABLE public.company_cube
+(
+    company_id INT,
+    job_title_short VARCHAR(255),
+    postings BIGINT NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (company_id, job_title_short)
+);
+
+ALTER TABLE public.ingest_watermark OWNER to postgres;
+ALTER TABLE public.posting_cube OWNER to postgres;
+ALTER TABLE public.company_cube OWNER to postgres;
+
+-- The watermark comparison and the per-day refreshes read the fact table by posting date
+CREATE INDEX idx_job_posted_date_id ON public.job_postings_fact (job_posted_date, job_id);
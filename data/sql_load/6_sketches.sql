@@ -0,0 +1,23 @@
+-- Mergeable sketches used by python_pipeline/sketches.py
+-- Run after 5_incremental.sql and 7_source_dim.sql (requires PostgreSQL 15+ for NULLS NOT DISTINCT);
+-- the source sketches read the source_id of each posting.
+-- One row per posting month (the job_postings_fact partition it summarizes), job title and country.
+-- The sketches of any set of rows merge into the sketch of their union, so distinct counts and
+-- salary percentiles at a coarser grouping are answered from this table without reading the postings.
+
+CREATE TABLE public.posting_sketches
+(
+    posting_month DATE NOT NULL,
+    job_title_short VARCHAR(255),
+    job_country TEXT,
+    postings BIGINT NOT NULL,
+    -- HyperLogLog registers of the distinct company_id and source_id values
+    company_hll BYTEA NOT NULL,
+    source_hll BYTEA NOT NULL,
+    -- Log-bucketed salary_year_avg histogram (relative-error quantile sketch)
+    salary_sketch BYTEA NOT NULL,
+    built_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    UNIQUE NULLS NOT DISTINCT (posting_month, job_title_short, job_country)
+);
+
+ALTER TABLE public.posting_sketches OWNER to postgres;
@@ -0,0 +1,29 @@
+-- Source website dimension used by sql_queries/exploration.sql (jobs_per_website)
+-- Run after 2_create_tables.sql. python_pipeline/load_tables.py (or python_pipeline/job_sources.py for an
+-- already loaded database) parses every distinct job_via string once into a canonical site name and stores
+-- the source id on each posting, so source breakdowns are an integer group-by instead of SPLIT_PART per row.
+
+-- One row per canonical site; source_key is the spelling-insensitive form that identifies it
+CREATE TABLE public.source_dim
+(
+    source_id INT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    source_key TEXT NOT NULL UNIQUE,
+    source_name TEXT NOT NULL
+);
+
+-- One row per distinct job_via string ever loaded, filled in by python_pipeline/job_sources.py.
+-- Kept across reloads, so a job_via string is only parsed the first time it is seen.
+CREATE TABLE public.job_via_source
+(
+    job_via TEXT PRIMARY KEY,
+    source_id INT NOT NULL,
+    FOREIGN KEY (source_id) REFERENCES public.source_dim (source_id)
+);
+
+ALTER TABLE public.job_postings_fact
+    ADD COLUMN source_id INT REFERENCES public.source_dim (source_id);
+
+ALTER TABLE public.source_dim OWNER to postgres;
+ALTER TABLE public.job_via_source OWNER to postgres;
+
+CREATE INDEX idx_source_id ON public.job_postings_fact (source_id);
@@ -0,0 +1,15 @@
+-- Search indexes used by python_pipeline/job_search.py
+-- Run after 2_create_tables.sql (requires the pg_trgm extension shipped with PostgreSQL's contrib modules).
+-- Substring filters on job_title and job_location (ILIKE '%data%') are answered from trigram indexes and
+-- word searches from a full-text index, instead of a full scan of job_postings_fact per lookup.
+-- On the partitioned job_postings_fact every index is created on each monthly partition.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX idx_job_title_trgm ON public.job_postings_fact USING gin (job_title gin_trgm_ops);
+CREATE INDEX idx_job_location_trgm ON public.job_postings_fact USING gin (job_location gin_trgm_ops);
+
+-- The expression must stay identical to SEARCH_DOCUMENT in python_pipeline/job_search.py for the index to be used
+CREATE INDEX idx_job_search_document ON public.job_postings_fact USING gin (
+    to_tsvector('english', COALESCE(job_title, '') || ' ' || COALESCE(job_location, ''))
+);
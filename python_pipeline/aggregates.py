@@ -0,0 +1,109 @@
+"""
+Incremental Aggregates
+
+Additive aggregates over job_postings_fact (data/sql_load/5_incremental.sql)
+and the ingest watermark. posting_cube rolls the postings up by month, job
+title, country, source website and remote flag, company_cube by company and
+job title; the exploration, jobs and companies result queries read them instead
+of the fact table. Every measure
+is a sum or a count, so the aggregate of a batch of new postings is simply
+added to the stored one (INSERT ... ON CONFLICT DO UPDATE SET column = column +
+EXCLUDED.column) instead of recomputing it over the whole fact table.
+
+load_tables.py rebuilds them after every full load and ingest_delta.py folds
+each delta into them.
+"""
+
+from python_pipeline.job_metrics import METRICS
+
+WATERMARK_SOURCE = "job_postings_fact"
+
+# Aggregate table -> ({key column: expression}, {measure column: additive aggregate expression})
+# Only sums and counts are stored, so a delta's aggregate can be added to the stored one
+AGGREGATES = {
+    "posting_cube": (
+        {
+            "posting_month": "date_trunc('month', job_posted_date)::date",
+            "job_title_short": "job_title_short",
+            "job_country": "job_country",
+            "source_id": "source_id",
+            "job_work_from_home": "job_work_from_home",
+        },
+        {
+            "postings": METRICS["total_jobs"],
+            **{metric: METRICS[metric] for metric in ["no_degree", "degree", "health_insurance", "no_health_insurance"]},
+            "salary_year_sum": "COALESCE(SUM(salary_year_avg), 0)",
+            "salary_year_count": "COUNT(salary_year_avg)",
+        },
+    ),
+    "company_cube": (
+        {"company_id": "company_id", "job_title_short": "job_title_short"},
+        {"postings": METRICS["total_jobs"]},
+    ),
+}
+
+
+def has_incremental_tables(cur):
+    """True when data/sql_load/5_incremental.sql has been applied"""
+    cur.execute("SELECT to_regclass('public.ingest_watermark') IS NOT NULL")
+    return cur.fetchone()[0]
+
+
+def fold_aggregates(cur, source):
+    """Add every posting of source (a table name) to the stored aggregates"""
+    for table, (keys, measures) in AGGREGATES.items():
+        names = ", ".join([*keys, *measures])
+        key_names = ", ".join(keys)
+        expressions = ", ".join([*keys.values(), *measures.values()])
+        updates = ", ".join(f"{column} = agg.{column} + EXCLUDED.{column}" for column in measures)
+        cur.execute(
+            f"""
+            INSERT INTO {table} AS agg ({names})
+            SELECT {expressions} FROM {source} GROUP BY {", ".join(keys.values())}
+            ON CONFLICT ({key_names}) DO UPDATE SET {updates}
+            """
+        )
+
+
+def read_watermark(cur):
+    """Return the (job_posted_date, job_id) of the newest ingested posting, or None"""
+    cur.execute(
+        "SELECT last_posted_date, last_job_id FROM ingest_watermark WHERE source = %s",
+        (WATERMARK_SOURCE,),
+    )
+    return cur.fetchone()
+
+
+def advance_watermark(cur, source):
+    """Move the watermark to the newest dated posting of source, return it (None if source has none)"""
+    cur.execute(
+        f"""
+        SELECT job_posted_date, job_id FROM {source}
+        WHERE job_posted_date IS NOT NULL
+        ORDER BY job_posted_date DESC, job_id DESC
+        LIMIT 1
+        """
+    )
+    newest = cur.fetchone()
+    if newest is not None:
+        cur.execute(
+            """
+            INSERT INTO ingest_watermark (source, last_posted_date, last_job_id) VALUES (%s, %s, %s)
+            ON CONFLICT (source) DO UPDATE SET
+                last_posted_date = EXCLUDED.last_posted_date,
+                last_job_id = EXCLUDED.last_job_id,
+                updated_at = now()
+            """,
+            (WATERMARK_SOURCE, *newest),
+        )
+    return newest
+
+
+def rebuild_aggregates(conn):
+    """Recompute the aggregates and the watermark from the full tables, return the watermark"""
+    with conn.cursor() as cur:
+        if not has_incremental_tables(cur):
+            return None
+        cur.execute(f"TRUNCATE {', '.join(AGGREGATES)}, ingest_watermark")
+        fold_aggregates(cur, "job_postings_fact")
+        return advance_watermark(cur, "job_postings_fact")
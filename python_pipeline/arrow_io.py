@@ -0,0 +1,151 @@
+"""
+Columnar Output
+
+Typed Arrow and Parquet output for the pipeline:
+1. Query results: run_queries.py --arrow converts every streamed CSV into an
+   uncompressed Arrow IPC file next to it (query_results/<name>.arrow), typed
+   with the column types PostgreSQL reports for the query. The plotting scripts
+   memory-map these files and read their columns without parsing any text.
+2. Full-table extracts: this script streams a table through COPY and writes a
+   zstd-compressed Parquet file batch by batch, so extracts of job_postings_fact
+   take constant memory however large the table grows.
+
+Output: data/extracts/<table>.parquet
+Usage: python python_pipeline/arrow_io.py [table ...] [--output-dir DIR] [--dsn DSN]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from psycopg2 import sql
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import connect
+
+EXTRACT_DIR = PROJECT_ROOT / "data" / "extracts"
+DEFAULT_TABLES = ["job_postings_fact"]
+
+# 64 MB of CSV per record batch
+DEFAULT_BLOCK_SIZE = 64 * 1024 * 1024
+
+# PostgreSQL type OID -> Arrow type; anything else is read as a string
+PG_ARROW_TYPES = {
+    16: pa.bool_(),  # boolean
+    20: pa.int64(),  # bigint, COUNT(*)
+    21: pa.int16(),  # smallint
+    23: pa.int32(),  # integer
+    700: pa.float32(),  # real
+    701: pa.float64(),  # double precision
+    1700: pa.float64(),  # numeric (salaries, averages, EXTRACT)
+    1082: pa.date32(),  # date
+    1114: pa.timestamp("us"),  # timestamp
+    1184: pa.timestamp("us", tz="UTC"),  # timestamptz
+}
+
+EXTRACT_SQL = sql.SQL("COPY (SELECT * FROM {}) TO STDOUT WITH (FORMAT csv, HEADER true)")
+
+
+def query_schema(cur, query_sql):
+    """Arrow schema of a query's result, from the column types PostgreSQL reports"""
+    cur.execute(f"SELECT * FROM ({query_sql}) AS result LIMIT 0")
+    return pa.schema([(column.name, PG_ARROW_TYPES.get(column.type_code, pa.string())) for column in cur.description])
+
+
+def open_typed_csv(csv_path, schema, block_size=DEFAULT_BLOCK_SIZE):
+    """Streaming reader over a COPY csv file that parses every column with its schema type"""
+    return pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=schema,
+            include_columns=schema.names,
+            # COPY writes NULL as an unquoted empty field; a quoted "" stays an empty string
+            null_values=[""],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            true_values=["t", "true"],
+            false_values=["f", "false"],
+        ),
+    )
+
+
+def csv_to_arrow(csv_path, schema, arrow_path=None):
+    """Convert a query result CSV into an uncompressed Arrow IPC file and return its path"""
+    csv_path = Path(csv_path)
+    arrow_path = Path(arrow_path) if arrow_path else csv_path.with_suffix(".arrow")
+    tmp_path = arrow_path.with_suffix(arrow_path.suffix + ".tmp")
+
+    # Uncompressed, so readers can memory-map the file and use its buffers in place
+    reader = open_typed_csv(csv_path, schema)
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    os.replace(tmp_path, arrow_path)
+    return arrow_path
+
+
+def table_to_arrow(table, arrow_path):
+    """Write an in-memory Arrow table (derived results) as an uncompressed Arrow IPC file"""
+    arrow_path = Path(arrow_path)
+    tmp_path = arrow_path.with_suffix(arrow_path.suffix + ".tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+    return arrow_path
+
+
+def extract_table(table, output_dir=EXTRACT_DIR, dsn=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Stream a whole table into output_dir/<table>.parquet and return (rows, bytes, seconds)"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"{table}.parquet"
+    start = time.perf_counter()
+
+    conn = connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            schema = query_schema(cur, sql.SQL("SELECT * FROM {}").format(sql.Identifier(table)).as_string(cur))
+            # COPY is the fastest way out of the server; the CSV only lives next to the extract
+            with tempfile.NamedTemporaryFile(dir=output_dir, suffix=".csv") as spool:
+                cur.copy_expert(EXTRACT_SQL.format(sql.Identifier(table)), spool)
+                spool.flush()
+
+                rows = 0
+                tmp_path = output_path.with_suffix(".parquet.tmp")
+                reader = open_typed_csv(spool.name, schema, block_size)
+                with pq.ParquetWriter(tmp_path, reader.schema, compression="zstd") as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+                os.replace(tmp_path, output_path)
+    finally:
+        conn.close()
+
+    return rows, output_path.stat().st_size, time.perf_counter() - start
+
+
+def main():
+    """Main function to extract tables to Parquet"""
+    parser = argparse.ArgumentParser(description="Extract whole tables to typed Parquet files")
+    parser.add_argument("tables", nargs="*", default=DEFAULT_TABLES, help="tables to extract (default: job_postings_fact)")
+    parser.add_argument("--output-dir", default=EXTRACT_DIR, help="directory for the Parquet files")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    args = parser.parse_args()
+
+    for table in args.tables:
+        rows, size, seconds = extract_table(table, args.output_dir, args.dsn)
+        print(f"{table:<20} {rows:>12,} rows {size:>14,} bytes {seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
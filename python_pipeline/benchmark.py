@@ -0,0 +1,359 @@
+"""
+Benchmark Suite
+
+This script measures the analysis queries and the figure functions at several data scales:
+1. Creates a throwaway benchmark database on the server of $DATABASE_URL and applies
+   data/sql_load/2_create_tables.sql, 4_job_categories.sql, 7_source_dim.sql and
+   5_incremental.sql to it
+2. For every scale, loads a deterministic job_id sample of the CSV files (e.g. 10%,
+   50% and 100% of the postings, with their skills) through load_tables.py. Scales
+   above 1 load a synthetic dataset from generate_data.py with that many times the
+   postings of the CSV files instead
+3. Runs every named query in sql_queries/*.sql several times and records latency
+   percentiles, rows returned, rows scanned (from EXPLAIN ANALYZE) and the peak RSS
+   of the server backend that ran it
+4. Renders every figure from that scale's query results in a fresh process and
+   records latency percentiles and the peak RSS of that process
+5. Appends the run to benchmarks/history.jsonl and flags every item whose median
+   latency regressed against the previous run
+
+Input: data/csv_files/*.csv
+Output: benchmarks/history.jsonl
+Usage: python python_pipeline/benchmark.py [--scales 0.1 0.5 1 4] [--repeat 5] [--skip-figures] [--keep-database]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import CSV_DIR, SQL_QUERIES_DIR, connect, create_scratch_database, drop_database
+from python_pipeline.generate_data import generate
+from python_pipeline.load_tables import TABLES, load_tables
+from python_pipeline.run_queries import COPY_TO_SQL, CountingWriter, parse_named_queries, run_queries
+
+HISTORY_PATH = PROJECT_ROOT / "benchmarks" / "history.jsonl"
+BENCH_DATABASE = "sql_course_bench"
+DEFAULT_SCALES = [0.1, 0.5, 1.0]
+
+# Tables sampled by job_id; the dimension tables are always loaded in full
+SAMPLED_TABLES = ["job_postings_fact", "skills_job_dim"]
+
+# Plan nodes that read table rows
+SCAN_NODES = {"Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan", "Tid Scan"}
+
+# A median this much slower than the previous run is reported as a regression
+DEFAULT_THRESHOLD = 0.25
+
+
+class NullWriter:
+    """Binary sink for COPY output that is only counted"""
+
+    def write(self, data):
+        return len(data)
+
+
+def create_bench_database(dsn=None, name=BENCH_DATABASE):
+    """(Re)create the benchmark database next to dsn, apply the schema and return its connection string"""
+    return create_scratch_database(name, dsn)
+
+
+def drop_bench_database(dsn=None, name=BENCH_DATABASE):
+    """Drop the benchmark database"""
+    drop_database(name, dsn)
+
+
+def sample_csv(source, target, fraction):
+    """Copy the rows of source whose job_id falls in the sample to target, return the row count"""
+    # job_id modulo 1000 keeps the same postings and their skills at every run
+    kept_buckets = round(fraction * 1000)
+    rows = 0
+    with open(source, newline="", encoding="utf-8") as src, open(target, "w", newline="", encoding="utf-8") as dst:
+        reader = csv.reader(src)
+        writer = csv.writer(dst)
+        header = next(reader)
+        job_id = header.index("job_id")
+        writer.writerow(header)
+        for row in reader:
+            if int(row[job_id]) % 1000 < kept_buckets:
+                writer.writerow(row)
+                rows += 1
+    return rows
+
+
+def sample_csv_dir(csv_dir, fraction, target_dir):
+    """Write a fraction of the postings (and their skills) to target_dir, return {table: rows}"""
+    csv_dir, target_dir = Path(csv_dir), Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    rows = {}
+    for table in TABLES:
+        source, target = csv_dir / f"{table}.csv", target_dir / f"{table}.csv"
+        if table in SAMPLED_TABLES and fraction < 1:
+            rows[table] = sample_csv(source, target, fraction)
+        else:
+            target.unlink(missing_ok=True)
+            target.symlink_to(source.resolve())
+    return rows
+
+
+def count_csv_rows(path):
+    """Number of records in a CSV file, not counting its header"""
+    with open(path, newline="", encoding="utf-8") as csv_file:
+        return sum(1 for _ in csv.reader(csv_file)) - 1
+
+
+def scale_csv_dir(csv_dir, scale, target_dir):
+    """Write the CSV files of one scale to target_dir, return {table: rows} of the sampled or generated tables"""
+    if scale <= 1:
+        return sample_csv_dir(csv_dir, scale, target_dir)
+    # No real data beyond the full CSV files: generate postings fitted to the committed query results
+    postings = count_csv_rows(Path(csv_dir) / "job_postings_fact.csv")
+    return generate(round(scale * postings), output_dir=target_dir)
+
+
+def rows_scanned(plan):
+    """Rows read by the scan nodes of an EXPLAIN ANALYZE plan, including the ones filtered out"""
+    rows = 0
+    if plan["Node Type"] in SCAN_NODES:
+        read = plan["Actual Rows"] + plan.get("Rows Removed by Filter", 0) + plan.get("Rows Removed by Index Recheck", 0)
+        rows += read * plan["Actual Loops"]
+    for child in plan.get("Plans", []):
+        rows += rows_scanned(child)
+    return int(rows)
+
+
+def backend_peak_rss_kb(pid):
+    """High-water resident set size of a local server process in KB, None when it is not readable"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def summarize(seconds):
+    """Latency percentiles of a list of run times"""
+    p50, p95 = np.percentile(seconds, [50, 95])
+    return {
+        "runs": len(seconds),
+        "p50": round(float(p50), 4),
+        "p95": round(float(p95), 4),
+        "min": round(min(seconds), 4),
+        "max": round(max(seconds), 4),
+    }
+
+
+def bench_query(dsn, query, repeat=5, warmup=1):
+    """Time one named query and return its benchmark record"""
+    # A fresh connection per query, so the backend's peak RSS belongs to this query only
+    conn = connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_backend_pid()")
+            pid = cur.fetchone()[0]
+
+            seconds = []
+            for run in range(warmup + repeat):
+                writer = CountingWriter(NullWriter())
+                start = time.perf_counter()
+                cur.copy_expert(COPY_TO_SQL.format(sql=query.sql), writer)
+                if run >= warmup:
+                    seconds.append(time.perf_counter() - start)
+            rows = cur.rowcount
+
+            cur.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {query.sql}")
+            plan = cur.fetchone()[0][0]["Plan"]
+        peak_rss = backend_peak_rss_kb(pid)
+    finally:
+        conn.close()
+
+    return dict(
+        summarize(seconds),
+        rows=rows,
+        bytes=writer.bytes_written,
+        rows_scanned=rows_scanned(plan),
+        peak_rss_kb=peak_rss,
+    )
+
+
+def bench_figure(module_name, function_name, repeat):
+    """Render one figure repeat times in the current (fresh) process, return run times and peak RSS"""
+    from python_visualization.render_figures import render_figure
+
+    seconds = [render_figure(module_name, function_name)[1] for _ in range(repeat)]
+    return seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench_figures(results_dir, output_dir, repeat=1):
+    """Render every figure from results_dir into output_dir and return {figure: record}"""
+    from python_visualization.render_figures import discover_figures
+
+    # Spawned workers read the figure directories from the environment when they import the scripts
+    os.environ["FIGURE_RESULTS_DIR"] = str(results_dir)
+    os.environ["FIGURE_OUTPUT_DIR"] = str(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    records = {}
+    context = multiprocessing.get_context("spawn")
+    for figure in discover_figures():
+        # One process per figure, so ru_maxrss is the peak of that figure alone
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                seconds, peak_rss = pool.submit(bench_figure, *figure.split("."), repeat).result()
+            except Exception as e:
+                # A figure that cannot be drawn at this scale is recorded, not fatal
+                records[figure] = {"error": f"{type(e).__name__}: {e}"}
+                continue
+        records[figure] = dict(summarize(seconds), peak_rss_kb=peak_rss)
+    return records
+
+
+def git_revision():
+    """Current commit and whether the working tree has uncommitted changes"""
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain"))}
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, csv_dir=CSV_DIR, dsn=None, repeat=5, figure_repeat=1,
+                   skip_figures=False, keep_database=False):
+    """Benchmark every query and figure at every scale and return the history record"""
+    queries = parse_named_queries(SQL_QUERIES_DIR)
+    bench_dsn = create_bench_database(dsn)
+    run = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **git_revision(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "scales": {},
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as scratch:
+            for scale in scales:
+                scale_dir = Path(scratch) / f"scale_{scale:g}"
+                sampled = scale_csv_dir(csv_dir, scale, scale_dir / "csv")
+
+                load_start = time.perf_counter()
+                loaded = load_tables(scale_dir / "csv", bench_dsn)
+                record = {
+                    "rows": {table: loaded[table][0] for table in TABLES},
+                    "sampled_rows": sampled,
+                    "load_seconds": round(time.perf_counter() - load_start, 3),
+                    "queries": {name: bench_query(bench_dsn, query, repeat) for name, query in queries.items()},
+                }
+                print(f"scale {scale:g}: {record['rows']['job_postings_fact']:,} postings, "
+                      f"{len(record['queries'])} queries benchmarked")
+
+                if not skip_figures:
+                    results_dir = scale_dir / "query_results"
+                    run_queries(dsn=bench_dsn, output_dir=results_dir)
+                    record["figures"] = bench_figures(results_dir, scale_dir / "figures", figure_repeat)
+                    print(f"scale {scale:g}: {len(record['figures'])} figures benchmarked")
+
+                run["scales"][f"{scale:g}"] = record
+    finally:
+        if not keep_database:
+            drop_bench_database(dsn)
+    return run
+
+
+def load_history(path=HISTORY_PATH):
+    """Return every recorded run, oldest first"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def append_history(run, path=HISTORY_PATH):
+    """Append one run to the JSON lines history"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as history:
+        history.write(json.dumps(run, sort_keys=True) + "\n")
+
+
+def find_regressions(run, previous, threshold=DEFAULT_THRESHOLD):
+    """Return (scale, item, previous p50, current p50) for every item that got slower than threshold"""
+    regressions = []
+    for scale, record in run["scales"].items():
+        before = previous["scales"].get(scale, {})
+        for kind, label in (("queries", "query"), ("figures", "figure")):
+            for name, current in record.get(kind, {}).items():
+                old = before.get(kind, {}).get(name)
+                if old and "p50" in old and "p50" in current and current["p50"] > old["p50"] * (1 + threshold):
+                    regressions.append((scale, f"{label} {name}", old["p50"], current["p50"]))
+    return regressions
+
+
+def print_report(run):
+    """Print one line per benchmarked item"""
+    for scale, record in run["scales"].items():
+        print(f"\nScale {scale} ({record['rows']['job_postings_fact']:,} postings, loaded in {record['load_seconds']:.2f}s)")
+        for name, item in record["queries"].items():
+            rss = f"{item['peak_rss_kb'] / 1024:8.1f} MB" if item["peak_rss_kb"] else f"{'n/a':>11}"
+            print(f"  query  {name:<45} p50 {item['p50']:8.3f}s p95 {item['p95']:8.3f}s "
+                  f"{item['rows_scanned']:>12,} rows scanned {rss}")
+        for name, item in record.get("figures", {}).items():
+            if "error" in item:
+                print(f"  figure {name:<45} failed: {item['error']}")
+                continue
+            print(f"  figure {name:<45} p50 {item['p50']:8.3f}s p95 {item['p95']:8.3f}s "
+                  f"{'':>25} {item['peak_rss_kb'] / 1024:8.1f} MB")
+
+
+def main():
+    """Main function to run the benchmark suite"""
+    parser = argparse.ArgumentParser(description="Benchmark the queries and figures at several data scales")
+    parser.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES,
+                        help="fractions of the postings to load, above 1 a synthetic multiple (default: 0.1 0.5 1)")
+    parser.add_argument("--csv-dir", default=CSV_DIR, help="directory with the four CSV files")
+    parser.add_argument("--dsn", default=None, help="server to create the benchmark database on (default: $DATABASE_URL)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--figure-repeat", type=int, default=1, help="timed renders per figure")
+    parser.add_argument("--skip-figures", action="store_true", help="only benchmark the queries")
+    parser.add_argument("--keep-database", action="store_true", help=f"keep {BENCH_DATABASE} after the run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative median slowdown reported as a regression")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON lines file the run is appended to")
+    args = parser.parse_args()
+
+    if any(scale <= 0 for scale in args.scales):
+        parser.error("scales must be positive")
+
+    history = load_history(args.history)
+    run = run_benchmarks(args.scales, args.csv_dir, args.dsn, args.repeat, args.figure_repeat,
+                         args.skip_figures, args.keep_database)
+    append_history(run, args.history)
+    print_report(run)
+
+    if history:
+        regressions = find_regressions(run, history[-1], args.threshold)
+        print(f"\n{len(regressions)} regressions against {history[-1].get('commit')} ({history[-1]['started_at']})")
+        for scale, item, before, after in regressions:
+            print(f"  scale {scale} {item:<52} {before:8.3f}s -> {after:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
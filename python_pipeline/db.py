@@ -0,0 +1,72 @@
+"""
+Database Helpers
+
+Shared connection and path helpers for the scripts in python_pipeline/.
+
+The connection string is read from the DATABASE_URL environment variable and
+falls back to the local sql_course database created by
+data/sql_load/1_create_database.sql. Any libpq connection string works, so the
+scripts can be pointed at a throwaway local Postgres for testing;
+create_scratch_database() sets up such a database on the same server.
+"""
+
+import os
+from pathlib import Path
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import make_dsn
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CSV_DIR = PROJECT_ROOT / "data" / "csv_files"
+SQL_LOAD_DIR = PROJECT_ROOT / "data" / "sql_load"
+SQL_QUERIES_DIR = PROJECT_ROOT / "sql_queries"
+RESULTS_DIR = PROJECT_ROOT / "query_results"
+
+DEFAULT_DSN = "dbname=sql_course"
+
+# Schema files applied to a scratch database, in order
+SCHEMA_FILES = ["2_create_tables.sql", "4_job_categories.sql", "7_source_dim.sql", "5_incremental.sql"]
+
+
+def get_dsn(dsn=None):
+    """Return the connection string to use, honouring DATABASE_URL"""
+    return dsn or os.environ.get("DATABASE_URL", DEFAULT_DSN)
+
+
+def connect(dsn=None):
+    """Open a new psycopg2 connection to the analysis database"""
+    return psycopg2.connect(get_dsn(dsn))
+
+
+def drop_database(name, dsn=None):
+    """Drop a database on the server of dsn"""
+    admin = connect(make_dsn(get_dsn(dsn), dbname="postgres"))
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+    finally:
+        admin.close()
+
+
+def create_scratch_database(name, dsn=None, schema_files=SCHEMA_FILES):
+    """(Re)create a database next to dsn, apply the schema and return its connection string"""
+    drop_database(name, dsn)
+    admin = connect(make_dsn(get_dsn(dsn), dbname="postgres"))
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    finally:
+        admin.close()
+
+    scratch_dsn = make_dsn(get_dsn(dsn), dbname=name)
+    conn = connect(scratch_dsn)
+    try:
+        with conn, conn.cursor() as cur:
+            for filename in schema_files:
+                cur.execute((SQL_LOAD_DIR / filename).read_text())
+    finally:
+        conn.close()
+    return scratch_dsn
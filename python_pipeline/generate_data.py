@@ -0,0 +1,315 @@
+"""
+Synthetic Data Generator
+
+This script writes schema-conformant CSV files for company_dim, skills_dim,
+job_postings_fact and skills_job_dim at any scale, with distributions fitted to
+the committed query_results/ files:
+1. Job titles and their degree, health insurance, remote and salary rates from job_analysis.csv
+2. Posting years, countries (including the missing ones) and sources from
+   jobs_per_year.csv, jobs_per_country.csv and jobs_per_website.csv, plus a
+   synthetic long tail of small sources
+3. Companies from companies.csv with their job category mix, plus a long tail of
+   small synthetic companies taking the remaining postings
+4. Skills per posting from the job title x skill counts in skill.csv (their
+   Zipfian frequencies and the mean number of skills per title), with skill
+   types fitted to skill_type.csv
+
+Rows are generated and appended chunk by chunk, so memory use does not depend on
+--rows. Every chunk draws from its own generator seeded with (seed, chunk index),
+so the same seed and chunk size always produce the same files.
+
+Input: query_results/*.csv
+Output: company_dim.csv, skills_dim.csv, job_postings_fact.csv and skills_job_dim.csv in data/synthetic/
+Usage: python python_pipeline/generate_data.py [--rows 10000000] [--seed 42] [--output-dir DIR]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import RESULTS_DIR
+from python_pipeline.job_categories import classify_title
+
+OUTPUT_DIR = PROJECT_ROOT / "data" / "synthetic"
+DEFAULT_ROWS = 1_000_000
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_SEED = 42
+
+# Column order of data/sql_load/2_create_tables.sql
+POSTING_COLUMNS = [
+    "job_id", "company_id", "job_title_short", "job_title", "job_location", "job_via", "job_schedule_type",
+    "job_work_from_home", "search_location", "job_posted_date", "job_no_degree_mention", "job_health_insurance",
+    "job_country", "salary_rate", "salary_year_avg", "salary_hour_avg",
+]
+
+# Not covered by query_results/, taken from the shape of the original dataset
+SCHEDULE_TYPES = [
+    ("Full-time", 0.88),
+    ("Contractor", 0.05),
+    ("Part-time", 0.03),
+    ("Full-time and Part-time", 0.02),
+    ("Internship", 0.02),
+]
+YEARLY_SALARY_SHARE = 0.028
+HOURLY_SALARY_SHARE = 0.013
+SALARY_SIGMA = 0.3
+HOURS_PER_YEAR = 2080
+COMPANIES_PER_POSTING = 0.18
+TAIL_SOURCES = 1000
+
+# Tail ranks are drawn as floor(size * u ** TAIL_SKEW): small ranks get more postings,
+# but no tail value outgrows the smallest listed one at the original scale
+TAIL_SKEW = 1.25
+
+
+def skill_name(column):
+    """Turn a "<name>_count" column of skill.csv back into a skill name"""
+    name = column[:-len("_count")].replace("_sharp", "#")
+    return "c++" if name == "cpp" else name.replace("_", " ")
+
+
+def fit_skill_types(skill_counts, type_counts):
+    """Assign every skill a type so that the per-title type totals approach skill_type.csv"""
+    # Greedy: the most frequent skills first, each into the type whose remaining deficit it matches best
+    remaining = type_counts.astype(np.float64).copy()
+    assigned = np.empty(skill_counts.shape[1], dtype=np.int64)
+    other = type_counts.shape[1] - 1
+    for skill in np.argsort(-skill_counts.sum(axis=0), kind="stable"):
+        vector = skill_counts[:, skill]
+        if not vector.any():
+            assigned[skill] = other
+            continue
+        assigned[skill] = np.argmax(vector @ remaining)
+        remaining[:, assigned[skill]] -= vector
+    return assigned
+
+
+def cumulative(weights):
+    """Cumulative probabilities of non-negative weights, ending at exactly 1"""
+    weights = np.clip(np.asarray(weights, dtype=np.float64), 0, None)
+    cum = np.cumsum(weights / weights.sum())
+    cum[-1] = 1.0
+    return cum
+
+
+def fit_model(results_dir=RESULTS_DIR):
+    """Fit the generator's distributions to the query results"""
+    results_dir = Path(results_dir)
+    jobs = pd.read_csv(results_dir / "job_analysis.csv")
+    years = pd.read_csv(results_dir / "jobs_per_year.csv")
+    countries = pd.read_csv(results_dir / "jobs_per_country.csv")
+    websites = pd.read_csv(results_dir / "jobs_per_website.csv")
+    companies = pd.read_csv(results_dir / "companies.csv")
+    skills = pd.read_csv(results_dir / "skill.csv").set_index("job_title").reindex(jobs["job_title"]).fillna(0)
+    skill_types = pd.read_csv(results_dir / "skill_type.csv").set_index("job_title").reindex(jobs["job_title"]).fillna(0)
+    total = jobs["total_jobs"].sum()
+
+    # Job category of every title, in the column order of companies.csv
+    categories = [column[:-len("_jobs")] for column in companies.columns if column.endswith("_jobs")][1:]
+    title_category = np.array([categories.index(classify_title(title)) for title in jobs["job_title"]])
+    category_totals = np.bincount(title_category, weights=jobs["total_jobs"], minlength=len(categories))
+
+    # Listed companies keep their category mix, the tail gets whatever is left of each category
+    listed_mix = companies[[f"{category}_jobs" for category in categories]].fillna(0).to_numpy(dtype=np.float64)
+    tail_mix = np.clip(category_totals - listed_mix.sum(axis=0), 0, None)
+    listed_mix[listed_mix.sum(axis=1) == 0] = tail_mix
+    company_mix = np.vstack([listed_mix, tail_mix])
+    company_weights = np.append(companies["total_jobs"].to_numpy(dtype=np.float64), total - companies["total_jobs"].sum())
+    source_weights = np.append(websites["job_count"].to_numpy(dtype=np.float64), total - websites["job_count"].sum())
+
+    skill_matrix = skills.to_numpy(dtype=np.float64)
+    type_columns = list(skill_types.columns)
+    skill_type = fit_skill_types(skill_matrix, skill_types.to_numpy(dtype=np.float64))
+
+    return {
+        "titles": jobs["job_title"].to_numpy(dtype=object),
+        "title_category": title_category,
+        "category_titles": [np.flatnonzero(title_category == c) for c in range(len(categories))],
+        "title_cum": [cumulative(jobs["total_jobs"].to_numpy()[title_category == c]) for c in range(len(categories))],
+        "no_degree_rate": (jobs["no_degree"] / jobs["total_jobs"]).to_numpy(),
+        "health_rate": (jobs["health_insurance"] / jobs["total_jobs"]).to_numpy(),
+        "remote_rate": (jobs["remote"] / jobs["total_jobs"]).to_numpy(),
+        "average_salary": jobs["average_salary"].to_numpy(dtype=np.float64),
+        "years": years["year"].to_numpy(dtype=np.int64),
+        "year_cum": cumulative(years["job_count"]),
+        "countries": countries["job_country"].to_numpy(dtype=object),
+        "country_cum": cumulative(countries["job_count"]),
+        "sources": websites["source_website"].to_numpy(dtype=object),
+        "source_cum": cumulative(source_weights),
+        "company_names": companies["name"].to_numpy(dtype=object),
+        "company_cum": cumulative(company_weights),
+        "company_mix_cum": np.vstack([cumulative(row) for row in company_mix]),
+        "schedule_types": np.array([name for name, _ in SCHEDULE_TYPES], dtype=object),
+        "schedule_cum": cumulative([share for _, share in SCHEDULE_TYPES]),
+        "skill_names": np.array([skill_name(column) for column in skills.columns], dtype=object),
+        "skill_types": np.array([type_columns[t][:-len("_count")] for t in skill_type], dtype=object),
+        "skill_cum": [cumulative(row) if row.sum() else None for row in skill_matrix],
+        "skills_per_posting": skill_matrix.sum(axis=1) / jobs["total_jobs"].to_numpy(),
+    }
+
+
+def draw(rng, cum, n):
+    """Indices of n draws from the distribution given by its cumulative probabilities"""
+    return np.minimum(np.searchsorted(cum, rng.random(n), side="right"), len(cum) - 1)
+
+
+def draw_with_tail(rng, cum, n, tail_size):
+    """Draw listed values 0..k-1, or k + a skewed rank in the synthetic tail for the last bucket"""
+    codes = draw(rng, cum, n)
+    in_tail = codes == len(cum) - 1
+    codes[in_tail] += (tail_size * rng.random(in_tail.sum()) ** TAIL_SKEW).astype(np.int64)
+    return codes
+
+
+def posting_chunk(model, first_job_id, n, tail_companies, rng):
+    """Generate n postings starting at first_job_id and their skills"""
+    job_ids = np.arange(first_job_id, first_job_id + n, dtype=np.int64)
+
+    # Company first, then a job category from its mix and a title within that category
+    company = draw_with_tail(rng, model["company_cum"], n, tail_companies)
+    mix_row = np.minimum(company, len(model["company_names"]))
+    u = rng.random(n)
+    category = np.minimum((u[:, None] > model["company_mix_cum"][mix_row]).sum(axis=1),
+                          model["company_mix_cum"].shape[1] - 1)
+    title = np.empty(n, dtype=np.int64)
+    for c, titles in enumerate(model["category_titles"]):
+        rows = np.flatnonzero(category == c)
+        title[rows] = titles[draw(rng, model["title_cum"][c], len(rows))]
+
+    remote = rng.random(n) < model["remote_rate"][title]
+    country = model["countries"][draw(rng, model["country_cum"], n)]
+    source = draw_with_tail(rng, model["source_cum"], n, TAIL_SOURCES)
+    listed_sources = len(model["sources"])
+    job_via = np.where(
+        source < listed_sources,
+        "via " + pd.Series(model["sources"][np.minimum(source, listed_sources - 1)]).astype(str),
+        "via JobBoard" + pd.Series(source - listed_sources).astype(str),
+    )
+
+    year = model["years"][draw(rng, model["year_cum"], n)]
+    posted = (year - 1970).astype("datetime64[Y]").astype("datetime64[s]") + rng.integers(0, 365 * 86400, n)
+
+    # Log-normal salaries whose mean is the title's average salary
+    salary_kind = rng.random(n)
+    yearly = salary_kind < YEARLY_SALARY_SHARE
+    hourly = (salary_kind >= YEARLY_SALARY_SHARE) & (salary_kind < YEARLY_SALARY_SHARE + HOURLY_SALARY_SHARE)
+    salary = model["average_salary"][title] * np.exp(SALARY_SIGMA * rng.standard_normal(n) - SALARY_SIGMA ** 2 / 2)
+
+    titles = model["titles"][title]
+    postings = pd.DataFrame({
+        "job_id": job_ids,
+        "company_id": company + 1,
+        "job_title_short": titles,
+        "job_title": titles,
+        "job_location": np.where(remote, "Anywhere", country),
+        "job_via": job_via,
+        "job_schedule_type": model["schedule_types"][draw(rng, model["schedule_cum"], n)],
+        "job_work_from_home": remote,
+        "search_location": country,
+        "job_posted_date": posted,
+        "job_no_degree_mention": rng.random(n) < model["no_degree_rate"][title],
+        "job_health_insurance": rng.random(n) < model["health_rate"][title],
+        "job_country": country,
+        "salary_rate": np.where(yearly, "year", np.where(hourly, "hour", None)),
+        "salary_year_avg": np.where(yearly, salary.round(0), np.nan),
+        "salary_hour_avg": np.where(hourly, (salary / HOURS_PER_YEAR).round(2), np.nan),
+    }, columns=POSTING_COLUMNS)
+
+    # Poisson number of skills per posting, drawn from the title's skill frequencies
+    skill_counts = rng.poisson(model["skills_per_posting"][title])
+    pair_jobs, pair_skills = [], []
+    for t, cum in enumerate(model["skill_cum"]):
+        rows = np.flatnonzero(title == t)
+        if cum is None or not len(rows):
+            continue
+        pair_jobs.append(np.repeat(job_ids[rows], skill_counts[rows]))
+        pair_skills.append(draw(rng, cum, skill_counts[rows].sum()))
+    # Duplicate draws of a skill for the same posting collapse into one row
+    pairs = np.unique(np.concatenate(pair_jobs) * len(model["skill_names"]) + np.concatenate(pair_skills))
+    skills = pd.DataFrame({"job_id": pairs // len(model["skill_names"]), "skill_id": pairs % len(model["skill_names"])})
+
+    return postings, skills
+
+
+def write_companies(path, model, tail_companies, chunk_rows):
+    """Stream company_dim: the listed companies, then the synthetic tail"""
+    names = model["company_names"]
+    total = len(names) + tail_companies
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        for start in range(0, total, chunk_rows):
+            ids = np.arange(start, min(start + chunk_rows, total))
+            listed = ids < len(names)
+            chunk = pd.DataFrame({
+                "company_id": ids + 1,
+                "name": np.where(listed, names[np.minimum(ids, len(names) - 1)],
+                                 "Company " + pd.Series(ids + 1).astype(str)),
+                "link": None,
+                "link_google": None,
+                "thumbnail": None,
+            })
+            chunk.to_csv(handle, header=start == 0, index=False)
+    return total
+
+
+def generate(rows=DEFAULT_ROWS, seed=DEFAULT_SEED, output_dir=OUTPUT_DIR, results_dir=RESULTS_DIR,
+             chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write the four CSV files to output_dir and return {table: rows}"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = fit_model(results_dir)
+    tail_companies = max(1, int(rows * COMPANIES_PER_POSTING) - len(model["company_names"]))
+
+    counts = {"company_dim": write_companies(output_dir / "company_dim.csv", model, tail_companies, chunk_rows)}
+
+    skills_dim = pd.DataFrame({
+        "skill_id": np.arange(len(model["skill_names"])),
+        "skills": model["skill_names"],
+        "type": model["skill_types"],
+    })
+    skills_dim.to_csv(output_dir / "skills_dim.csv", index=False)
+    counts["skills_dim"] = len(skills_dim)
+
+    counts["job_postings_fact"] = counts["skills_job_dim"] = 0
+    with open(output_dir / "job_postings_fact.csv", "w", newline="", encoding="utf-8") as postings_file, \
+            open(output_dir / "skills_job_dim.csv", "w", newline="", encoding="utf-8") as skills_file:
+        # Headers first, so --rows 0 still writes loadable files
+        pd.DataFrame(columns=POSTING_COLUMNS).to_csv(postings_file, index=False)
+        pd.DataFrame(columns=["job_id", "skill_id"]).to_csv(skills_file, index=False)
+        for chunk, start in enumerate(range(0, rows, chunk_rows)):
+            rng = np.random.default_rng([seed, chunk])
+            postings, skills = posting_chunk(model, start + 1, min(chunk_rows, rows - start), tail_companies, rng)
+            postings.to_csv(postings_file, header=False, index=False)
+            skills.to_csv(skills_file, header=False, index=False)
+            counts["job_postings_fact"] += len(postings)
+            counts["skills_job_dim"] += len(skills)
+    return counts
+
+
+def main():
+    """Main function to generate a synthetic dataset"""
+    parser = argparse.ArgumentParser(description="Generate synthetic CSV files fitted to query_results/")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="number of job postings")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="random seed")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="directory for the four CSV files")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="query results to fit the distributions to")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="postings generated per chunk")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = generate(args.rows, args.seed, args.output_dir, args.results_dir, args.chunk_rows)
+    seconds = time.perf_counter() - start
+    for table, rows in counts.items():
+        print(f"{table:<20} {rows:>14,} rows")
+    print(f"Generated in {seconds:.2f}s ({counts['job_postings_fact'] / seconds:,.0f} postings/sec)")
+
+
+if __name__ == "__main__":
+    main()
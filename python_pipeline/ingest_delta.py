@@ -0,0 +1,289 @@
+"""
+Incremental Delta Ingest
+
+This script loads a delta drop (new postings plus the companies, skills and
+skill links they reference) into an already loaded database without touching
+the rows that are already there. In one transaction it:
+1. Stages the delta CSVs in temporary tables through COPY FROM STDIN
+2. Upserts company_dim and skills_dim (ON CONFLICT ... DO UPDATE, only rows that changed)
+3. Keeps the postings newer than the ingest watermark (job_posted_date, job_id)
+   that are not loaded yet, classifying only their new job titles and parsing
+   only their new job_via strings (job_sources.py). Postings that are not
+   loaded yet but can never pass the watermark, because they have no
+   job_posted_date or are dated before it, are written to
+   data/quarantine/<delta dir name>/job_postings_fact.csv with the reason and
+   reported, and their skill links are left out with them
+4. Creates the monthly partitions of the new postings (partitions.py), then
+   inserts those postings and their skills_job_dim rows
+5. Folds the new postings into the posting_cube rollup instead of
+   recomputing it over the whole fact table
+6. Advances the watermark to the newest posting it ingested
+
+A failed delta leaves the database exactly as it was, and re-running the same
+delta is a no-op. load_tables.py rebuilds the cube and the watermark after
+every full load (--rebuild does the same for an existing database).
+
+Run data/sql_load/7_source_dim.sql, then 5_incremental.sql, once before the first full load.
+
+Input: <delta dir>/{company_dim,skills_dim,job_postings_fact,skills_job_dim}.csv (any subset)
+Usage: python python_pipeline/ingest_delta.py DELTA_DIR [--dsn DSN] [--quarantine-dir DIR]
+       python python_pipeline/ingest_delta.py --rebuild [--dsn DSN]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.aggregates import (
+    advance_watermark,
+    fold_aggregates,
+    has_incremental_tables,
+    read_watermark,
+    rebuild_aggregates,
+)
+from python_pipeline.db import connect
+from python_pipeline.job_categories import classify_titles, has_category_tables
+from python_pipeline.job_sources import assign_sources, has_source_column
+from python_pipeline.load_tables import COPY_SQL, TABLES, read_header
+from python_pipeline.partitions import prepare_partitions
+from python_pipeline.validate_csv import QUARANTINE_DIR
+
+# Dimension table -> key column, upserted from the delta
+DIMENSIONS = {
+    "company_dim": "company_id",
+    "skills_dim": "skill_id",
+}
+
+
+def stage_delta(cur, delta_dir):
+    """COPY every delta CSV present into a temporary stage_<table>, return {table: rows}"""
+    staged = {}
+    for table in TABLES:
+        # Missing files stage as empty tables, so the later steps need no special cases
+        cur.execute(f"CREATE TEMP TABLE stage_{table} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        if table == "job_postings_fact":
+            # NOT NULL on a partitioned table (part of its key): stage undated postings to quarantine them
+            cur.execute("ALTER TABLE stage_job_postings_fact ALTER COLUMN job_posted_date DROP NOT NULL")
+        csv_path = delta_dir / f"{table}.csv"
+        if csv_path.exists():
+            with open(csv_path, "rb") as csv_file:
+                cur.copy_expert(COPY_SQL.format(table=f"stage_{table}", columns=read_header(csv_path)), csv_file)
+            staged[table] = cur.rowcount
+        else:
+            staged[table] = 0
+    return staged
+
+
+def upsert_dimension(cur, table, key):
+    """Insert new rows and update changed ones from stage_<table>, return the rows written"""
+    cur.execute(f"SELECT * FROM stage_{table} LIMIT 0")
+    columns = [column.name for column in cur.description if column.name != key]
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns)
+    current = ", ".join(f"{table}.{column}" for column in columns)
+    incoming = ", ".join(f"EXCLUDED.{column}" for column in columns)
+
+    # DISTINCT ON: a key repeated inside one delta must not hit the same row twice
+    cur.execute(
+        f"""
+        INSERT INTO {table}
+        SELECT DISTINCT ON ({key}) * FROM stage_{table} ORDER BY {key}
+        ON CONFLICT ({key}) DO UPDATE SET {updates}
+        WHERE ({current}) IS DISTINCT FROM ({incoming})
+        """
+    )
+    return cur.rowcount
+
+
+def quarantine_postings(cur, watermark, quarantine_path):
+    """Write the staged postings the watermark would drop to quarantine_path, return (undated, backdated)"""
+    # Postings already loaded are re-sent copies, not lost rows, and are only counted as skipped
+    cur.execute(
+        """
+        CREATE TEMP TABLE quarantined_postings ON COMMIT DROP AS
+        SELECT
+            CASE WHEN stage.job_posted_date IS NULL THEN 'NULL job_posted_date'
+                 ELSE 'job_posted_date before the watermark' END AS reason,
+            stage.*
+        FROM stage_job_postings_fact AS stage
+        WHERE (stage.job_posted_date IS NULL OR (stage.job_posted_date, stage.job_id) <= (%s, %s))
+          AND NOT EXISTS (SELECT 1 FROM job_postings_fact AS job WHERE job.job_id = stage.job_id)
+        """,
+        watermark,
+    )
+    cur.execute("SELECT COUNT(*) - COUNT(job_posted_date), COUNT(job_posted_date) FROM quarantined_postings")
+    undated, backdated = cur.fetchone()
+    quarantine_path.unlink(missing_ok=True)
+    if undated or backdated:
+        quarantine_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(quarantine_path, "wb") as quarantine:
+            cur.copy_expert(
+                "COPY (SELECT * FROM quarantined_postings ORDER BY job_id) TO STDOUT WITH (FORMAT csv, HEADER true)",
+                quarantine,
+            )
+    return undated, backdated
+
+
+def select_new_postings(cur, watermark):
+    """Create delta_postings from the staged postings newer than the watermark and not loaded yet"""
+    cur.execute(
+        """
+        CREATE TEMP TABLE delta_postings ON COMMIT DROP AS
+        SELECT DISTINCT ON (stage.job_id) stage.*
+        FROM stage_job_postings_fact AS stage
+        WHERE (stage.job_posted_date, stage.job_id) > (%s, %s)
+          AND NOT EXISTS (SELECT 1 FROM job_postings_fact AS job WHERE job.job_id = stage.job_id)
+        ORDER BY stage.job_id
+        """,
+        watermark,
+    )
+    return cur.rowcount
+
+
+def classify_new_postings(cur):
+    """Classify the titles of delta_postings not seen before into job_title_category"""
+    if not has_category_tables(cur):
+        return 0
+    cur.execute(
+        """
+        SELECT DISTINCT job_title_short FROM delta_postings AS delta
+        WHERE NOT EXISTS (SELECT 1 FROM job_title_category AS map WHERE map.job_title_short = delta.job_title_short)
+        """
+    )
+    return classify_titles(cur, [title for (title,) in cur.fetchall()])
+
+
+def prepare_delta_partitions(conn):
+    """Create the monthly partitions delta_postings needs, return the months created (None if unpartitioned)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT DISTINCT date_trunc('month', job_posted_date)::date FROM delta_postings")
+        months = [month for (month,) in cur.fetchall()]
+    return prepare_partitions(conn, months) if months else []
+
+
+def insert_postings(cur):
+    """Insert delta_postings and the skill links of those postings, return (postings, links)"""
+    cur.execute("INSERT INTO job_postings_fact SELECT * FROM delta_postings")
+    postings = cur.rowcount
+
+    # Links of skipped postings are skipped with them
+    cur.execute(
+        """
+        INSERT INTO skills_job_dim (job_id, skill_id)
+        SELECT DISTINCT stage.job_id, stage.skill_id
+        FROM stage_skills_job_dim AS stage
+        INNER JOIN delta_postings AS delta ON delta.job_id = stage.job_id
+        ON CONFLICT DO NOTHING
+        """
+    )
+    return postings, cur.rowcount
+
+
+def ingest_delta(delta_dir, dsn=None, quarantine_dir=QUARANTINE_DIR):
+    """Ingest one delta directory in a single transaction and return {step: (rows, seconds)}"""
+    delta_dir = Path(delta_dir)
+    quarantine_path = Path(quarantine_dir) / delta_dir.resolve().name / "job_postings_fact.csv"
+    if not any((delta_dir / f"{table}.csv").exists() for table in TABLES):
+        raise FileNotFoundError(f"No table CSV files in {delta_dir}")
+
+    results = {}
+    conn = connect(dsn)
+    try:
+        with conn, conn.cursor() as cur:
+            if not has_incremental_tables(cur):
+                raise RuntimeError("Run data/sql_load/5_incremental.sql and a full load_tables.py load first")
+            # One delta at a time, so two runs never pick the same new postings
+            cur.execute("LOCK TABLE ingest_watermark IN EXCLUSIVE MODE")
+            watermark = read_watermark(cur)
+            if watermark is None:
+                raise RuntimeError("No ingest watermark, run load_tables.py (or ingest_delta.py --rebuild) first")
+
+            start = time.perf_counter()
+            staged = stage_delta(cur, delta_dir)
+            results["staged rows"] = (sum(staged.values()), time.perf_counter() - start)
+
+            for table, key in DIMENSIONS.items():
+                start = time.perf_counter()
+                results[f"{table} upserts"] = (upsert_dimension(cur, table, key), time.perf_counter() - start)
+
+            start = time.perf_counter()
+            undated, backdated = quarantine_postings(cur, watermark, quarantine_path)
+            seconds = time.perf_counter() - start
+            results["undated postings"] = (undated, seconds)
+            results["backdated postings"] = (backdated, seconds)
+
+            start = time.perf_counter()
+            new = select_new_postings(cur, watermark)
+            results["new postings"] = (new, time.perf_counter() - start)
+            # Already loaded, or repeated within the delta
+            results["skipped postings"] = (staged["job_postings_fact"] - undated - backdated - new, 0.0)
+
+            start = time.perf_counter()
+            results["new job titles"] = (classify_new_postings(cur), time.perf_counter() - start)
+
+            if has_source_column(cur):
+                start = time.perf_counter()
+                results["new job_via strings"] = (assign_sources(cur, "delta_postings"), time.perf_counter() - start)
+
+            start = time.perf_counter()
+            created = prepare_delta_partitions(conn)
+            results["new partitions"] = (len(created or []), time.perf_counter() - start)
+
+            start = time.perf_counter()
+            postings, links = insert_postings(cur)
+            seconds = time.perf_counter() - start
+            results["job_postings_fact inserts"] = (postings, seconds)
+            results["skills_job_dim inserts"] = (links, seconds)
+
+            start = time.perf_counter()
+            fold_aggregates(cur, "delta_postings")
+            advance_watermark(cur, "delta_postings")
+            results["aggregates and watermark"] = (None, time.perf_counter() - start)
+    finally:
+        conn.close()
+
+    return results
+
+
+def print_report(results):
+    """Print the rows and time of each ingest step"""
+    for step, (rows, seconds) in results.items():
+        count = "" if rows is None else f"{rows:>12,} rows"
+        print(f"{step:<26} {count:>17} {seconds:8.2f}s")
+
+
+def main():
+    """Main function to ingest a delta directory"""
+    parser = argparse.ArgumentParser(description="Ingest new postings and fold them into the rollup cube")
+    parser.add_argument("delta_dir", nargs="?", help="directory holding the delta CSV files")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the cube and watermark from the tables")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--quarantine-dir", default=QUARANTINE_DIR,
+                        help="directory for the postings without a date or dated before the watermark")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        conn = connect(args.dsn)
+        try:
+            with conn:
+                watermark = rebuild_aggregates(conn)
+        finally:
+            conn.close()
+        print(f"Aggregates rebuilt, watermark {watermark}")
+        return
+    if args.delta_dir is None:
+        parser.error("a delta directory is required unless --rebuild is given")
+
+    results = ingest_delta(args.delta_dir, args.dsn, args.quarantine_dir)
+    print_report(results)
+    if results["undated postings"][0] or results["backdated postings"][0]:
+        print(f"Postings without a job_posted_date or dated before the watermark were quarantined in "
+              f"{args.quarantine_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Job Category Classification
+
+Maps the handful of distinct job_title_short values to a category in
+job_category_dim (see data/sql_load/4_job_categories.sql) and stores the
+mapping in job_title_category, which the companies query joins to
+company_cube. The title patterns are evaluated once per distinct title here
+instead of once per fact row with ILIKE at query time.
+
+load_tables.py runs classify_postings() after every bulk load. Run this script
+directly to classify an already loaded database.
+
+Usage: python python_pipeline/job_categories.py [--dsn DSN]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from psycopg2.extras import execute_values
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import connect
+
+# Checked in order, the first keyword found in the lower-cased title wins.
+# Mirrors the ILIKE buckets the companies query used to evaluate per row.
+CATEGORY_RULES = [
+    ("analyst", "analyst"),
+    ("scientist", "scientist"),
+    ("machine", "machine_learning"),
+    ("cloud", "cloud"),
+    ("software", "software"),
+    ("engineer", "other_engineer"),
+]
+DEFAULT_CATEGORY = "other"
+
+
+def classify_title(title):
+    """Return the category name for one job_title_short value"""
+    lowered = (title or "").lower()
+    for keyword, category in CATEGORY_RULES:
+        if keyword in lowered:
+            return category
+    return DEFAULT_CATEGORY
+
+
+def has_category_tables(cur):
+    """Whether 4_job_categories.sql has been applied to this database"""
+    cur.execute("SELECT to_regclass('job_title_category') IS NOT NULL")
+    return cur.fetchone()[0]
+
+
+def category_ids(cur):
+    """Return {category: job_category_id} from job_category_dim"""
+    cur.execute("SELECT category, job_category_id FROM job_category_dim")
+    return dict(cur.fetchall())
+
+
+def classify_titles(cur, titles):
+    """Upsert the category of every title into job_title_category, return the number of titles"""
+    ids = category_ids(cur)
+    mapping = [(title, ids[classify_title(title)]) for title in titles if title is not None]
+    if mapping:
+        execute_values(
+            cur,
+            """
+            INSERT INTO job_title_category (job_title_short, job_category_id) VALUES %s
+            ON CONFLICT (job_title_short) DO UPDATE SET job_category_id = EXCLUDED.job_category_id
+            """,
+            mapping,
+        )
+    return len(mapping)
+
+
+def classify_postings(conn):
+    """Fill job_title_category with the titles of the loaded postings, return the number of titles"""
+    with conn.cursor() as cur:
+        if not has_category_tables(cur):
+            return None
+
+        # Only a few distinct titles exist, so this is the only per-title Python work
+        cur.execute("SELECT DISTINCT job_title_short FROM job_postings_fact WHERE job_title_short IS NOT NULL")
+        return classify_titles(cur, [title for (title,) in cur.fetchall()])
+
+
+def main():
+    """Main function to classify the postings of an already loaded database"""
+    parser = argparse.ArgumentParser(description="Map every job title of the postings to a job category")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    args = parser.parse_args()
+
+    conn = connect(args.dsn)
+    try:
+        with conn:
+            titles = classify_postings(conn)
+        if titles is None:
+            print("No job_title_category table, run data/sql_load/4_job_categories.sql first")
+            return
+        print(f"Classified {titles} distinct job titles")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Job Metrics Engine
+
+Builds single-scan metric queries over job_postings_fact. Every metric is an
+aggregate (mostly COUNT(*) FILTER (WHERE ...)) evaluated over the same rows, so
+any combination of metrics costs one pass over the fact table, grouped by any
+of the dimensions below.
+
+With the default dimension and metrics the generated query returns the same
+result as the job_analysis query in sql_queries/jobs.sql, which reads it from
+the rollup cube instead.
+
+With --since/--until only the postings of that window are read; on the
+partitioned job_postings_fact (partitions.py) that is only their months.
+
+Output: query_results/job_metrics_by_<dimension>.csv
+Usage: python python_pipeline/job_metrics.py [--by country] [--metrics total_jobs median_salary ...]
+       [--since 2023-06-01] [--until 2023-07-01]
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import RESULTS_DIR, connect
+from python_pipeline.run_queries import NamedQuery, print_report, run_cached_query, update_manifest
+
+# Grouping dimension -> (output column, SQL expression)
+DIMENSIONS = {
+    "job_title": ("job_title", "job_title_short"),
+    "country": ("job_country", "job_country"),
+    "source": ("source_website", "source.source_name"),
+    "year": ("year", "EXTRACT(YEAR FROM job_posted_date)"),
+    "schedule_type": ("job_schedule_type", "job_schedule_type"),
+}
+
+# Dimension -> join bringing in the table its expression reads
+DIMENSION_JOINS = {
+    "source": "LEFT JOIN source_dim AS source ON source.source_id = job_postings_fact.source_id",
+}
+
+# Metric column -> aggregate expression
+METRICS = {
+    "total_jobs": "COUNT(*)",
+    "no_degree": "COUNT(*) FILTER (WHERE job_no_degree_mention IS TRUE)",
+    "degree": "COUNT(*) FILTER (WHERE job_no_degree_mention IS FALSE)",
+    "health_insurance": "COUNT(*) FILTER (WHERE job_health_insurance IS TRUE)",
+    "no_health_insurance": "COUNT(*) FILTER (WHERE job_health_insurance IS FALSE)",
+    "average_salary": "ROUND(AVG(salary_year_avg), 0)",
+    "remote": "COUNT(*) FILTER (WHERE job_work_from_home IS TRUE)",
+    "onsite": "COUNT(*) FILTER (WHERE job_work_from_home IS FALSE)",
+    # Salary distribution
+    "median_salary": "ROUND(PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY salary_year_avg)::numeric, 0)",
+    "salary_p25": "ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY salary_year_avg)::numeric, 0)",
+    "salary_p75": "ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY salary_year_avg)::numeric, 0)",
+    "salary_p90": "ROUND(PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY salary_year_avg)::numeric, 0)",
+    # Salary coverage
+    "yearly_salary_jobs": "COUNT(salary_year_avg)",
+    "hourly_salary_jobs": "COUNT(salary_hour_avg)",
+    "average_hourly_salary": "ROUND(AVG(salary_hour_avg), 2)",
+    # Schedule types (a posting can list several, e.g. "Full-time and Part-time")
+    "full_time": "COUNT(*) FILTER (WHERE job_schedule_type LIKE '%Full-time%')",
+    "part_time": "COUNT(*) FILTER (WHERE job_schedule_type LIKE '%Part-time%')",
+    "contractor": "COUNT(*) FILTER (WHERE job_schedule_type LIKE '%Contractor%')",
+    "internship": "COUNT(*) FILTER (WHERE job_schedule_type LIKE '%Internship%')",
+}
+
+# Columns of query_results/job_analysis.csv
+DEFAULT_METRICS = [
+    "total_jobs",
+    "no_degree",
+    "degree",
+    "health_insurance",
+    "no_health_insurance",
+    "average_salary",
+    "remote",
+    "onsite",
+]
+
+
+def build_metrics_query(dimension="job_title", metrics=DEFAULT_METRICS, min_jobs=None, since=None, until=None):
+    """Return the single-scan SQL computing metrics per value of dimension"""
+    if dimension not in DIMENSIONS:
+        raise KeyError(f"Unknown dimension '{dimension}' (available: {', '.join(DIMENSIONS)})")
+    unknown = [metric for metric in metrics if metric not in METRICS]
+    if unknown:
+        raise KeyError(f"Unknown metrics: {', '.join(unknown)} (available: {', '.join(METRICS)})")
+
+    column, expression = DIMENSIONS[dimension]
+    select_list = [f"    {expression} AS {column}"]
+    select_list += [f"    {METRICS[metric]} AS {metric}" for metric in metrics]
+
+    sql = "SELECT\n" + ",\n".join(select_list) + "\nFROM job_postings_fact\n"
+    if dimension in DIMENSION_JOINS:
+        sql += f"    {DIMENSION_JOINS[dimension]}\n"
+
+    # Constant bounds on the partition column, so the planner skips the months outside the window
+    window = []
+    if since is not None:
+        window.append(f"job_posted_date >= '{date.fromisoformat(str(since))}'")
+    if until is not None:
+        window.append(f"job_posted_date < '{date.fromisoformat(str(until))}'")
+    if window:
+        sql += "WHERE " + " AND ".join(window) + "\n"
+
+    sql += f"GROUP BY {expression}\n"
+    if min_jobs is not None:
+        sql += f"HAVING COUNT(*) >= {int(min_jobs)}\n"
+    sql += "ORDER BY COUNT(*) DESC"
+    return sql
+
+
+def run_metrics(dimension="job_title", metrics=DEFAULT_METRICS, min_jobs=None, dsn=None,
+                output_dir=RESULTS_DIR, cache=None, since=None, until=None):
+    """Stream one metrics breakdown to output_dir/job_metrics_by_<dimension>.csv"""
+    name = f"job_metrics_by_{dimension}"
+    query = NamedQuery(name, "job_metrics.py", build_metrics_query(dimension, metrics, min_jobs, since, until))
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    conn = connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            entries = {name: run_cached_query(cur, query, output_dir / f"{name}.csv", cache)}
+    finally:
+        conn.close()
+
+    update_manifest(output_dir, entries)
+    return entries
+
+
+def main():
+    """Main function to compute a metrics breakdown"""
+    parser = argparse.ArgumentParser(description="Compute per-group job metrics in one scan")
+    parser.add_argument("--by", default="job_title", choices=list(DIMENSIONS), help="grouping dimension")
+    parser.add_argument("--metrics", nargs="+", default=DEFAULT_METRICS, choices=list(METRICS), help="metrics")
+    parser.add_argument("--min-jobs", type=int, default=None, help="drop groups with fewer postings")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="first posting date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, default=None, help="posting date to stop before")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="directory for the CSV file and manifest")
+    parser.add_argument("--print-sql", action="store_true", help="print the generated query and exit")
+    args = parser.parse_args()
+
+    if args.print_sql:
+        print(build_metrics_query(args.by, args.metrics, args.min_jobs, args.since, args.until))
+        return
+    print_report(run_metrics(args.by, args.metrics, args.min_jobs, args.dsn, args.output_dir,
+                             since=args.since, until=args.until))
+
+
+if __name__ == "__main__":
+    main()
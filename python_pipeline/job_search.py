@@ -0,0 +1,188 @@
+"""
+Job Search
+
+Search API over job_postings_fact backed by the indexes of
+data/sql_load/8_search.sql:
+1. Full-text search on the words of job_title and job_location
+   ("senior data engineer", "python -junior", "\"machine learning\"")
+2. Substring filters on job_title and job_location (ILIKE '%...%'), answered
+   from trigram indexes instead of a full scan
+3. Exact filters on job_country and job_work_from_home and a
+   salary_year_avg range
+4. Results newest first, paginated with a keyset cursor on
+   (job_posted_date, job_id): every page is an index range read, however deep,
+   where OFFSET would read and discard every earlier page
+5. Match counts answered from the same indexes, exact or as the planner's estimate
+
+Postings without a job_posted_date (only possible before the table is
+partitioned) cannot be paginated and are never returned.
+
+Usage: python python_pipeline/job_search.py [TEXT] [--title data] [--location berlin] [--country Germany]
+       [--remote | --onsite] [--salary-min 80000] [--salary-max 150000] [--limit 20] [--after CURSOR] [--count]
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import connect
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+
+# Must match the expression of idx_job_search_document in data/sql_load/8_search.sql
+SEARCH_DOCUMENT = "to_tsvector('english', COALESCE(job.job_title, '') || ' ' || COALESCE(job.job_location, ''))"
+
+RESULT_COLUMNS = [
+    "job_id", "job_title", "company_name", "job_location", "job_country", "job_work_from_home",
+    "salary_year_avg", "job_posted_date",
+]
+
+SEARCH_SQL = """
+SELECT
+    job.job_id,
+    job.job_title,
+    comp.name AS company_name,
+    job.job_location,
+    job.job_country,
+    job.job_work_from_home,
+    job.salary_year_avg,
+    job.job_posted_date
+FROM job_postings_fact AS job
+    LEFT JOIN company_dim AS comp ON comp.company_id = job.company_id
+WHERE {conditions}
+ORDER BY job.job_posted_date DESC, job.job_id DESC
+LIMIT %s
+"""
+
+MATCH_SQL = "SELECT {select} FROM job_postings_fact AS job WHERE {conditions}"
+
+
+def like_pattern(text):
+    """ILIKE pattern matching text anywhere, with its own wildcards escaped"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def encode_cursor(row):
+    """Opaque cursor pointing after row (a search result dict)"""
+    return f"{row['job_posted_date'].isoformat()}|{row['job_id']}"
+
+
+def decode_cursor(cursor):
+    """Return the (job_posted_date, job_id) a cursor points after"""
+    posted, job_id = cursor.rsplit("|", 1)
+    return datetime.fromisoformat(posted), int(job_id)
+
+
+def search_conditions(text=None, title=None, location=None, country=None, remote=None,
+                      salary_min=None, salary_max=None):
+    """Return (SQL conditions, parameters) for the given filters; None means no filter"""
+    conditions = ["job.job_posted_date IS NOT NULL"]
+    params = []
+    if text:
+        conditions.append(f"{SEARCH_DOCUMENT} @@ websearch_to_tsquery('english', %s)")
+        params.append(text)
+    if title:
+        conditions.append("job.job_title ILIKE %s")
+        params.append(like_pattern(title))
+    if location:
+        conditions.append("job.job_location ILIKE %s")
+        params.append(like_pattern(location))
+    if country is not None:
+        conditions.append("job.job_country = %s")
+        params.append(country)
+    if remote is not None:
+        conditions.append("job.job_work_from_home = %s")
+        params.append(remote)
+    if salary_min is not None:
+        conditions.append("job.salary_year_avg >= %s")
+        params.append(salary_min)
+    if salary_max is not None:
+        conditions.append("job.salary_year_avg <= %s")
+        params.append(salary_max)
+    return conditions, params
+
+
+def search_jobs(cur, limit=DEFAULT_LIMIT, after=None, **filters):
+    """Return (one page of matching postings as dicts, cursor of the next page or None)"""
+    if not 0 < limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    conditions, params = search_conditions(**filters)
+    if after is not None:
+        conditions.append("(job.job_posted_date, job.job_id) < (%s, %s)")
+        params.extend(decode_cursor(after))
+
+    # One row more than the page tells whether there is a next page
+    cur.execute(SEARCH_SQL.format(conditions="\n  AND ".join(conditions)), [*params, limit + 1])
+    rows = [dict(zip(RESULT_COLUMNS, row)) for row in cur.fetchall()]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
+
+
+def count_matches(cur, exact=True, **filters):
+    """Number of postings matching the filters, or the planner's estimate of it when exact is False"""
+    conditions, params = search_conditions(**filters)
+    conditions = " AND ".join(conditions)
+    if exact:
+        cur.execute(MATCH_SQL.format(select="COUNT(*)", conditions=conditions), params)
+        return cur.fetchone()[0]
+    # The estimate comes from the column and index statistics alone, nothing is read
+    cur.execute(f"EXPLAIN (FORMAT JSON) {MATCH_SQL.format(select='1', conditions=conditions)}", params)
+    return int(cur.fetchone()[0][0]["Plan"]["Plan Rows"])
+
+
+def main():
+    """Main function to search the postings from the command line"""
+    parser = argparse.ArgumentParser(description="Search the job postings, newest first")
+    parser.add_argument("text", nargs="?", default=None, help="full-text query on job title and location")
+    parser.add_argument("--title", default=None, help="substring of job_title")
+    parser.add_argument("--location", default=None, help="substring of job_location")
+    parser.add_argument("--country", default=None, help="exact job_country")
+    remote = parser.add_mutually_exclusive_group()
+    remote.add_argument("--remote", dest="remote", action="store_true", default=None, help="remote postings only")
+    remote.add_argument("--onsite", dest="remote", action="store_false", help="onsite postings only")
+    parser.add_argument("--salary-min", type=float, default=None, help="minimum salary_year_avg")
+    parser.add_argument("--salary-max", type=float, default=None, help="maximum salary_year_avg")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="postings per page")
+    parser.add_argument("--after", default=None, help="cursor printed by the previous page")
+    parser.add_argument("--count", action="store_true", help="also print the exact number of matches")
+    parser.add_argument("--json", action="store_true", help="print the page as JSON lines")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    args = parser.parse_args()
+
+    filters = {
+        "text": args.text, "title": args.title, "location": args.location, "country": args.country,
+        "remote": args.remote, "salary_min": args.salary_min, "salary_max": args.salary_max,
+    }
+    conn = connect(args.dsn)
+    try:
+        with conn.cursor() as cur:
+            rows, cursor = search_jobs(cur, args.limit, args.after, **filters)
+            matches = count_matches(cur, **filters) if args.count else None
+    finally:
+        conn.close()
+
+    for row in rows:
+        if args.json:
+            print(json.dumps(row, default=str))
+            continue
+        salary = f"{row['salary_year_avg']:>10,.0f}" if row["salary_year_avg"] is not None else f"{'':>10}"
+        print(f"{row['job_posted_date']:%Y-%m-%d} {row['job_id']:>9} {salary}  {(row['job_title'] or '')[:50]:<50} "
+              f"{(row['company_name'] or '')[:30]:<30} {row['job_location'] or ''}")
+    if matches is not None:
+        print(f"{matches:,} matching postings")
+    if cursor is not None:
+        print(f"next page: --after '{cursor}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Job Source Normalization
+
+Parses the job_via strings of the postings ("via LinkedIn", "via My ArkLaMiss
+Jobs", ...) into canonical source websites in source_dim (see
+data/sql_load/7_source_dim.sql) and stores the source id on every posting.
+SPLIT_PART(job_via, ' ', 2) kept only the second word, so multi-word sites
+ended up in buckets such as "My", "The" and "Jobs", and spelling variants
+such as "Linkedin" and "LinkedIn" were counted apart.
+
+Every distinct job_via string is parsed once: job_via_source keeps the mapping
+across reloads and only strings it has not seen yet reach the parser.
+
+load_tables.py maps the job_via strings of the postings CSV before COPY and
+streams source_id in with the rows (source_lookup), and ingest_delta.py assigns
+the sources of each delta. Run this script directly to normalize an
+already loaded database; it then rebuilds the rollup cubes, which are keyed
+on source_id.
+
+Usage: python python_pipeline/job_sources.py [--dsn DSN]
+"""
+
+import argparse
+import re
+import sys
+from functools import lru_cache, partial
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from psycopg2.extras import execute_values
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.aggregates import rebuild_aggregates
+from python_pipeline.db import connect
+
+# Leading "via" and "www." are not part of the site name
+SITE_PREFIX = re.compile(r"^\s*(via\b)?\s*(www\.)?", re.IGNORECASE)
+
+# Spelling-insensitive key: case, spacing and punctuation do not tell sites apart
+KEY_NOISE = re.compile(r"[^\w.]+|_")
+
+# Display names of sites whose postings spell them in several ways, keyed on source_key
+SOURCE_NAMES = {
+    "linkedin": "LinkedIn",
+    "bebee": "BeBee",
+    "ziprecruiter": "ZipRecruiter",
+    "simplyhired": "SimplyHired",
+    "smartrecruiters": "SmartRecruiters",
+    "efinancialcareers": "eFinancialCareers",
+    "careerbuilder": "CareerBuilder",
+    "builtin": "Built In",
+}
+
+
+@lru_cache(maxsize=None)
+def parse_source(job_via):
+    """Return (source_key, source_name) for one job_via string, or None when it names no site"""
+    name = " ".join(SITE_PREFIX.sub("", job_via or "", count=1).split()).strip(" .|-")
+    key = KEY_NOISE.sub("", name.casefold()).strip(".")
+    if not key:
+        return None
+    return key, SOURCE_NAMES.get(key, name)
+
+
+def name_sources(parsed):
+    """Return {source_key: source_name} for parse_source() results, one name per key"""
+    # A site without an entry in SOURCE_NAMES is named after its first spelling in sort order
+    sources = {}
+    for key, name in sorted(set(parsed)):
+        sources.setdefault(key, name)
+    return sources
+
+
+def has_source_column(cur):
+    """Whether 7_source_dim.sql has been applied to this database"""
+    cur.execute(
+        """
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'job_postings_fact' AND column_name = 'source_id'
+        )
+        """
+    )
+    return cur.fetchone()[0]
+
+
+def map_job_via(cur, values):
+    """Parse job_via strings into source_dim and job_via_source, return the number of strings mapped"""
+    parsed = {value: parse_source(value) for value in values if value is not None}
+    parsed = {value: source for value, source in parsed.items() if source is not None}
+    if not parsed:
+        return 0
+
+    sources = name_sources(parsed.values())
+    execute_values(
+        cur,
+        "INSERT INTO source_dim (source_key, source_name) VALUES %s ON CONFLICT (source_key) DO NOTHING",
+        list(sources.items()),
+    )
+    cur.execute("SELECT source_key, source_id FROM source_dim WHERE source_key = ANY(%s)", (list(sources),))
+    source_ids = dict(cur.fetchall())
+    execute_values(
+        cur,
+        """
+        INSERT INTO job_via_source (job_via, source_id) VALUES %s
+        ON CONFLICT (job_via) DO UPDATE SET source_id = EXCLUDED.source_id
+        """,
+        [(value, source_ids[key]) for value, (key, _) in parsed.items()],
+    )
+    return len(parsed)
+
+
+def assign_sources(cur, table):
+    """Map the job_via strings of table not seen before and set source_id on its rows, return the new strings"""
+    cur.execute(
+        f"""
+        SELECT DISTINCT job_via FROM {table} AS job
+        WHERE job_via IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM job_via_source AS map WHERE map.job_via = job.job_via)
+        """
+    )
+    mapped = map_job_via(cur, [value for (value,) in cur.fetchall()])
+    cur.execute(
+        f"""
+        UPDATE {table} AS job
+        SET source_id = map.source_id
+        FROM job_via_source AS map
+        WHERE map.job_via = job.job_via
+          AND job.source_id IS DISTINCT FROM map.source_id
+        """
+    )
+    return mapped
+
+
+def source_id_column(batch, job_via, source_ids):
+    """source_id of every row of a CSV batch, NULL for the job_via strings naming no site"""
+    return pc.take(source_ids, pc.index_in(batch.column("job_via"), value_set=job_via))
+
+
+def source_lookup(conn, values):
+    """Map the given job_via strings not seen before, return source_id_column() bound to their sources (or None)"""
+    with conn.cursor() as cur:
+        if not has_source_column(cur):
+            return None
+        values = [value for value in values if value is not None]
+        cur.execute("SELECT job_via FROM job_via_source WHERE job_via = ANY(%s)", (values,))
+        known = {value for (value,) in cur.fetchall()}
+        map_job_via(cur, [value for value in values if value not in known])
+        cur.execute("SELECT job_via, source_id FROM job_via_source WHERE job_via = ANY(%s)", (values,))
+        mapping = cur.fetchall()
+    return partial(
+        source_id_column,
+        job_via=pa.array([value for value, _ in mapping], pa.string()),
+        source_ids=pa.array([source_id for _, source_id in mapping], pa.int32()),
+    )
+
+
+def assign_postings(conn):
+    """Fill job_postings_fact.source_id, return the number of new job_via strings (None without the column)"""
+    with conn.cursor() as cur:
+        if not has_source_column(cur):
+            return None
+        return assign_sources(cur, "job_postings_fact")
+
+
+def main():
+    """Main function to normalize the sources of an already loaded database"""
+    parser = argparse.ArgumentParser(description="Store a normalized source id on every posting")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    args = parser.parse_args()
+
+    conn = connect(args.dsn)
+    try:
+        with conn:
+            mapped = assign_postings(conn)
+            if mapped is not None:
+                # posting_cube still counts the postings under their old source ids
+                rebuild_aggregates(conn)
+        if mapped is None:
+            print("job_postings_fact has no source_id column, run data/sql_load/7_source_dim.sql first")
+            return
+
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM (ANALYZE) job_postings_fact")
+            cur.execute("SELECT COUNT(*) FROM source_dim")
+            sources = cur.fetchone()[0]
+        print(f"Parsed {mapped} new job_via strings, {sources} source websites")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Bulk Loader Script
+
+This script replaces the hand-edited COPY statements in
+data/sql_load/3_modify_tables.sql. It:
+1. Captures and drops the primary keys, foreign keys and indexes of the four tables
+2. Truncates the tables so a reload never hits "duplicate key value violates
+   unique constraint company_dim_pkey"
+3. Streams every CSV through COPY FROM STDIN in fixed-size chunks, loading
+   company_dim and skills_dim in parallel, then job_postings_fact and skills_job_dim.
+   From the command line every CSV is validated on the way (validate_csv.py):
+   rows COPY or the keys would reject go to data/quarantine/ instead of failing
+   the load. Before COPY, one pass over the posting dates and job_via strings
+   creates the monthly partitions the postings go to and maps their sources,
+   so source_id is streamed in with the rows instead of set by an UPDATE
+4. Runs the load-time derivation steps (job categories, the rollup cube and
+   ingest watermark) while no index needs maintaining
+5. Recreates the keys, indexes and foreign keys once all rows are in
+6. Reports rows/sec per table
+
+If the load or the key recreation fails, the tables are left empty with every
+key, index and foreign key back in place.
+
+Run data/sql_load/1_create_database.sql and 2_create_tables.sql first
+(and 4_job_categories.sql to map the job titles to categories, 7_source_dim.sql
+to store the source website of each posting, then 5_incremental.sql, whose rollup
+cube is keyed on that source, to ingest deltas afterwards with ingest_delta.py).
+
+To test the loader, --scratch-database NAME loads into a throwaway database
+created from the schema files on the server of the DSN, dropped afterwards.
+
+Input: data/csv_files/*.csv
+Usage: python python_pipeline/load_tables.py [--csv-dir DIR] [--dsn DSN] [--no-validate] [--scratch-database NAME]
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.aggregates import rebuild_aggregates
+from python_pipeline.db import CSV_DIR, connect, create_scratch_database, drop_database
+from python_pipeline.job_categories import classify_postings
+from python_pipeline.job_sources import source_lookup
+from python_pipeline.partitions import prepare_partitions
+from python_pipeline.validate_csv import (
+    QUARANTINE_DIR,
+    CleanRows,
+    CsvValidator,
+    append_columns,
+    open_text_csv,
+    parse_column,
+    read_columns,
+)
+
+# Tables inside a phase have no dependency on each other once foreign keys are dropped
+LOAD_PHASES = [
+    ("company_dim", "skills_dim"),
+    ("job_postings_fact", "skills_job_dim"),
+]
+TABLES = [table for phase in LOAD_PHASES for table in phase]
+
+# Validated skill links are checked against the postings that passed, so they load after them
+VALIDATED_LOAD_PHASES = [
+    ("company_dim", "skills_dim"),
+    ("job_postings_fact",),
+    ("skills_job_dim",),
+]
+
+# Derived tables filled after the COPY, each step takes the open connection
+POST_LOAD_STEPS = [
+    ("job categories", classify_postings),
+    ("rollup cube", rebuild_aggregates),
+]
+
+# The column list comes from the CSV header plus the derived columns appended to the stream
+COPY_SQL = "COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, HEADER true, DELIMITER ',', ENCODING 'UTF8')"
+
+# 8 MB read size for each round trip of the COPY stream
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def capture_schema_objects(conn, tables=TABLES):
+    """Return (constraints, indexes) definitions for the given tables"""
+    with conn.cursor() as cur:
+        # Keys on the tables plus any foreign key pointing at them; the copies a partitioned
+        # table's constraints leave on its partitions go with the parent constraint
+        cur.execute(
+            """
+            SELECT DISTINCT conrelid::regclass::text, conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE contype IN ('p', 'u', 'f')
+              AND conparentid = 0
+              AND (conrelid = ANY(%(tables)s::regclass[]) OR confrelid = ANY(%(tables)s::regclass[]))
+            """,
+            {"tables": list(tables)},
+        )
+        constraints = cur.fetchall()
+
+        # Plain indexes, skipping the ones that back a primary key or unique constraint
+        cur.execute(
+            """
+            SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+            FROM pg_index
+            WHERE indrelid = ANY(%(tables)s::regclass[])
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint
+                  WHERE conindid = pg_index.indexrelid AND contype IN ('p', 'u', 'x')
+              )
+            """,
+            {"tables": list(tables)},
+        )
+        indexes = cur.fetchall()
+
+    return constraints, indexes
+
+
+def drop_schema_objects(conn, constraints, indexes):
+    """Drop foreign keys first, then keys, then plain indexes"""
+    with conn.cursor() as cur:
+        for table, name, contype, _ in sorted(constraints, key=lambda c: c[2] != "f"):
+            cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS "{name}"')
+        for index, _ in indexes:
+            cur.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+def restore_schema_objects(conn, constraints, indexes):
+    """Recreate keys, then plain indexes, then foreign keys (which need the keys)"""
+    with conn.cursor() as cur:
+        for table, name, contype, definition in constraints:
+            if contype != "f":
+                cur.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+        for _, definition in indexes:
+            cur.execute(definition)
+        for table, name, contype, definition in constraints:
+            if contype == "f":
+                cur.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+def read_header(csv_path):
+    """Return the quoted column list from the first line of a CSV file"""
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        columns = next(csv.reader(csv_file))
+    return ", ".join(f'"{column.strip()}"' for column in columns)
+
+
+def scan_postings(csv_path):
+    """Return (first days of the posting months, distinct job_via strings) of a postings CSV"""
+    columns = [column for column in ("job_posted_date", "job_via") if column in read_columns(csv_path)]
+    months, job_via = set(), set()
+    for batch in open_text_csv(csv_path, columns):
+        if "job_posted_date" in columns:
+            _, parses, seconds = parse_column(batch.column("job_posted_date"), "timestamp")
+            months.update(np.unique(seconds[parses].astype("datetime64[s]").astype("datetime64[M]")).tolist())
+        if "job_via" in columns:
+            job_via.update(pc.unique(batch.column("job_via")).to_pylist())
+    return sorted(months), job_via
+
+
+def prepare_postings(conn, csv_path):
+    """Create the partitions of the posting months and map the job_via strings, return the derived columns"""
+    months, job_via = scan_postings(csv_path)
+    prepare_partitions(conn, months)
+    source_id = source_lookup(conn, job_via)
+    return {} if source_id is None else {"source_id": source_id}
+
+
+def derived_chunks(csv_path, derived):
+    """Yield one CSV file as CSV bytes with the derived columns appended"""
+    include_header = True
+    for batch in open_text_csv(csv_path, read_columns(csv_path)):
+        sink = io.BytesIO()
+        pa_csv.write_csv(append_columns(batch, derived), sink,
+                         write_options=pa_csv.WriteOptions(include_header=include_header))
+        include_header = False
+        yield sink.getvalue()
+
+
+def copy_table(table, csv_path, dsn=None, chunk_size=DEFAULT_CHUNK_SIZE, validator=None, derived=None):
+    """Stream one CSV file (only its clean rows with a validator) into its table on a dedicated connection"""
+    start = time.perf_counter()
+    derived = derived or {}
+    columns = ", ".join([read_header(csv_path), *(f'"{column}"' for column in derived)])
+    sql = COPY_SQL.format(table=table, columns=columns)
+    conn = connect(dsn)
+    try:
+        if validator:
+            source = validator.clean_rows(table, csv_path, derived)
+        elif derived:
+            source = CleanRows(derived_chunks(csv_path, derived))
+        else:
+            source = open(csv_path, "rb")
+        with conn, conn.cursor() as cur, source as csv_file:
+            cur.copy_expert(sql, csv_file, size=chunk_size)
+            rows = cur.rowcount
+    finally:
+        conn.close()
+    return table, rows, time.perf_counter() - start
+
+
+def load_tables(csv_dir=CSV_DIR, dsn=None, chunk_size=DEFAULT_CHUNK_SIZE, validator=None):
+    """Load all four tables, through validator.clean_rows() when given, and return {table: (rows, seconds)}"""
+    csv_dir = Path(csv_dir)
+    missing = [table for table in TABLES if not (csv_dir / f"{table}.csv").exists()]
+    if missing:
+        raise FileNotFoundError(f"Missing CSV files in {csv_dir}: {', '.join(missing)}")
+
+    conn = connect(dsn)
+    results = {}
+    try:
+        # Defer every index and foreign key check until after the bulk load
+        constraints, indexes = capture_schema_objects(conn)
+        drop_schema_objects(conn, constraints, indexes)
+        with conn.cursor() as cur:
+            cur.execute(f"TRUNCATE {', '.join(TABLES)}")
+        conn.commit()
+
+        loaded = False
+        try:
+            prepare_start = time.perf_counter()
+            derived = {"job_postings_fact": prepare_postings(conn, csv_dir / "job_postings_fact.csv")}
+            # The COPY connections need the new partitions and sources
+            conn.commit()
+            results["partitions and sources"] = (None, time.perf_counter() - prepare_start)
+
+            for phase in VALIDATED_LOAD_PHASES if validator else LOAD_PHASES:
+                with ThreadPoolExecutor(max_workers=len(phase)) as pool:
+                    futures = [
+                        pool.submit(copy_table, table, csv_dir / f"{table}.csv", dsn, chunk_size, validator,
+                                    derived.get(table))
+                        for table in phase
+                    ]
+                    for future in futures:
+                        table, rows, seconds = future.result()
+                        results[table] = (rows, seconds)
+
+            for label, step in POST_LOAD_STEPS:
+                step_start = time.perf_counter()
+                step(conn)
+                results[label] = (None, time.perf_counter() - step_start)
+            loaded = True
+        finally:
+            # Never leave the schema without its keys, even after a failed load
+            if not loaded:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute(f"TRUNCATE {', '.join(TABLES)}")
+                # Empty cube and no watermark, so no delta is ingested on top of a failed load
+                rebuild_aggregates(conn)
+            index_start = time.perf_counter()
+            try:
+                restore_schema_objects(conn, constraints, indexes)
+                conn.commit()
+            except Exception:
+                # The loaded rows break a key (duplicates under --no-validate, ...): empty the
+                # tables so the keys can be recreated, then report the failure
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute(f"TRUNCATE {', '.join(TABLES)}")
+                rebuild_aggregates(conn)
+                restore_schema_objects(conn, constraints, indexes)
+                conn.commit()
+                raise
+            results["indexes and foreign keys"] = (None, time.perf_counter() - index_start)
+
+        # Fresh statistics and visibility map, so the first queries get good plans and index-only scans
+        vacuum_start = time.perf_counter()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"VACUUM (ANALYZE) {', '.join(TABLES)}")
+        results["vacuum analyze"] = (None, time.perf_counter() - vacuum_start)
+    finally:
+        conn.close()
+
+    return results
+
+
+def print_report(results):
+    """Print rows/sec per table"""
+    for table, (rows, seconds) in results.items():
+        if rows is None:
+            print(f"{table:<26} {'':>17} {seconds:8.2f}s")
+        else:
+            rate = rows / seconds if seconds > 0 else float("inf")
+            print(f"{table:<26} {rows:>12,} rows {seconds:8.2f}s {rate:>12,.0f} rows/sec")
+
+
+def main():
+    """Main function to bulk load the CSV files"""
+    parser = argparse.ArgumentParser(description="Bulk load the job market CSV files into PostgreSQL")
+    parser.add_argument("--csv-dir", default=CSV_DIR, help="directory holding the four table CSVs")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="COPY chunk size in bytes")
+    parser.add_argument("--no-validate", action="store_true", help="COPY the CSVs as they are, without validation")
+    parser.add_argument("--quarantine-dir", default=QUARANTINE_DIR, help="directory for the rows failing validation")
+    parser.add_argument("--scratch-database", default=None,
+                        help="load into this throwaway database (created from the schema files, then dropped)")
+    args = parser.parse_args()
+
+    dsn = args.dsn
+    if args.scratch_database:
+        dsn = create_scratch_database(args.scratch_database, args.dsn)
+    try:
+        validator = None if args.no_validate else CsvValidator(args.quarantine_dir)
+        print_report(load_tables(args.csv_dir, dsn, args.chunk_size, validator))
+        if validator is not None:
+            print("\nValidation")
+            for line in validator.report():
+                print(line)
+    finally:
+        if args.scratch_database:
+            drop_database(args.scratch_database, args.dsn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Posting Partitions
+
+This script converts job_postings_fact into a table range-partitioned by posting
+month and keeps its partitions in shape. It:
+1. migrate: copies the postings into a partitioned job_postings_fact with one
+   partition per month (job_postings_fact_YYYY_MM) plus a DEFAULT partition,
+   keeping the existing indexes and foreign keys and adding a BRIN index on
+   job_posted_date and a B-tree index on job_country
+2. maintain: moves postings that landed in the DEFAULT partition into their
+   month, creates the partitions for the months ahead of the newest posting and,
+   with --retain-months, detaches the partitions that fell out of the window
+
+load_tables.py and ingest_delta.py create the partitions of the months they load
+before writing the postings (prepare_partitions), so neither goes through the
+DEFAULT partition.
+
+Queries with a range predicate on job_posted_date (job_metrics.py --since/--until)
+only read the partitions of the months they cover.
+
+The primary key becomes (job_id, job_posted_date), since a key on a partitioned
+table must contain the partition column, so job_posted_date is NOT NULL. The
+skills_job_dim -> job_postings_fact foreign key is dropped for the same reason:
+it would need a unique key on job_id alone. Detached partitions stay in the
+database as plain tables; their postings keep counting in the rollup cube
+until ingest_delta.py --rebuild.
+
+Usage: python python_pipeline/partitions.py migrate [--ahead 3] [--dsn DSN]
+       python python_pipeline/partitions.py maintain [--ahead 3] [--retain-months 24] [--dsn DSN]
+"""
+
+import argparse
+import re
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import connect
+
+PARTITIONED_TABLE = "job_postings_fact"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{PARTITIONED_TABLE}_(\d{{4}})_(\d{{2}})$")
+
+# Months of empty partitions kept ready after the newest posting
+DEFAULT_AHEAD = 3
+
+# Indexes the partitioned layout adds; BRIN suits posting dates, which arrive roughly in order
+PARTITION_INDEXES = [
+    f"CREATE INDEX idx_job_posted_date_brin ON public.{PARTITIONED_TABLE} USING brin (job_posted_date)",
+    f"CREATE INDEX idx_job_country ON public.{PARTITIONED_TABLE} (job_country)",
+]
+
+
+def add_months(month, count):
+    """First day of the month count months after month"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Name of the partition holding the postings of month"""
+    return f"{PARTITIONED_TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(cur):
+    """True when job_postings_fact is already a partitioned table"""
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", (PARTITIONED_TABLE,))
+    return cur.fetchone()[0]
+
+
+def monthly_partitions(cur):
+    """Return {month: partition name} of the attached monthly partitions"""
+    cur.execute(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass",
+        (PARTITIONED_TABLE,),
+    )
+    partitions = {}
+    for (name,) in cur.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(cur, month):
+    """Create the partition of one month"""
+    cur.execute(
+        f"""
+        CREATE TABLE public.{partition_name(month)} PARTITION OF public.{PARTITIONED_TABLE}
+        FOR VALUES FROM (%s) TO (%s)
+        """,
+        (month, add_months(month, 1)),
+    )
+
+
+def create_partitions(cur, months):
+    """Create the partitions of the given months that do not exist yet, return the months created"""
+    existing = monthly_partitions(cur)
+    created = sorted(set(months) - set(existing))
+    for month in created:
+        create_partition(cur, month)
+    return created
+
+
+def create_posting_partitions(cur, months, ahead=DEFAULT_AHEAD):
+    """Create the partitions of the posting months and of the months ahead of the newest, return the months created"""
+    newest = max(months, default=date.today().replace(day=1))
+    return create_partitions(cur, list(months) + [add_months(newest, offset) for offset in range(ahead + 1)])
+
+
+def prepare_partitions(conn, months, ahead=DEFAULT_AHEAD):
+    """Create the partitions a load of postings from the given months needs, return the months created or None"""
+    # Before COPY or INSERT, so every posting is written straight into its month instead of the
+    # DEFAULT partition; rows already in DEFAULT would block creating their month, so they move first
+    with conn.cursor() as cur:
+        if not is_partitioned(cur):
+            return None
+        return sorted(split_default(cur) + create_posting_partitions(cur, months, ahead))
+
+
+def newest_month(cur):
+    """Month of the newest posting, or None for an empty table"""
+    cur.execute(f"SELECT date_trunc('month', MAX(job_posted_date))::date FROM {PARTITIONED_TABLE}")
+    return cur.fetchone()[0]
+
+
+def split_default(cur):
+    """Move the rows of the DEFAULT partition into monthly partitions, return the months created"""
+    cur.execute(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION})")
+    if not cur.fetchone()[0]:
+        return []
+
+    # A month cannot be attached while the DEFAULT partition holds its rows, so the
+    # DEFAULT partition is swapped for an empty one and its rows are routed again
+    cur.execute(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+    cur.execute(f"ALTER TABLE {DEFAULT_PARTITION} RENAME TO {DEFAULT_PARTITION}_spill")
+    cur.execute(
+        f"""
+        SELECT DISTINCT date_trunc('month', job_posted_date)::date FROM {DEFAULT_PARTITION}_spill
+        WHERE job_posted_date IS NOT NULL
+        """
+    )
+    created = create_partitions(cur, [month for (month,) in cur.fetchall()])
+    cur.execute(f"CREATE TABLE public.{DEFAULT_PARTITION} PARTITION OF public.{PARTITIONED_TABLE} DEFAULT")
+    cur.execute(f"INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {DEFAULT_PARTITION}_spill")
+    cur.execute(f"DROP TABLE {DEFAULT_PARTITION}_spill")
+    return created
+
+
+def detach_partitions(cur, before):
+    """Detach the monthly partitions of the months before the given month, return their names"""
+    detached = []
+    for month, name in sorted(monthly_partitions(cur).items()):
+        if month < before:
+            cur.execute(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {name}")
+            detached.append(name)
+    return detached
+
+
+def ensure_partitions(conn, ahead=DEFAULT_AHEAD, retain_months=None):
+    """Run the partition maintenance, return (created months, detached partitions) or None if unpartitioned"""
+    with conn.cursor() as cur:
+        if not is_partitioned(cur):
+            return None
+        created = split_default(cur)
+        newest = newest_month(cur) or date.today().replace(day=1)
+        created += create_partitions(cur, [add_months(newest, offset) for offset in range(ahead + 1)])
+
+        detached = []
+        if retain_months is not None:
+            detached = detach_partitions(cur, add_months(newest, -retain_months + 1))
+    return sorted(created), detached
+
+
+def table_definitions(cur, table):
+    """Return (plain index definitions, foreign key definitions) of a table"""
+    cur.execute(
+        """
+        SELECT pg_get_indexdef(indexrelid)
+        FROM pg_index
+        WHERE indrelid = %s::regclass AND NOT indisprimary
+        """,
+        (table,),
+    )
+    indexes = [definition for (definition,) in cur.fetchall()]
+    cur.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        (table,),
+    )
+    return indexes, cur.fetchall()
+
+
+def migrate(conn, ahead=DEFAULT_AHEAD):
+    """Convert job_postings_fact into monthly partitions in one transaction, return the months created"""
+    with conn.cursor() as cur:
+        if is_partitioned(cur):
+            raise RuntimeError(f"{PARTITIONED_TABLE} is already partitioned")
+        cur.execute(f"SELECT COUNT(*) FROM {PARTITIONED_TABLE} WHERE job_posted_date IS NULL")
+        undated = cur.fetchone()[0]
+        if undated:
+            raise RuntimeError(f"{undated} postings have no job_posted_date, which the partition key requires")
+
+        indexes, foreign_keys = table_definitions(cur, PARTITIONED_TABLE)
+
+        # Foreign keys pointing at job_id cannot survive: job_id alone is no longer unique
+        cur.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint WHERE confrelid = %s::regclass",
+            (PARTITIONED_TABLE,),
+        )
+        for table, name in cur.fetchall():
+            cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+
+        # The old table keeps its index and constraint names until it is dropped after the copy
+        cur.execute(f"ALTER TABLE {PARTITIONED_TABLE} RENAME TO {PARTITIONED_TABLE}_unpartitioned")
+
+        cur.execute(
+            f"""
+            CREATE TABLE public.{PARTITIONED_TABLE}
+            (LIKE public.{PARTITIONED_TABLE}_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (job_posted_date)
+            """
+        )
+        cur.execute(f"ALTER TABLE public.{PARTITIONED_TABLE} OWNER TO postgres")
+        cur.execute(f"CREATE TABLE public.{DEFAULT_PARTITION} PARTITION OF public.{PARTITIONED_TABLE} DEFAULT")
+
+        cur.execute(
+            f"""
+            SELECT DISTINCT date_trunc('month', job_posted_date)::date
+            FROM {PARTITIONED_TABLE}_unpartitioned
+            """
+        )
+        created = create_posting_partitions(cur, [month for (month,) in cur.fetchall()], ahead)
+
+        cur.execute(f"INSERT INTO {PARTITIONED_TABLE} SELECT * FROM {PARTITIONED_TABLE}_unpartitioned")
+        cur.execute(f"DROP TABLE {PARTITIONED_TABLE}_unpartitioned")
+
+        # Keys and indexes are built once per partition after the copy
+        cur.execute(
+            f"ALTER TABLE {PARTITIONED_TABLE} ADD CONSTRAINT {PARTITIONED_TABLE}_pkey PRIMARY KEY (job_id, job_posted_date)"
+        )
+        for definition in indexes + PARTITION_INDEXES:
+            cur.execute(definition)
+        for name, definition in foreign_keys:
+            cur.execute(f'ALTER TABLE {PARTITIONED_TABLE} ADD CONSTRAINT "{name}" {definition}')
+    return created
+
+
+def main():
+    """Main function to partition job_postings_fact or maintain its partitions"""
+    parser = argparse.ArgumentParser(description="Partition job_postings_fact by posting month")
+    parser.add_argument("command", choices=["migrate", "maintain"], help="convert the table or maintain its partitions")
+    parser.add_argument("--ahead", type=int, default=DEFAULT_AHEAD, help="months of partitions after the newest posting")
+    parser.add_argument("--retain-months", type=int, default=None, help="detach partitions older than this many months")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    args = parser.parse_args()
+
+    conn = connect(args.dsn)
+    try:
+        with conn:
+            if args.command == "migrate":
+                created, detached = migrate(conn, args.ahead), []
+            else:
+                result = ensure_partitions(conn, args.ahead, args.retain_months)
+                if result is None:
+                    print(f"{PARTITIONED_TABLE} is not partitioned, run the migrate command first")
+                    return
+                created, detached = result
+        # Statistics for the new partitions
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {PARTITIONED_TABLE}")
+    finally:
+        conn.close()
+
+    print(f"Created {len(created)} partitions" + (f" ({created[0]:%Y-%m} to {created[-1]:%Y-%m})" if created else ""))
+    for name in detached:
+        print(f"Detached {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Columnar Posting Store
+
+Answers ad-hoc group-bys over the postings in process, without a new SQL file
+or a database round trip. This script:
+1. build: streams job_postings_fact and skills_job_dim out of the database once
+   through COPY and encodes them column by column:
+   - text dimensions (job title, country, job_via, source website, schedule
+     type) as small integer codes into a sorted dictionary
+   - booleans as two bit-packed arrays (value and not-NULL)
+   - salaries as float32 with NaN for NULL
+   - the skills of every posting as CSR offsets into one skill_id array
+2. Saves every array as a .npy file in data/extracts/posting_store/ next to a
+   meta.json holding the dictionaries, so opening the store memory-maps the
+   arrays instead of reading them
+3. query: filters and groups on the codes with vectorized NumPy (bincount over
+   the combined group code), with the metrics of job_metrics.py
+
+Output: data/extracts/posting_store/*.npy and meta.json
+Usage: python python_pipeline/posting_store.py build [--store-dir DIR] [--dsn DSN]
+       python python_pipeline/posting_store.py query [--by job_title_short] [--metrics total_jobs remote]
+       [--where job_country=Germany job_work_from_home=true] [--since 2023-06-01] [--until 2023-07-01]
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.arrow_io import EXTRACT_DIR
+from python_pipeline.db import connect
+from python_pipeline.job_sources import has_source_column
+
+STORE_DIR = EXTRACT_DIR / "posting_store"
+META_NAME = "meta.json"
+
+# Dictionary-encoded text columns
+DIMENSIONS = ["job_title_short", "job_country", "job_via", "source_website", "job_schedule_type"]
+
+# Bit-packed nullable boolean columns
+FLAGS = ["job_work_from_home", "job_no_degree_mention", "job_health_insurance"]
+
+SALARIES = ["salary_year_avg", "salary_hour_avg"]
+
+# Grouping keys derived from job_posted_date, next to the dimensions
+DATE_PARTS = ["year", "month"]
+
+POSTINGS_SQL = """
+COPY (
+    SELECT job.job_id, job.company_id, job.job_posted_date, job.job_title_short, job.job_country, job.job_via,
+        {source} AS source_website, job.job_schedule_type, job.job_work_from_home, job.job_no_degree_mention,
+        job.job_health_insurance, job.salary_year_avg, job.salary_hour_avg
+    FROM job_postings_fact AS job
+        {source_join}
+    ORDER BY job.job_id
+) TO STDOUT WITH (FORMAT csv, HEADER true)
+"""
+
+SKILLS_SQL = "COPY (SELECT job_id, skill_id FROM skills_job_dim ORDER BY job_id, skill_id) TO STDOUT WITH (FORMAT csv)"
+
+# Metric -> (flag, value) counted, or a special aggregate; the names follow job_metrics.METRICS
+FLAG_METRICS = {
+    "no_degree": ("job_no_degree_mention", True),
+    "degree": ("job_no_degree_mention", False),
+    "health_insurance": ("job_health_insurance", True),
+    "no_health_insurance": ("job_health_insurance", False),
+    "remote": ("job_work_from_home", True),
+    "onsite": ("job_work_from_home", False),
+}
+METRICS = ["total_jobs", *FLAG_METRICS, "average_salary", "yearly_salary_jobs", "hourly_salary_jobs"]
+
+# Columns of query_results/job_analysis.csv
+DEFAULT_METRICS = [
+    "total_jobs", "no_degree", "degree", "health_insurance", "no_health_insurance", "average_salary", "remote",
+    "onsite",
+]
+
+
+def code_dtype(size):
+    """Smallest signed integer type holding the codes of a dictionary of size values and -1 for NULL"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def encode_dimension(values):
+    """Return (codes, sorted dictionary) of a text column, NULL coded as -1"""
+    categorical = pd.Categorical(values)
+    dictionary = categorical.categories.astype(str).tolist()
+    return categorical.codes.astype(code_dtype(len(dictionary))), dictionary
+
+
+def pack_flag(values):
+    """Return (packed value bits, packed not-NULL bits) of a nullable boolean column"""
+    valid = values.notna().to_numpy()
+    bits = values.fillna(False).to_numpy(dtype=bool)
+    return np.packbits(bits), np.packbits(valid)
+
+
+def read_postings(cur):
+    """Stream the postings through COPY into a DataFrame in job_id order"""
+    if has_source_column(cur):
+        source, source_join = "source.source_name", "LEFT JOIN source_dim AS source ON source.source_id = job.source_id"
+    else:
+        source, source_join = "NULL::text", ""
+    buffer = io.StringIO()
+    cur.copy_expert(POSTINGS_SQL.format(source=source, source_join=source_join), buffer)
+    buffer.seek(0)
+    return pd.read_csv(
+        buffer,
+        dtype={**{column: object for column in DIMENSIONS}, "company_id": "Int64"},
+        parse_dates=["job_posted_date"],
+        true_values=["t"],
+        false_values=["f"],
+        keep_default_na=False,
+        na_values={column: [""] for column in ["company_id", "job_posted_date", *DIMENSIONS, *FLAGS, *SALARIES]},
+    )
+
+
+def read_skill_links(cur, job_ids):
+    """Return (CSR offsets, skill_id array) of the skills of every posting, in job_ids order"""
+    buffer = io.StringIO()
+    cur.copy_expert(SKILLS_SQL, buffer)
+    buffer.seek(0)
+    links = pd.read_csv(buffer, names=["job_id", "skill_id"], dtype=np.int64)
+
+    rows = np.searchsorted(job_ids, links["job_id"].to_numpy())
+    known = (rows < len(job_ids)) & (job_ids[np.minimum(rows, len(job_ids) - 1)] == links["job_id"].to_numpy())
+    rows = rows[known]
+    skill_ids = links["skill_id"].to_numpy()[known]
+    offsets = np.zeros(len(job_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(job_ids)), out=offsets[1:])
+    return offsets, skill_ids.astype(code_dtype(int(skill_ids.max(initial=0)) + 1))
+
+
+def build_store(output_dir=STORE_DIR, dsn=None):
+    """Encode the postings and their skills into output_dir and return (rows, bytes, seconds)"""
+    output_dir = Path(output_dir)
+    start = time.perf_counter()
+
+    conn = connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            postings = read_postings(cur)
+            job_ids = postings["job_id"].to_numpy(dtype=np.int64)
+            offsets, skill_ids = read_skill_links(cur, job_ids)
+            cur.execute("SELECT skill_id, skills, type FROM skills_dim ORDER BY skill_id")
+            skills = cur.fetchall()
+    finally:
+        conn.close()
+
+    arrays = {
+        "job_id": job_ids.astype(np.int32),
+        "company_id": postings["company_id"].fillna(-1).to_numpy(dtype=np.int32),
+        "job_posted_date": postings["job_posted_date"].to_numpy(dtype="datetime64[s]"),
+        "skill_offsets": offsets,
+        "skill_ids": skill_ids,
+    }
+    dictionaries = {}
+    for column in DIMENSIONS:
+        arrays[column], dictionaries[column] = encode_dimension(postings[column])
+    for column in FLAGS:
+        arrays[column], arrays[f"{column}_valid"] = pack_flag(postings[column])
+    for column in SALARIES:
+        arrays[column] = postings[column].to_numpy(dtype=np.float32)
+
+    # Written next to the old store and swapped in, so a failed build leaves the old one intact
+    tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(tmp_dir / f"{name}.npy", array)
+    meta = {
+        "rows": len(postings),
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dictionaries": dictionaries,
+        "skills": [{"skill_id": skill_id, "skill": name, "type": kind} for skill_id, name, kind in skills],
+    }
+    (tmp_dir / META_NAME).write_text(json.dumps(meta) + "\n")
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+
+    size = sum(path.stat().st_size for path in output_dir.iterdir())
+    return len(postings), size, time.perf_counter() - start
+
+
+class PostingStore:
+    """Memory-mapped columnar postings with vectorized filters and group-bys"""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = Path(store_dir)
+        meta = json.loads((self.store_dir / META_NAME).read_text())
+        self.rows = meta["rows"]
+        self.built_at = meta["built_at"]
+        self.dictionaries = {column: np.array(values, dtype=object) for column, values in meta["dictionaries"].items()}
+        self.skills = pd.DataFrame(meta["skills"])
+        self._arrays = {}
+        self._decoded = {}
+
+    def array(self, name):
+        """One stored array, memory-mapped on first use"""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.store_dir / f"{name}.npy", mmap_mode="r")
+        return self._arrays[name]
+
+    def flag(self, column):
+        """Return (value, not-NULL) boolean arrays of a bit-packed flag column"""
+        if column not in self._decoded:
+            self._decoded[column] = (
+                np.unpackbits(self.array(column), count=self.rows).astype(bool),
+                np.unpackbits(self.array(f"{column}_valid"), count=self.rows).astype(bool),
+            )
+        return self._decoded[column]
+
+    def codes(self, column):
+        """Integer codes and dictionary of a grouping key (a dimension, year or month)"""
+        if column in self.dictionaries:
+            return self.array(column), self.dictionaries[column]
+        if column not in DATE_PARTS:
+            raise KeyError(f"Unknown column '{column}' (available: {', '.join([*DIMENSIONS, *DATE_PARTS])})")
+        if column not in self._decoded:
+            unit = "Y" if column == "year" else "M"
+            periods = self.array("job_posted_date").astype(f"datetime64[{unit}]")
+            # np.unique sorts NaT last, so dropping it leaves the other codes unchanged
+            values, codes = np.unique(periods, return_inverse=True)
+            values = values[~np.isnat(values)]
+            codes = np.where(np.isnat(periods), -1, codes)
+            labels = values.astype(int) + 1970 if unit == "Y" else values.astype("datetime64[D]").astype(date)
+            self._decoded[column] = codes, np.array(labels, dtype=object)
+        return self._decoded[column]
+
+    def mask(self, since=None, until=None, **equals):
+        """Boolean row mask: job_posted_date in [since, until) and column == value (or in a list) for each filter"""
+        keep = np.ones(self.rows, dtype=bool)
+        posted = self.array("job_posted_date")
+        if since is not None:
+            keep &= posted >= np.datetime64(date.fromisoformat(str(since)))
+        if until is not None:
+            keep &= posted < np.datetime64(date.fromisoformat(str(until)))
+        for column, value in equals.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if column in FLAGS:
+                bits, valid = self.flag(column)
+                keep &= valid & np.isin(bits, [bool(item) for item in values])
+                continue
+            codes, dictionary = self.codes(column)
+            wanted = np.flatnonzero(np.isin(dictionary, list(values)))
+            if not len(wanted):
+                raise KeyError(f"No {column} matches {', '.join(map(str, values))}")
+            keep &= np.isin(codes, wanted)
+        return keep
+
+    def group_by(self, by=("job_title_short",), metrics=DEFAULT_METRICS, mask=None):
+        """Compute metrics per combination of the by keys (NULL kept as a group), largest groups first"""
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            raise KeyError(f"Unknown metrics: {', '.join(unknown)} (available: {', '.join(METRICS)})")
+
+        # One combined code per row; NULL (-1) gets the last slot of its key
+        keys = [self.codes(column) for column in by]
+        shape = tuple(len(dictionary) + 1 for _, dictionary in keys)
+        combined = np.ravel_multi_index(
+            tuple(np.where(codes < 0, len(dictionary), codes) for codes, dictionary in keys), shape
+        ) if keys else np.zeros(self.rows, dtype=np.int64)
+        n_groups = int(np.prod(shape))
+        if mask is not None:
+            combined = combined[mask]
+
+        def select(values):
+            """Rows of a per-posting array that pass the mask"""
+            return values if mask is None else values[mask]
+
+        columns = {"total_jobs": np.bincount(combined, minlength=n_groups)}
+        for metric in metrics:
+            if metric in FLAG_METRICS:
+                column, wanted = FLAG_METRICS[metric]
+                bits, valid = self.flag(column)
+                hits = select(valid & (bits == wanted))
+                columns[metric] = np.bincount(combined, weights=hits, minlength=n_groups).astype(np.int64)
+        salary = select(np.asarray(self.array("salary_year_avg"), dtype=np.float64))
+        paid = ~np.isnan(salary)
+        salary_jobs = np.bincount(combined, weights=paid, minlength=n_groups)
+        if "yearly_salary_jobs" in metrics:
+            columns["yearly_salary_jobs"] = salary_jobs.astype(np.int64)
+        if "average_salary" in metrics:
+            sums = np.bincount(combined[paid], weights=salary[paid], minlength=n_groups)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                columns["average_salary"] = np.round(sums / salary_jobs, 0)
+        if "hourly_salary_jobs" in metrics:
+            hourly = ~np.isnan(select(self.array("salary_hour_avg")))
+            columns["hourly_salary_jobs"] = np.bincount(combined, weights=hourly, minlength=n_groups).astype(np.int64)
+
+        present = np.flatnonzero(columns["total_jobs"])
+        frame = pd.DataFrame({metric: columns[metric][present] for metric in metrics})
+        for position, (column, (_, dictionary)) in enumerate(zip(by, keys)):
+            index = np.unravel_index(present, shape)[position]
+            labels = np.append(dictionary, None)
+            frame.insert(position, column, labels[index])
+        order = np.argsort(-columns["total_jobs"][present], kind="stable")
+        return frame.iloc[order].reset_index(drop=True)
+
+    def skill_counts(self, by="job_title_short", mask=None):
+        """Group x skill posting counts (a DataFrame with one column per skill) through the CSR skill links"""
+        codes, dictionary = self.codes(by)
+        lengths = np.diff(self.array("skill_offsets"))
+        link_rows = np.repeat(np.arange(self.rows), lengths)
+        skill_ids = self.skills["skill_id"].to_numpy()
+        skill_columns = np.searchsorted(skill_ids, self.array("skill_ids"))
+        if mask is not None:
+            links = np.repeat(mask, lengths)
+            link_rows, skill_columns = link_rows[links], skill_columns[links]
+
+        group = np.where(codes < 0, len(dictionary), codes).astype(np.int64)[link_rows]
+        counts = np.bincount(
+            group * len(skill_ids) + skill_columns, minlength=(len(dictionary) + 1) * len(skill_ids)
+        ).reshape(len(dictionary) + 1, len(skill_ids))
+        frame = pd.DataFrame(counts, index=np.append(dictionary, None), columns=self.skills["skill"])
+        frame.index.name = by
+        return frame[frame.sum(axis=1) > 0]
+
+
+def parse_where(conditions):
+    """Turn ["column=value", ...] into mask() keyword arguments, typed like the column's dictionary"""
+    equals = {}
+    for condition in conditions:
+        column, _, value = condition.partition("=")
+        if column in FLAGS:
+            value = value.lower() in ("t", "true", "1", "yes")
+        elif column == "year":
+            value = int(value)
+        elif column == "month":
+            # 2023-07 or 2023-07-01, the month is labelled by its first day
+            value = date.fromisoformat(value[:7] + "-01")
+        equals.setdefault(column, []).append(value)
+    return equals
+
+
+def main():
+    """Main function to build or query the columnar posting store"""
+    parser = argparse.ArgumentParser(description="Build or query the in-process columnar posting store")
+    parser.add_argument("command", choices=["build", "query"])
+    parser.add_argument("--by", nargs="*", default=["job_title_short"], help="query: grouping keys")
+    parser.add_argument("--metrics", nargs="+", default=DEFAULT_METRICS, choices=METRICS, help="query: metrics")
+    parser.add_argument("--where", nargs="*", default=[], help="query: column=value filters")
+    parser.add_argument("--since", default=None, help="query: first posting date")
+    parser.add_argument("--until", default=None, help="query: posting date to stop before")
+    parser.add_argument("--store-dir", default=STORE_DIR, help="directory of the store")
+    parser.add_argument("--dsn", default=None, help="build: libpq connection string (default: $DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        rows, size, seconds = build_store(args.store_dir, args.dsn)
+        print(f"Stored {rows:,} postings in {size / 1024 / 1024:.1f} MB in {seconds:.2f}s")
+        return
+
+    store = PostingStore(args.store_dir)
+    start = time.perf_counter()
+    mask = store.mask(args.since, args.until, **parse_where(args.where))
+    frame = store.group_by(args.by, args.metrics, mask)
+    seconds = time.perf_counter() - start
+    print(frame.to_string(index=False))
+    print(f"\n{len(frame):,} groups in {seconds * 1000:.1f} ms (store built {store.built_at})")
+
+
+if __name__ == "__main__":
+    main()
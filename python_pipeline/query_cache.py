@@ -0,0 +1,196 @@
+"""
+Query Result Cache
+
+Content-addressed cache that sits in front of run_queries.py. Each result is
+keyed on:
+1. A hash of the normalized SQL text (comments and whitespace removed)
+2. A cheap fingerprint of every table the query references: the table's
+   filenode (changes on TRUNCATE), its insert/update/delete counters (those of
+   every partition for a partitioned table) and the maximum of its indexed key
+   columns such as job_id and job_posted_date
+
+Results are stored gzip-compressed under .cache/query_results/ next to a small
+JSON file holding the manifest entry. The least recently used results are
+evicted once the cache grows past its size limit.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+CACHE_DIR = Path(__file__).parent.parent / ".cache" / "query_results"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Columns whose maximum is part of a table's fingerprint
+FINGERPRINT_COLUMNS = {
+    "company_dim": ["company_id"],
+    "skills_dim": ["skill_id"],
+    "job_postings_fact": ["job_id", "job_posted_date"],
+    "skills_job_dim": ["job_id"],
+    "source_dim": ["source_id"],
+    "job_title_category": ["job_title_short"],
+    "posting_cube": ["posting_month"],
+    "company_cube": ["company_id"],
+}
+
+SQL_TOKEN = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"[^\"]*\"|\s+", re.DOTALL)
+
+
+def normalize_sql(sql):
+    """Drop comments and collapse whitespace outside of quoted literals"""
+
+    def replace(match):
+        token = match.group(0)
+        if token.startswith(("--", "/*")) or token.isspace():
+            return " "
+        return token
+
+    return " ".join(SQL_TOKEN.sub(replace, sql).split())
+
+
+def referenced_tables(sql, known_tables):
+    """Return the known tables whose names appear in the normalized SQL"""
+    words = set(re.findall(r"\w+", normalize_sql(sql).lower()))
+    return sorted(table for table in known_tables if table in words)
+
+
+def list_tables(cur):
+    """Return the names of the ordinary and partitioned tables on the search path"""
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_class AS c
+        WHERE c.relkind IN ('r', 'p') AND pg_table_is_visible(c.oid)
+        """
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def leading_index_columns(cur, table):
+    """Return the columns that lead a valid B-tree index of the table"""
+    cur.execute(
+        """
+        SELECT a.attname
+        FROM pg_index AS i
+        JOIN pg_class AS ic ON ic.oid = i.indexrelid
+        JOIN pg_am AS am ON am.oid = ic.relam
+        JOIN pg_attribute AS a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = %s::regclass AND i.indisvalid AND am.amname = 'btree'
+        """,
+        (table,),
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def table_fingerprint(cur, table):
+    """Return a cheap, JSON-serializable fingerprint of one table"""
+    # The statistics counters catch any write, the column maximums guard against a stats reset
+    # and against counters another session has not flushed yet. Drop this transaction's stats
+    # snapshot first, or the counters read earlier in it are returned again.
+    cur.execute("SELECT pg_stat_clear_snapshot()")
+    # A partitioned table has no storage of its own, so its partitions are fingerprinted instead;
+    # pg_partition_tree() returns nothing for an ordinary table, which is fingerprinted as is.
+    cur.execute(
+        """
+        SELECT pg_relation_filenode(rel.relid), s.n_tup_ins, s.n_tup_upd, s.n_tup_del
+        FROM (
+            SELECT relid FROM pg_partition_tree(%(table)s::regclass) WHERE isleaf
+            UNION
+            SELECT oid FROM pg_class WHERE oid = %(table)s::regclass AND relkind <> 'p'
+        ) AS rel
+        LEFT JOIN pg_stat_user_tables AS s ON s.relid = rel.relid
+        ORDER BY rel.relid
+        """,
+        {"table": table},
+    )
+    fingerprint = [str(value) for row in cur.fetchall() for value in row]
+
+    # Only an index makes MAX() a single descent instead of a full scan
+    indexed = leading_index_columns(cur, table)
+    columns = [column for column in FINGERPRINT_COLUMNS.get(table, []) if column in indexed]
+    if columns:
+        cur.execute(f"SELECT {', '.join(f'MAX({column})' for column in columns)} FROM {table}")
+        fingerprint.extend(str(value) for value in cur.fetchone())
+    return fingerprint
+
+
+class ResultCache:
+    """Gzip-compressed, LRU-evicted store of query result CSVs"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._fingerprints = {}
+        self._known_tables = None
+
+    def key(self, cur, sql):
+        """Return the cache key for sql against the current table contents"""
+        if self._known_tables is None:
+            self._known_tables = list_tables(cur)
+
+        # Fingerprints are computed once per table for the lifetime of the cache object
+        tables = referenced_tables(sql, self._known_tables)
+        for table in tables:
+            if table not in self._fingerprints:
+                self._fingerprints[table] = table_fingerprint(cur, table)
+
+        payload = json.dumps(
+            {"sql": normalize_sql(sql), "tables": {table: self._fingerprints[table] for table in tables}},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return self.cache_dir / f"{key}.csv.gz", self.cache_dir / f"{key}.json"
+
+    def get(self, key, output_path):
+        """Decompress a cached result to output_path and return its entry, or None on a miss"""
+        data_path, meta_path = self._paths(key)
+        if not (data_path.exists() and meta_path.exists()):
+            return None
+
+        tmp_path = Path(f"{output_path}.tmp")
+        with gzip.open(data_path, "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, output_path)
+
+        # Touch both files so eviction sees them as recently used
+        os.utime(data_path)
+        os.utime(meta_path)
+        return json.loads(meta_path.read_text())
+
+    def put(self, key, csv_path, entry):
+        """Compress csv_path into the cache under key, then evict down to max_bytes"""
+        data_path, meta_path = self._paths(key)
+        tmp_path = Path(f"{data_path}.tmp")
+        with open(csv_path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, data_path)
+        meta_path.write_text(json.dumps(entry, indent=2) + "\n")
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used results until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for data_path in self.cache_dir.glob("*.csv.gz"):
+            stat = data_path.stat()
+            entries.append((stat.st_mtime, stat.st_size, data_path))
+            total += stat.st_size
+
+        for _, size, data_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            data_path.unlink(missing_ok=True)
+            data_path.with_name(data_path.name.replace(".csv.gz", ".json")).unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Remove every cached result"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,228 @@
+"""
+Query Plan Capture
+
+This script records how every named analysis query in sql_queries/*.sql is
+executed, so a query that got slow can be traced to its plan:
+1. Runs EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) for each query against the
+   database of $DATABASE_URL
+2. Summarizes each plan: wall time, server execution and planning time, rows
+   returned, shared-buffer hits and reads, the sequential scans (relation, rows
+   read, filter) and the keys the hash joins and hash aggregates hash on
+3. Writes the full plans to benchmarks/plans/<result>.json and appends the
+   summaries to benchmarks/plans.jsonl
+4. Compares every query with the previous capture of the same database and
+   flags changed plans, new sequential scans and execution time or buffer
+   regressions
+
+EXPLAIN ANALYZE executes each query once; the result rows are discarded.
+
+Output: benchmarks/plans.jsonl and benchmarks/plans/<result>.json
+Usage: python python_pipeline/query_plans.py [result ...] [--threshold 0.25] [--dsn DSN]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.benchmark import (
+    DEFAULT_THRESHOLD,
+    append_history,
+    git_revision,
+    load_history,
+    rows_scanned,
+)
+from python_pipeline.db import SQL_QUERIES_DIR, connect
+from python_pipeline.run_queries import select_queries
+
+PLANS_LOG = PROJECT_ROOT / "benchmarks" / "plans.jsonl"
+PLANS_DIR = PROJECT_ROOT / "benchmarks" / "plans"
+
+EXPLAIN_SQL = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"
+
+# Slowdowns smaller than this are timer noise, whatever their relative size
+MIN_REGRESSION_MS = 5.0
+
+# Plan node attributes naming what a node hashes on
+HASH_KEYS = {"Hash Join": "Hash Cond", "Aggregate": "Group Key", "SetOp": "Group Key"}
+
+
+def plan_nodes(plan):
+    """Yield every node of an EXPLAIN plan tree, parents first"""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def plan_shape(plan):
+    """Node types, relations and indexes of a plan tree, without any estimate or timing"""
+    label = plan["Node Type"]
+    if plan.get("Strategy") and plan["Strategy"] != "Plain":
+        label = f"{plan['Strategy']} {label}"
+    target = plan.get("Index Name") or plan.get("Relation Name")
+    if target:
+        label = f"{label} on {target}"
+    children = plan.get("Plans", [])
+    if children:
+        label += "(" + ", ".join(plan_shape(child) for child in children) + ")"
+    return label
+
+
+def seq_scans(plan):
+    """Relation, rows read and filter of every sequential scan in the plan"""
+    return [
+        {
+            "relation": node.get("Relation Name"),
+            "rows_scanned": rows_scanned({**node, "Plans": []}),
+            "filter": node.get("Filter"),
+        }
+        for node in plan_nodes(plan)
+        if node["Node Type"] == "Seq Scan"
+    ]
+
+
+def hash_keys(plan):
+    """What each hash join and hash aggregate of the plan hashes on"""
+    keys = []
+    for node in plan_nodes(plan):
+        attribute = HASH_KEYS.get(node["Node Type"])
+        if attribute is None or (node["Node Type"] != "Hash Join" and node.get("Strategy") != "Hashed"):
+            continue
+        key = node.get(attribute)
+        keys.append(f"{node['Node Type']}: {', '.join(key) if isinstance(key, list) else key}")
+    return keys
+
+
+def summarize_plan(explain, wall_seconds):
+    """Condense the output of EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) into a log record"""
+    plan = explain["Plan"]
+    shape = plan_shape(plan)
+    planning = explain.get("Planning", {})
+    return {
+        "wall_seconds": round(wall_seconds, 4),
+        "execution_ms": round(explain["Execution Time"], 3),
+        "planning_ms": round(explain["Planning Time"], 3),
+        "rows": int(plan["Actual Rows"] * plan["Actual Loops"]),
+        "rows_scanned": rows_scanned(plan),
+        "shared_hit_blocks": plan.get("Shared Hit Blocks", 0) + planning.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": plan.get("Shared Read Blocks", 0) + planning.get("Shared Read Blocks", 0),
+        "temp_written_blocks": plan.get("Temp Written Blocks", 0),
+        "seq_scans": seq_scans(plan),
+        "hash_keys": hash_keys(plan),
+        "plan_hash": hashlib.sha1(shape.encode("utf-8")).hexdigest()[:12],
+        "plan_shape": shape,
+    }
+
+
+def capture_plan(cur, query):
+    """Run EXPLAIN ANALYZE for one named query and return (full plan, summary)"""
+    start = time.perf_counter()
+    cur.execute(EXPLAIN_SQL.format(sql=query.sql))
+    explain = cur.fetchone()[0][0]
+    return explain, summarize_plan(explain, time.perf_counter() - start)
+
+
+def capture_plans(names=None, dsn=None, sql_dir=SQL_QUERIES_DIR, plans_dir=PLANS_DIR):
+    """Capture the plan of every selected query and return the log record of the run"""
+    plans_dir = Path(plans_dir)
+    plans_dir.mkdir(parents=True, exist_ok=True)
+
+    conn = connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT current_database(), current_setting('server_version')")
+            database, server_version = cur.fetchone()
+            run = {
+                "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                **git_revision(),
+                "database": database,
+                "server_version": server_version,
+                "queries": {},
+            }
+            for query in select_queries(names, sql_dir):
+                explain, summary = capture_plan(cur, query)
+                (plans_dir / f"{query.name}.json").write_text(json.dumps(explain, indent=2) + "\n")
+                run["queries"][query.name] = dict(summary, source=query.source)
+    finally:
+        conn.close()
+    return run
+
+
+def find_baseline(history, database, name):
+    """Most recent capture of the query name on database, None when there is none"""
+    for run in reversed(history):
+        if run.get("database") == database and name in run["queries"]:
+            return run["queries"][name]
+    return None
+
+
+def compare_plans(run, history, threshold=DEFAULT_THRESHOLD):
+    """Return (query, flag, before, after) for every plan change and regression against the baseline"""
+    flags = []
+    for name, current in run["queries"].items():
+        before = find_baseline(history, run["database"], name)
+        if before is None:
+            continue
+        if current["plan_hash"] != before["plan_hash"]:
+            flags.append((name, "plan changed", before["plan_shape"], current["plan_shape"]))
+
+        new_scans = {scan["relation"] for scan in current["seq_scans"]} - {scan["relation"] for scan in before["seq_scans"]}
+        if new_scans:
+            flags.append((name, "new seq scan", "", ", ".join(sorted(new_scans))))
+
+        slower = current["execution_ms"] - before["execution_ms"]
+        if slower > MIN_REGRESSION_MS and current["execution_ms"] > before["execution_ms"] * (1 + threshold):
+            flags.append((name, "slower", f"{before['execution_ms']:.1f} ms", f"{current['execution_ms']:.1f} ms"))
+
+        blocks_before = before["shared_hit_blocks"] + before["shared_read_blocks"]
+        blocks_after = current["shared_hit_blocks"] + current["shared_read_blocks"]
+        if blocks_after > blocks_before * (1 + threshold):
+            flags.append((name, "more buffers", f"{blocks_before:,} blocks", f"{blocks_after:,} blocks"))
+    return flags
+
+
+def print_report(run):
+    """Print one line per query, followed by its sequential scans and hash keys"""
+    for name, item in run["queries"].items():
+        print(f"{name:<20} {item['execution_ms']:10.1f} ms {item['rows']:>10,} rows "
+              f"{item['shared_hit_blocks']:>10,} hit {item['shared_read_blocks']:>10,} read  plan {item['plan_hash']}")
+        for scan in item["seq_scans"]:
+            where = f" where {scan['filter']}" if scan["filter"] else ""
+            print(f"    seq scan {scan['relation']} ({scan['rows_scanned']:,} rows){where}")
+        for key in item["hash_keys"]:
+            print(f"    {key}")
+
+
+def main():
+    """Main function to capture the query plans and flag regressions"""
+    parser = argparse.ArgumentParser(description="Capture EXPLAIN ANALYZE plans of the named queries")
+    parser.add_argument("names", nargs="*", help="queries to capture (default: all)")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative execution time or buffer increase reported as a regression")
+    parser.add_argument("--log", default=PLANS_LOG, help="JSON lines file the capture is appended to")
+    parser.add_argument("--plans-dir", default=PLANS_DIR, help="directory for the full JSON plans")
+    args = parser.parse_args()
+
+    history = load_history(args.log)
+    run = capture_plans(args.names, args.dsn, plans_dir=args.plans_dir)
+    append_history(run, args.log)
+    print_report(run)
+
+    flags = compare_plans(run, history, args.threshold)
+    if any(find_baseline(history, run["database"], name) for name in run["queries"]):
+        print(f"\n{len(flags)} plan changes and regressions against the previous capture of {run['database']}")
+    for name, flag, before, after in flags:
+        print(f"  {name:<20} {flag:<13} {before} -> {after}" if before else f"  {name:<20} {flag:<13} {after}")
+
+
+if __name__ == "__main__":
+    main()
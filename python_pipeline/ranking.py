@@ -0,0 +1,198 @@
+"""
+Top-k Ranking Engine
+
+Per-group leaderboards (the top skills of every job title, the top companies of
+every job category, the top source websites of every country) computed without
+sorting whole groups or looping over them in Python:
+1. top_k_matrix ranks every row of a dense group x item matrix at once with a
+   partial selection (np.partition), only the k selected values are sorted
+2. top_k_long ranks a long (group, item, value) frame with one lexsort, so
+   thousands of groups over tens of thousands of items never become a dense matrix
+   (top_k_indices does the same on integer group and item index arrays)
+3. top_k_sql wraps any grouped query in ROW_NUMBER() OVER (PARTITION BY ...) so
+   a large grouping is ranked in the database and only the top k rows per group
+   leave it
+
+Ties are ordered by column position (top_k_matrix) or by item name
+(top_k_long, top_k_sql), so the ranks equal those of a full stable sort.
+
+Output: query_results/top_<ranking>.csv
+Usage: python python_pipeline/ranking.py [title_skill category_company country_source] [--k 10]
+       [--engine sql|numpy] [--dsn DSN]
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import RESULTS_DIR, connect
+from python_pipeline.run_queries import update_manifest
+
+DEFAULT_K = 10
+
+# Ranking -> grouped query returning (group, item, value) rows, each (group, item) once
+RANKINGS = {
+    "title_skill": """
+        SELECT job.job_title_short AS job_title, skills.skills AS skill, COUNT(*) AS postings
+        FROM job_postings_fact AS job
+            INNER JOIN skills_job_dim AS link ON link.job_id = job.job_id
+            INNER JOIN skills_dim AS skills ON skills.skill_id = link.skill_id
+        GROUP BY job.job_title_short, skills.skills
+    """,
+    "category_company": """
+        SELECT category.category AS job_category, comp.name AS company, SUM(cube.postings)::bigint AS postings
+        FROM company_cube AS cube
+            INNER JOIN job_title_category AS map ON map.job_title_short = cube.job_title_short
+            INNER JOIN job_category_dim AS category ON category.job_category_id = map.job_category_id
+            INNER JOIN company_dim AS comp ON comp.company_id = cube.company_id
+        GROUP BY category.category, comp.name
+    """,
+    "country_source": """
+        SELECT cube.job_country, source.source_name AS source_website, SUM(cube.postings)::bigint AS postings
+        FROM posting_cube AS cube
+            INNER JOIN source_dim AS source ON source.source_id = cube.source_id
+        GROUP BY cube.job_country, source.source_name
+    """,
+}
+
+TOP_K_SQL = """
+SELECT {group}, rank, {item}, {value}
+FROM (
+    SELECT
+        grouped.*,
+        ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY {value} DESC, {item} COLLATE "C") AS rank
+    FROM ({sql}) AS grouped
+) AS ranked
+WHERE rank <= {k}
+ORDER BY {group}, rank
+"""
+
+
+def top_k_matrix(values, k):
+    """Return (column indices, values) of the k largest values of every row, largest first"""
+    values = np.asarray(values)
+    n_rows, n_columns = values.shape
+    k = min(k, n_columns)
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.int64), values[:, :0]
+
+    # Every value above a row's k-th largest is in its top k; the remaining places go to
+    # the leftmost values equal to it, which is the tie order of a stable sort
+    kth = np.partition(values, n_columns - k, axis=1)[:, n_columns - k : n_columns - k + 1]
+    above = values > kth
+    ties = values == kth
+    places = k - above.sum(axis=1, keepdims=True)
+    selected = above | (ties & (np.cumsum(ties, axis=1) <= places))
+
+    columns = np.nonzero(selected)[1].reshape(n_rows, k)
+    top = np.take_along_axis(values, columns, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    return np.take_along_axis(columns, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+def top_k_rows(frame, column, k):
+    """The k rows of frame with the largest column values, like DataFrame.nlargest(k, column)"""
+    rows, _ = top_k_matrix(frame[column].to_numpy()[np.newaxis, :], k)
+    return frame.iloc[rows[0]]
+
+
+def top_k_indices(group_idx, item_idx, values, k):
+    """Return (positions, ranks from 1) of the top k entries of every group, in group and rank order"""
+    # lexsort sorts by its last key first: group, then value descending, then item
+    order = np.lexsort((item_idx, -values, group_idx))
+    sorted_groups = group_idx[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    ranks = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return order[ranks < k], ranks[ranks < k] + 1
+
+
+def top_k_long(frame, group, item, value, k):
+    """Rank a long (group, item, value) frame and keep the top k items of every group"""
+    groups = frame[group].to_numpy()
+    _, group_idx = np.unique(groups.astype(str), return_inverse=True)
+    _, item_idx = np.unique(frame[item].to_numpy().astype(str), return_inverse=True)
+
+    keep, ranks = top_k_indices(group_idx, item_idx, frame[value].to_numpy(), k)
+    ranked = frame.iloc[keep][[group, item, value]].reset_index(drop=True)
+    ranked.insert(1, "rank", ranks)
+    return ranked
+
+
+def top_k_sql(sql, group, item, value, k):
+    """Wrap a grouped query so the database returns only the top k items of every group"""
+    return TOP_K_SQL.format(sql=sql, group=group, item=item, value=value, k=int(k))
+
+
+def run_ranking(cur, name, k=DEFAULT_K, engine="sql"):
+    """Return the top k ranking name as a (group, rank, item, value) DataFrame"""
+    if name not in RANKINGS:
+        raise KeyError(f"Unknown ranking '{name}' (available: {', '.join(RANKINGS)})")
+    cur.execute(f"SELECT * FROM ({RANKINGS[name]}) AS grouped LIMIT 0")
+    group, item, value = [column.name for column in cur.description]
+
+    if engine == "sql":
+        cur.execute(top_k_sql(RANKINGS[name], group, item, value, k))
+        return pd.DataFrame(cur.fetchall(), columns=[group, "rank", item, value])
+    if engine == "numpy":
+        cur.execute(RANKINGS[name])
+        grouped = pd.DataFrame(cur.fetchall(), columns=[group, item, value])
+        return top_k_long(grouped, group, item, value, k)
+    raise ValueError(f"Unknown engine '{engine}' (available: sql, numpy)")
+
+
+def build_rankings(names=None, k=DEFAULT_K, engine="sql", dsn=None, output_dir=RESULTS_DIR):
+    """Write query_results/top_<ranking>.csv for every selected ranking and return their manifest entries"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    entries = {}
+    conn = connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            for name in names or list(RANKINGS):
+                start = time.perf_counter()
+                ranked = run_ranking(cur, name, k, engine)
+                path = output_dir / f"top_{name}.csv"
+                ranked.to_csv(path, index=False)
+                entries[f"top_{name}"] = {
+                    "source": "ranking.py",
+                    "file": path.name,
+                    "rows": len(ranked),
+                    "bytes": path.stat().st_size,
+                    "seconds": round(time.perf_counter() - start, 3),
+                    "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                }
+    finally:
+        conn.close()
+
+    update_manifest(output_dir, entries)
+    return entries
+
+
+def main():
+    """Main function to write the per-group leaderboards"""
+    parser = argparse.ArgumentParser(description="Write the top k items of every group for each ranking")
+    parser.add_argument("names", nargs="*", help=f"rankings to write: {', '.join(RANKINGS)} (default: all)")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="items kept per group")
+    parser.add_argument("--engine", choices=["sql", "numpy"], default="sql",
+                        help="rank with window functions in the database or with NumPy in this process")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="directory for the CSV files and manifest")
+    args = parser.parse_args()
+
+    entries = build_rankings(args.names, args.k, args.engine, args.dsn, args.output_dir)
+    for name, entry in entries.items():
+        print(f"{name:<24} {entry['rows']:>10,} rows {entry['bytes']:>12,} bytes {entry['seconds']:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Query Runner Script
+
+This script regenerates query_results/*.csv straight from sql_queries/*.sql:
+1. Parses the result queries marked with a "-- name: <result>" comment
+2. Streams each result through COPY (...) TO STDOUT directly into
+   query_results/<result>.csv, so no result is ever held in Python memory
+3. Writes query_results/manifest.json with rows, bytes and elapsed time per query
+4. Rebuilds the results derived client-side from a query, such as skill.csv and
+   skill_type.csv from skill_demand
+5. With --arrow, also writes every result as a typed, uncompressed Arrow IPC file
+   (query_results/<result>.arrow) that the plotting scripts memory-map
+
+Results are served from the cache in query_cache.py when neither the SQL nor
+the tables it reads have changed since the last run (disable with --no-cache).
+
+Input: sql_queries/*.sql
+Output: query_results/<result>.csv (and .arrow) and query_results/manifest.json
+Usage: python python_pipeline/run_queries.py [result ...] [--dsn DSN] [--no-cache] [--arrow]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.arrow_io import csv_to_arrow, query_schema
+from python_pipeline.db import RESULTS_DIR, SQL_QUERIES_DIR, connect
+from python_pipeline.query_cache import CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache
+from python_pipeline.skill_demand import build_skill_outputs
+
+# Results computed in Python from a query result, keyed on that query
+DERIVED_RESULTS = {
+    "skill_demand": build_skill_outputs,
+}
+
+NamedQuery = namedtuple("NamedQuery", ["name", "source", "sql"])
+
+NAME_MARKER = re.compile(r"^--\s*name:\s*(\w+)\s*$", re.MULTILINE)
+
+# pgAdmin exports quote every field, FORCE_QUOTE keeps the data rows in the same shape
+COPY_TO_SQL = "COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true, FORCE_QUOTE *)"
+
+MANIFEST_NAME = "manifest.json"
+
+
+def first_statement(text):
+    """Return text up to the first semicolon outside quotes and comments"""
+    i, n = 0, len(text)
+    while i < n:
+        if text.startswith("--", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end + 1
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+        elif text[i] in ("'", '"'):
+            end = text.find(text[i], i + 1)
+            i = n if end == -1 else end + 1
+        elif text[i] == ";":
+            return text[:i].strip()
+        else:
+            i += 1
+    return text.strip()
+
+
+def parse_named_queries(sql_dir=SQL_QUERIES_DIR):
+    """Return {name: NamedQuery} for every "-- name:" marker in sql_dir/*.sql"""
+    queries = {}
+    for path in sorted(Path(sql_dir).glob("*.sql")):
+        text = path.read_text(encoding="utf-8")
+        for match in NAME_MARKER.finditer(text):
+            name = match.group(1)
+            if name in queries:
+                raise ValueError(f"Query '{name}' is defined in both {queries[name].source} and {path.name}")
+            queries[name] = NamedQuery(name, path.name, first_statement(text[match.end():]))
+    return queries
+
+
+class CountingWriter:
+    """Binary file wrapper that counts the bytes written through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.raw.write(data)
+
+
+def stream_query(cur, query, output_path):
+    """Stream one query result to output_path and return its manifest entry"""
+    output_path = Path(output_path)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    start = time.perf_counter()
+
+    # Write to a temporary file first so a failed query never leaves a truncated CSV
+    with open(tmp_path, "wb") as raw:
+        writer = CountingWriter(raw)
+        cur.copy_expert(COPY_TO_SQL.format(sql=query.sql), writer)
+    os.replace(tmp_path, output_path)
+
+    return {
+        "source": query.source,
+        "file": output_path.name,
+        "rows": cur.rowcount,
+        "bytes": writer.bytes_written,
+        "seconds": round(time.perf_counter() - start, 3),
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def update_manifest(output_dir, entries):
+    """Merge entries into output_dir/manifest.json, keeping results that were not rerun"""
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    manifest.update(entries)
+    manifest_path.write_text(json.dumps(dict(sorted(manifest.items())), indent=2) + "\n")
+    return manifest
+
+
+def select_queries(names=None, sql_dir=SQL_QUERIES_DIR):
+    """Return the named queries to run, all of them when names is empty"""
+    queries = parse_named_queries(sql_dir)
+    if not names:
+        return list(queries.values())
+    unknown = [name for name in names if name not in queries]
+    if unknown:
+        raise KeyError(f"Unknown queries: {', '.join(unknown)} (available: {', '.join(queries)})")
+    return [queries[name] for name in names]
+
+
+def run_cached_query(cur, query, output_path, cache=None):
+    """Serve one query from the cache when possible, otherwise stream it and cache the result"""
+    if cache is None:
+        return stream_query(cur, query, output_path)
+
+    start = time.perf_counter()
+    key = cache.key(cur, query.sql)
+    entry = cache.get(key, output_path)
+    if entry is not None:
+        return dict(entry, seconds=round(time.perf_counter() - start, 3), cached=True)
+
+    entry = stream_query(cur, query, output_path)
+    cache.put(key, output_path, entry)
+    return dict(entry, cached=False)
+
+
+def run_queries(names=None, dsn=None, output_dir=RESULTS_DIR, sql_dir=SQL_QUERIES_DIR, cache=None, arrow=False):
+    """Run the selected queries one after another and return their manifest entries"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    entries = {}
+    conn = connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for query in select_queries(names, sql_dir):
+                output_path = output_dir / f"{query.name}.csv"
+                entries[query.name] = run_cached_query(cur, query, output_path, cache)
+                if arrow:
+                    # Typed with the result's column types, also for results served from the cache
+                    entries[query.name]["arrow_file"] = csv_to_arrow(output_path, query_schema(cur, query.sql)).name
+                else:
+                    # An Arrow file left from an earlier run would shadow the new CSV in the plotting scripts
+                    output_path.with_suffix(".arrow").unlink(missing_ok=True)
+    finally:
+        conn.close()
+
+    for name in list(entries):
+        if name in DERIVED_RESULTS:
+            entries.update(DERIVED_RESULTS[name](output_dir / f"{name}.csv", output_dir, arrow=arrow))
+
+    update_manifest(output_dir, entries)
+    return entries
+
+
+def print_report(entries):
+    """Print one line per regenerated result"""
+    for name, entry in entries.items():
+        source = " (cached)" if entry.get("cached") else ""
+        print(f"{name:<20} {entry['rows']:>10,} rows {entry['bytes']:>12,} bytes {entry['seconds']:8.2f}s{source}")
+
+
+def main():
+    """Main function to regenerate the query results"""
+    parser = argparse.ArgumentParser(description="Regenerate query_results/*.csv from sql_queries/*.sql")
+    parser.add_argument("names", nargs="*", help="results to regenerate (default: all)")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="directory for the CSV files and manifest")
+    parser.add_argument("--no-cache", action="store_true", help="always rerun the queries against the database")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="directory for the compressed result cache")
+    parser.add_argument("--arrow", action="store_true", help="also write typed Arrow IPC files for the plotting scripts")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="cache size limit")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    print_report(run_queries(args.names, args.dsn, args.output_dir, cache=cache, arrow=args.arrow))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Concurrent Query Runner
+
+Regenerates the same query_results/*.csv files as run_queries.py, but runs the
+result queries concurrently instead of one after another. The queries do not
+depend on each other, so a full refresh takes about as long as the slowest
+query instead of the sum of all of them. It:
+1. Serves the queries whose SQL and tables are unchanged from the result cache
+   (query_cache.py), like run_queries.py
+2. Runs the rest on an asyncpg connection pool of at most --parallel
+   connections, each result streamed through COPY (...) TO STDOUT into
+   query_results/<result>.csv as soon as its query runs
+3. Cancels a query on the server once it runs longer than --timeout seconds and
+   retries transient errors (lost connections, deadlocks, serialization
+   failures, too many connections) with exponential backoff
+4. Reports each result as it completes, then rebuilds the derived results and
+   query_results/manifest.json
+
+A query that still fails leaves its previous CSV untouched; the other results
+are written and recorded before the error is raised.
+
+Input: sql_queries/*.sql
+Output: query_results/<result>.csv (and .arrow) and query_results/manifest.json
+Usage: python python_pipeline/run_queries_async.py [result ...] [--parallel 8] [--timeout 300] [--retries 3]
+       [--dsn DSN] [--no-cache] [--arrow]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import asyncpg
+from psycopg2.extensions import parse_dsn
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.arrow_io import csv_to_arrow, query_schema
+from python_pipeline.db import RESULTS_DIR, SQL_QUERIES_DIR, connect, get_dsn
+from python_pipeline.query_cache import CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache
+from python_pipeline.run_queries import DERIVED_RESULTS, print_report, select_queries, update_manifest
+
+DEFAULT_PARALLEL = 8
+DEFAULT_TIMEOUT = 300.0
+DEFAULT_RETRIES = 3
+
+# Seconds before the first retry, doubled for every further one
+RETRY_DELAY = 0.5
+
+# Errors after which the same query is expected to succeed when simply run again
+TRANSIENT_ERRORS = (
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.ConnectionDoesNotExistError,
+    asyncpg.exceptions.TooManyConnectionsError,
+    asyncpg.exceptions.CannotConnectNowError,
+    asyncpg.exceptions.DeadlockDetectedError,
+    asyncpg.exceptions.SerializationError,
+    ConnectionError,
+)
+
+# libpq keyword -> asyncpg.connect argument
+CONNECT_ARGUMENTS = {
+    "host": "host",
+    "port": "port",
+    "user": "user",
+    "password": "password",
+    "dbname": "database",
+    "sslmode": "ssl",
+}
+
+
+def connect_arguments(dsn=None):
+    """Translate a libpq connection string (keyword/value or URI) into asyncpg.connect arguments"""
+    params = parse_dsn(get_dsn(dsn))
+    return {CONNECT_ARGUMENTS[key]: value for key, value in params.items() if key in CONNECT_ARGUMENTS}
+
+
+async def copy_query(pool, query, output_path, timeout):
+    """Stream one query result to output_path through a pooled connection and return its manifest entry"""
+    output_path = Path(output_path)
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    start = time.perf_counter()
+
+    # Write to a temporary file first so a failed or cancelled query never leaves a truncated CSV
+    try:
+        async with pool.acquire() as conn:
+            # asyncpg cancels the statement on the server when the timeout expires
+            status = await conn.copy_from_query(
+                query.sql, output=tmp_path, format="csv", header=True, force_quote=True, timeout=timeout
+            )
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return {
+        "source": query.source,
+        "file": output_path.name,
+        "rows": int(status.split()[-1]),
+        "bytes": output_path.stat().st_size,
+        "seconds": round(time.perf_counter() - start, 3),
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+async def run_with_retries(pool, query, output_path, timeout, retries):
+    """Run copy_query, retrying transient errors with exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            return await copy_query(pool, query, output_path, timeout)
+        except TRANSIENT_ERRORS:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(RETRY_DELAY * 2**attempt)
+
+
+async def run_concurrently(queries, dsn, output_dir, parallel, timeout, retries, on_result=None):
+    """Run queries on a pool of at most parallel connections, return ({name: entry}, {name: error})"""
+    entries, errors = {}, {}
+    if not queries:
+        return entries, errors
+
+    pool = await asyncpg.create_pool(min_size=1, max_size=min(parallel, len(queries)), **connect_arguments(dsn))
+
+    async def run_one(query):
+        try:
+            return query.name, await run_with_retries(pool, query, output_dir / f"{query.name}.csv", timeout, retries)
+        except asyncio.TimeoutError:
+            return query.name, TimeoutError(f"cancelled after {timeout:g}s")
+        except (asyncpg.PostgresError, OSError) as error:
+            return query.name, error
+
+    try:
+        for result in asyncio.as_completed([run_one(query) for query in queries]):
+            name, outcome = await result
+            if isinstance(outcome, BaseException):
+                errors[name] = outcome
+                continue
+            entries[name] = dict(outcome, cached=False)
+            if on_result is not None:
+                on_result(name, entries[name])
+    finally:
+        await pool.close()
+    return entries, errors
+
+
+def run_queries_async(names=None, dsn=None, output_dir=RESULTS_DIR, sql_dir=SQL_QUERIES_DIR, cache=None, arrow=False,
+                      parallel=DEFAULT_PARALLEL, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, on_result=None):
+    """Run the selected queries concurrently and return their manifest entries, calling on_result for each"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    queries = select_queries(names, sql_dir)
+
+    entries, keys = {}, {}
+    conn = connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            if cache is not None:
+                for query in queries:
+                    start = time.perf_counter()
+                    keys[query.name] = cache.key(cur, query.sql)
+                    entry = cache.get(keys[query.name], output_dir / f"{query.name}.csv")
+                    if entry is not None:
+                        entries[query.name] = dict(entry, seconds=round(time.perf_counter() - start, 3), cached=True)
+                        if on_result is not None:
+                            on_result(query.name, entries[query.name])
+
+            pending = [query for query in queries if query.name not in entries]
+            ran, errors = asyncio.run(run_concurrently(pending, dsn, output_dir, parallel, timeout, retries, on_result))
+            entries.update(ran)
+            if cache is not None:
+                for name, entry in ran.items():
+                    cache.put(keys[name], output_dir / f"{name}.csv", entry)
+
+            for query in queries:
+                output_path = output_dir / f"{query.name}.csv"
+                if query.name not in entries:
+                    continue
+                if arrow:
+                    # Typed with the result's column types, also for results served from the cache
+                    entries[query.name]["arrow_file"] = csv_to_arrow(output_path, query_schema(cur, query.sql)).name
+                else:
+                    # An Arrow file left from an earlier run would shadow the new CSV in the plotting scripts
+                    output_path.with_suffix(".arrow").unlink(missing_ok=True)
+    finally:
+        conn.close()
+
+    for name in list(entries):
+        if name in DERIVED_RESULTS:
+            derived = DERIVED_RESULTS[name](output_dir / f"{name}.csv", output_dir, arrow=arrow)
+            entries.update(derived)
+            if on_result is not None:
+                for derived_name, entry in derived.items():
+                    on_result(derived_name, entry)
+
+    update_manifest(output_dir, entries)
+    if errors:
+        failed = ", ".join(f"{name} ({type(error).__name__}: {error})" for name, error in errors.items())
+        raise RuntimeError(f"Queries failed: {failed}") from next(iter(errors.values()))
+    return entries
+
+
+def main():
+    """Main function to regenerate the query results concurrently"""
+    parser = argparse.ArgumentParser(description="Regenerate query_results/*.csv from sql_queries/*.sql concurrently")
+    parser.add_argument("names", nargs="*", help="results to regenerate (default: all)")
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL, help="maximum concurrent connections")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds before a query is cancelled")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="retries of a query after a transient error")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="directory for the CSV files and manifest")
+    parser.add_argument("--no-cache", action="store_true", help="always rerun the queries against the database")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="directory for the compressed result cache")
+    parser.add_argument("--arrow", action="store_true", help="also write typed Arrow IPC files for the plotting scripts")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="cache size limit")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResultCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    start = time.perf_counter()
+    run_queries_async(
+        args.names, args.dsn, args.output_dir, cache=cache, arrow=args.arrow, parallel=args.parallel,
+        timeout=args.timeout, retries=args.retries, on_result=lambda name, entry: print_report({name: entry}),
+    )
+    print(f"Total {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""
+Sharded CSV Aggregation
+
+Computes the query_results/ tables straight from the raw table CSVs, without
+loading them into the database. This script:
+1. Splits job_postings_fact.csv and skills_job_dim.csv into byte-range shards
+   that each start at a row
+2. map: aggregates every shard in a worker process into a partial, a JSON file
+   of (keys, measures) rows per result holding only counts and sums, so two
+   partials are merged by adding them up per key. A NULL key is kept as its own
+   group and a NULL flag or salary is counted in none of its measures
+3. The skills shards find the job title of every job_id in a lookup array
+   gathered from the postings shards (job_titles.npz), the CSV counterpart of
+   the join in skills.sql
+4. reduce: merges the partials and derives job_analysis, jobs_per_year,
+   jobs_per_country, jobs_per_website, companies and skill_demand (and skill.csv
+   and skill_type.csv from it) exactly as sql_queries/*.sql do
+
+The partial files are self-describing and independent of each other, so shards
+can be aggregated on other machines and their partials copied into
+--partials-dir and merged with --from-partials.
+
+Shard boundaries are found by scanning for a line that starts with an integer
+id, the first column of both tables; a quoted value containing a line break
+followed by digits and a comma would be split.
+
+Input: data/csv_files/*.csv
+Output: query_results/<result>.csv and data/extracts/partials/
+Usage: python python_pipeline/shard_aggregates.py [--csv-dir DIR] [--workers N] [--shard-mb 64]
+       [--partials-dir DIR] [--from-partials]
+"""
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.arrow_io import EXTRACT_DIR
+from python_pipeline.db import CSV_DIR, RESULTS_DIR
+from python_pipeline.job_categories import CATEGORY_RULES, classify_title
+from python_pipeline.job_sources import name_sources, parse_source
+from python_pipeline.run_queries import update_manifest
+from python_pipeline.skill_demand import build_skill_outputs
+
+PARTIALS_DIR = EXTRACT_DIR / "partials"
+JOB_TITLES_NAME = "job_titles.npz"
+PARTIAL_FORMAT = 1
+
+# Shards per worker, so one slow shard does not leave the other cores idle
+SHARDS_PER_WORKER = 4
+MIN_SHARD_BYTES = 1024 * 1024
+MAX_SHARD_BYTES = 64 * 1024 * 1024
+
+# Every row of job_postings_fact.csv and skills_job_dim.csv starts with its integer job_id
+ROW_START = re.compile(rb"\n\d+,")
+SCAN_BYTES = 1024 * 1024
+
+POSTING_COLUMNS = [
+    "job_id", "company_id", "job_title_short", "job_via", "job_posted_date", "job_work_from_home",
+    "job_no_degree_mention", "job_health_insurance", "job_country", "salary_year_avg",
+]
+FLAGS = ["job_work_from_home", "job_no_degree_mention", "job_health_insurance"]
+
+# Partial -> (key columns, measure columns); every measure is a count or a sum
+PARTIALS = {
+    "titles": (
+        ["job_title_short"],
+        ["postings", "no_degree", "degree", "health_insurance", "no_health_insurance", "remote", "onsite",
+         "salary_year_sum", "salary_year_count"],
+    ),
+    "years": (["year"], ["postings"]),
+    "countries": (["job_country"], ["postings"]),
+    "sources": (["job_via"], ["postings"]),
+    "companies": (["company_id", "job_title_short"], ["postings"]),
+    "skills": (["job_title_short", "skill_id"], ["skill_count"]),
+}
+
+# Table -> the partials its shards produce
+TABLE_PARTIALS = {
+    "job_postings_fact": ["titles", "years", "countries", "sources", "companies"],
+    "skills_job_dim": ["skills"],
+}
+
+# Minimum postings of a source in jobs_per_website and of a company in companies (the HAVING clauses)
+MIN_SOURCE_POSTINGS = 100
+MIN_COMPANY_POSTINGS = 100
+
+
+def read_columns(csv_path):
+    """Column names from the header line of a CSV file"""
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        return [column.strip() for column in next(csv.reader(csv_file))]
+
+
+def next_row_start(handle, position, size):
+    """Offset of the first row starting at or after position"""
+    offset = position - 1
+    while offset < size:
+        handle.seek(offset)
+        block = handle.read(SCAN_BYTES)
+        match = ROW_START.search(block)
+        if match:
+            return offset + match.start() + 1
+        # Overlap the blocks so a row start across their boundary is still found
+        offset += max(len(block) - 64, 1)
+    return size
+
+
+def plan_shards(csv_path, workers, shard_bytes=None):
+    """Split a CSV file into half-open byte ranges [start, end) that each begin at a row"""
+    size = Path(csv_path).stat().st_size
+    with open(csv_path, "rb") as handle:
+        first = len(handle.readline())
+        if shard_bytes is None:
+            shard_bytes = math.ceil((size - first) / (workers * SHARDS_PER_WORKER))
+            shard_bytes = min(max(shard_bytes, MIN_SHARD_BYTES), MAX_SHARD_BYTES)
+        bounds = [first]
+        while bounds[-1] < size:
+            bounds.append(next_row_start(handle, bounds[-1] + shard_bytes, size))
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def read_shard(csv_path, start, end, columns, **read_options):
+    """Parse the rows in bytes [start, end) of a CSV file"""
+    with open(csv_path, "rb") as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, names=columns, **read_options)
+
+
+def group_sum(frame, name):
+    """Sum the measures of a partial per key, NULL keys included"""
+    keys, measures = PARTIALS[name]
+    return frame.groupby(keys, dropna=False, sort=False)[measures].sum().reset_index()
+
+
+def aggregate_postings(postings):
+    """Return {partial: DataFrame} for a frame of postings"""
+    flags = {column: postings[column] for column in FLAGS}
+    salary = postings["salary_year_avg"]
+    frame = pd.DataFrame({
+        "job_title_short": postings["job_title_short"],
+        "year": postings["job_posted_date"].str[:4],
+        "job_country": postings["job_country"],
+        "job_via": postings["job_via"],
+        "company_id": postings["company_id"],
+        "postings": 1,
+        "no_degree": flags["job_no_degree_mention"].eq(True),
+        "degree": flags["job_no_degree_mention"].eq(False),
+        "health_insurance": flags["job_health_insurance"].eq(True),
+        "no_health_insurance": flags["job_health_insurance"].eq(False),
+        "remote": flags["job_work_from_home"].eq(True),
+        "onsite": flags["job_work_from_home"].eq(False),
+        "salary_year_sum": salary.fillna(0.0),
+        "salary_year_count": salary.notna(),
+    })
+    return {name: group_sum(frame, name) for name in TABLE_PARTIALS["job_postings_fact"]}
+
+
+def write_partial(path, partials, **meta):
+    """Write {partial: DataFrame} and its provenance as one JSON partial file"""
+    document = {"format": PARTIAL_FORMAT, **meta, "partials": {}}
+    for name, frame in partials.items():
+        keys, measures = PARTIALS[name]
+        rows = frame[keys + measures].astype(object).where(frame[keys + measures].notna(), None)
+        document["partials"][name] = {"keys": keys, "measures": measures, "rows": rows.values.tolist()}
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_text(json.dumps(document) + "\n")
+    os.replace(tmp_path, path)
+
+
+def read_partial(path):
+    """Return {partial: DataFrame} from a JSON partial file"""
+    document = json.loads(Path(path).read_text())
+    if document.get("format") != PARTIAL_FORMAT:
+        raise ValueError(f"{path} is not a partial file of format {PARTIAL_FORMAT}")
+    return {
+        name: pd.DataFrame(partial["rows"], columns=partial["keys"] + partial["measures"])
+        for name, partial in document["partials"].items()
+    }
+
+
+def merge_partials(paths):
+    """Add up the partials of every file per key and return {partial: DataFrame}"""
+    frames = {}
+    for path in paths:
+        for name, frame in read_partial(path).items():
+            frames.setdefault(name, []).append(frame)
+    return {name: group_sum(pd.concat(parts, ignore_index=True), name) for name, parts in frames.items()}
+
+
+def map_postings_shard(csv_path, start, end, columns, partial_path):
+    """Aggregate one postings shard into partial_path and save its job titles next to it, return its rows"""
+    postings = read_shard(
+        csv_path, start, end, columns,
+        usecols=POSTING_COLUMNS,
+        dtype={"job_id": np.int64, "company_id": "Int64", "job_title_short": str, "job_via": str,
+               "job_posted_date": str, "job_country": str, "salary_year_avg": np.float64},
+        true_values=["t", "true", "True", "TRUE"],
+        false_values=["f", "false", "False", "FALSE"],
+        keep_default_na=False,
+        na_values=[""],
+    )
+    write_partial(partial_path, aggregate_postings(postings), table="job_postings_fact", start=start, end=end,
+                  rows=len(postings))
+
+    codes, titles = pd.factorize(postings["job_title_short"])
+    np.savez(Path(partial_path).with_suffix(".titles.npz"), job_ids=postings["job_id"].to_numpy(),
+             codes=codes.astype(np.int32), titles=np.asarray(titles, dtype=str))
+    return len(postings)
+
+
+def map_skills_shard(csv_path, start, end, columns, partial_path, job_titles_path):
+    """Aggregate one skills_job_dim shard into partial_path, return its rows"""
+    links = read_shard(csv_path, start, end, columns, usecols=["job_id", "skill_id"], dtype=np.int64)
+    lookup = np.load(job_titles_path)
+    codes, titles = lookup["codes"], lookup["titles"]
+
+    # Links of unknown postings or postings without a title drop out, like the inner join of skills.sql
+    job_ids = links["job_id"].to_numpy()
+    known = (job_ids >= 0) & (job_ids < len(codes))
+    title = np.full(len(job_ids), -1, dtype=np.int64)
+    title[known] = codes[job_ids[known]]
+    keep = title >= 0
+
+    frame = pd.DataFrame({
+        "job_title_short": titles[title[keep]],
+        "skill_id": links["skill_id"].to_numpy()[keep],
+        "skill_count": 1,
+    })
+    write_partial(partial_path, {"skills": group_sum(frame, "skills")}, table="skills_job_dim", start=start,
+                  end=end, rows=len(links))
+    return len(links)
+
+
+def gather_job_titles(partials_dir):
+    """Combine the job titles saved by the postings shards into one job_id-indexed lookup file"""
+    shards = [np.load(path) for path in sorted(partials_dir.glob("job_postings_fact-*.titles.npz"))]
+    titles = np.unique(np.concatenate([shard["titles"] for shard in shards] or [np.array([], dtype=str)]))
+    max_job_id = max((int(shard["job_ids"].max(initial=-1)) for shard in shards), default=-1)
+
+    # job_ids are dense, so the title code of a posting sits at its job_id; -1 for no posting or no title
+    codes = np.full(max_job_id + 1, -1, dtype=np.int32)
+    for shard in shards:
+        # The appended -1 is where the NULL code (-1) of pd.factorize lands
+        mapped = np.append(np.searchsorted(titles, shard["titles"]), -1)
+        codes[shard["job_ids"]] = mapped[shard["codes"]]
+    path = partials_dir / JOB_TITLES_NAME
+    np.savez(path, codes=codes, titles=titles)
+    return path
+
+
+def map_table(pool, table, csv_dir, partials_dir, workers, shard_bytes, job_titles_path=None):
+    """Aggregate every shard of one table CSV in the pool, return (rows, bytes)"""
+    csv_path = Path(csv_dir) / f"{table}.csv"
+    columns = read_columns(csv_path)
+    for stale in partials_dir.glob(f"{table}-*"):
+        stale.unlink()
+
+    futures = []
+    for index, (start, end) in enumerate(plan_shards(csv_path, workers, shard_bytes)):
+        partial_path = partials_dir / f"{table}-{index:05d}.json"
+        if table == "job_postings_fact":
+            futures.append(pool.submit(map_postings_shard, csv_path, start, end, columns, partial_path))
+        else:
+            futures.append(pool.submit(map_skills_shard, csv_path, start, end, columns, partial_path,
+                                       job_titles_path))
+    return sum(future.result() for future in futures), csv_path.stat().st_size
+
+
+def round_half_up(values):
+    """ROUND(x, 0) of PostgreSQL numerics: halves round away from zero"""
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+def by_count(frame, column):
+    """Largest first, like ORDER BY column DESC"""
+    return frame.sort_values(column, ascending=False, kind="stable").reset_index(drop=True)
+
+
+def job_analysis(titles):
+    """jobs.sql job_analysis from the titles partial"""
+    # NULLIF(count, 0): titles without a salary get a NULL average
+    paid = titles["salary_year_count"].where(titles["salary_year_count"] > 0)
+    average = round_half_up(titles["salary_year_sum"] / paid)
+    frame = pd.DataFrame({
+        "job_title": titles["job_title_short"],
+        "total_jobs": titles["postings"],
+        **{column: titles[column] for column in ["no_degree", "degree", "health_insurance", "no_health_insurance"]},
+        "average_salary": average.astype("Int64"),
+        "remote": titles["remote"],
+        "onsite": titles["onsite"],
+    })
+    return by_count(frame, "total_jobs")
+
+
+def jobs_per_website(sources):
+    """exploration.sql jobs_per_website from the sources partial, job_via parsed like job_sources.py"""
+    parsed = {value: parse_source(value) for value in sources["job_via"].dropna().unique()}
+    names = name_sources(source for source in parsed.values() if source is not None)
+    source_names = sources["job_via"].map(lambda value: names[parsed[value][0]] if parsed.get(value) else None)
+    frame = (
+        sources.assign(source_website=source_names)
+        .groupby("source_website", dropna=False)["postings"].sum()
+        .rename("job_count").reset_index()
+    )
+    return by_count(frame[frame["job_count"] > MIN_SOURCE_POSTINGS], "job_count")
+
+
+def companies(partial, company_names):
+    """companies.sql companies from the companies partial, with the job categories of job_categories.py"""
+    categories = partial["job_title_short"].map(lambda title: classify_title(title) if pd.notna(title) else None)
+    frame = pd.DataFrame({"company_id": partial["company_id"], "total_jobs": partial["postings"]})
+    for _, category in CATEGORY_RULES:
+        frame[f"{category}_jobs"] = partial["postings"].where(categories == category, 0)
+    frame = frame.dropna(subset=["company_id"]).groupby("company_id").sum()
+    frame = frame[frame["total_jobs"] >= MIN_COMPANY_POSTINGS]
+
+    # Inner join on company_dim
+    frame = frame[frame.index.isin(company_names.index)]
+    frame.insert(0, "name", company_names.reindex(frame.index).to_numpy())
+    return by_count(frame.reset_index(drop=True), "total_jobs")
+
+
+def skill_demand(skills, skills_dim):
+    """skills.sql skill_demand: every skill of skills_dim with the (job title, count) pairs asking for it"""
+    demand = skills.rename(columns={"job_title_short": "job_title"})
+    skills_dim = skills_dim.rename(columns={"skills": "skill", "type": "skill_type"})
+    frame = skills_dim.merge(demand, on="skill_id", how="left")
+    frame = frame[["job_title", "skill_id", "skill", "skill_type", "skill_count"]]
+    frame["skill_count"] = frame["skill_count"].astype("Int64")
+    return frame.sort_values(["job_title", "skill_id"], na_position="last", kind="stable").reset_index(drop=True)
+
+
+def reduce_partials(merged, csv_dir):
+    """Derive the result tables from the merged partials, return {result: DataFrame}"""
+    csv_dir = Path(csv_dir)
+    company_names = pd.read_csv(csv_dir / "company_dim.csv", usecols=["company_id", "name"],
+                                dtype={"company_id": np.int64, "name": str}, keep_default_na=False, na_values=[""])
+    skills_dim = pd.read_csv(csv_dir / "skills_dim.csv", usecols=["skill_id", "skills", "type"],
+                             dtype={"skill_id": np.int64, "skills": str, "type": str}, keep_default_na=False,
+                             na_values=[""])
+    merged["companies"]["company_id"] = merged["companies"]["company_id"].astype("Int64")
+    merged["skills"]["skill_id"] = merged["skills"]["skill_id"].astype(np.int64)
+
+    return {
+        "job_analysis": job_analysis(merged["titles"]),
+        "jobs_per_year": by_count(merged["years"].rename(columns={"postings": "job_count"}), "job_count"),
+        "jobs_per_country": by_count(merged["countries"].rename(columns={"postings": "job_count"}), "job_count"),
+        "jobs_per_website": jobs_per_website(merged["sources"]),
+        "companies": companies(merged["companies"], company_names.set_index("company_id")["name"]),
+        "skill_demand": skill_demand(merged["skills"], skills_dim),
+    }
+
+
+def write_result_csv(frame, path):
+    """Write a result the way run_queries.py's COPY does: plain header, quoted values, NULL as an empty field"""
+    with open(path, "wb") as output:
+        output.write((",".join(frame.columns) + "\n").encode("utf-8"))
+        pa_csv.write_csv(
+            pa.Table.from_pandas(frame, preserve_index=False),
+            output,
+            write_options=pa_csv.WriteOptions(include_header=False, quoting_style="all_valid"),
+        )
+
+
+def aggregate_csvs(csv_dir=CSV_DIR, output_dir=RESULTS_DIR, partials_dir=PARTIALS_DIR, workers=None,
+                   shard_bytes=None, from_partials=False):
+    """Compute the result tables from the table CSVs and return (manifest entries, {table: (rows, bytes, seconds)})"""
+    output_dir, partials_dir = Path(output_dir), Path(partials_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    partials_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+
+    timings = {}
+    if not from_partials:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            table_start = time.perf_counter()
+            rows, size = map_table(pool, "job_postings_fact", csv_dir, partials_dir, workers, shard_bytes)
+            timings["job_postings_fact"] = (rows, size, time.perf_counter() - table_start)
+
+            # The skills shards need the title of every posting, so they run once all postings are mapped
+            table_start = time.perf_counter()
+            job_titles_path = gather_job_titles(partials_dir)
+            rows, size = map_table(pool, "skills_job_dim", csv_dir, partials_dir, workers, shard_bytes, job_titles_path)
+            timings["skills_job_dim"] = (rows, size, time.perf_counter() - table_start)
+
+    reduce_start = time.perf_counter()
+    paths = sorted(path for table in TABLE_PARTIALS for path in partials_dir.glob(f"{table}-*.json"))
+    merged = merge_partials(paths)
+    missing = [name for names in TABLE_PARTIALS.values() for name in names if name not in merged]
+    if missing:
+        raise FileNotFoundError(f"No partials for {', '.join(missing)} in {partials_dir}")
+    results = reduce_partials(merged, csv_dir)
+    timings["merge"] = (len(paths), None, time.perf_counter() - reduce_start)
+
+    seconds = round(time.perf_counter() - start, 3)
+    generated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    entries = {}
+    for name, frame in results.items():
+        path = output_dir / f"{name}.csv"
+        write_result_csv(frame, path)
+        entries[name] = {
+            "source": "shard_aggregates.py",
+            "file": path.name,
+            "rows": len(frame),
+            "bytes": path.stat().st_size,
+            "seconds": seconds,
+            "generated_at": generated_at,
+        }
+    entries.update(build_skill_outputs(output_dir / "skill_demand.csv", output_dir))
+    update_manifest(output_dir, entries)
+    return entries, timings
+
+
+def main():
+    """Main function to compute the query results from the raw table CSVs"""
+    parser = argparse.ArgumentParser(description="Compute the query results from the table CSVs, shard by shard")
+    parser.add_argument("--csv-dir", default=CSV_DIR, help="directory holding the four table CSVs")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--shard-mb", type=float, default=None,
+                        help="shard size in MB (default: 4 shards per worker, between 1 and 64 MB)")
+    parser.add_argument("--partials-dir", default=PARTIALS_DIR, help="directory for the partial files")
+    parser.add_argument("--from-partials", action="store_true",
+                        help="skip the map phase and merge the partial files already in --partials-dir")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="directory for the CSV files and manifest")
+    args = parser.parse_args()
+
+    shard_bytes = int(args.shard_mb * 1024 * 1024) if args.shard_mb else None
+    entries, timings = aggregate_csvs(args.csv_dir, args.output_dir, args.partials_dir, args.workers, shard_bytes,
+                                      args.from_partials)
+    for table, (rows, size, seconds) in timings.items():
+        if size is None:
+            print(f"{table:<20} {rows:>12,} partials {seconds:8.2f}s")
+        else:
+            print(f"{table:<20} {rows:>12,} rows {seconds:8.2f}s {size / 1024 / 1024 / seconds:8.1f} MB/s")
+    for name, entry in entries.items():
+        print(f"{name:<20} {entry['rows']:>10,} rows {entry['bytes']:>12,} bytes")
+
+
+if __name__ == "__main__":
+    main()
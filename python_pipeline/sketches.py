@@ -0,0 +1,345 @@
+"""
+Approximate Aggregation with Mergeable Sketches
+
+This script keeps small, mergeable summaries of job_postings_fact in
+posting_sketches (data/sql_load/6_sketches.sql), one row per posting month,
+job title and country:
+1. build: reads each month's postings once (a range predicate on
+   job_posted_date, so a single partition of the partitioned table) and stores
+   a HyperLogLog sketch of the distinct companies and source websites and a
+   log-bucketed salary histogram per (title, country)
+2. query: merges the stored sketches up to any grouping (month, job title,
+   country or none) and reports distinct counts and salary percentiles without
+   reading a single posting
+
+HyperLogLog registers merge with an element-wise maximum (about 0.8% standard
+error with 2^14 registers). Salaries fall into logarithmic buckets whose width
+is 2% of their value, so every percentile is within 1% of an exact one and the
+histograms of any rows simply add up.
+
+Output: query_results/sketch_metrics_by_<dimensions>.csv
+Usage: python python_pipeline/sketches.py build [--months 2023-11 2023-12] [--dsn DSN]
+       python python_pipeline/sketches.py query [--by job_title country] [--quantiles 0.5 0.9]
+"""
+
+import argparse
+import io
+import sys
+import time
+import zlib
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import RESULTS_DIR, connect
+from python_pipeline.partitions import add_months
+from python_pipeline.run_queries import update_manifest
+
+# 2^14 registers; the 50 hash bits left for the rank stay exact in float64
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_RANK_BITS = 64 - HLL_PRECISION
+
+# Relative accuracy of the salary percentiles
+SALARY_ACCURACY = 0.01
+GAMMA = (1 + SALARY_ACCURACY) / (1 - SALARY_ACCURACY)
+LOG_GAMMA = np.log(GAMMA)
+
+DEFAULT_QUANTILES = [0.5, 0.9]
+
+# Query dimension -> posting_sketches column
+DIMENSIONS = {
+    "month": "posting_month",
+    "job_title": "job_title_short",
+    "country": "job_country",
+}
+
+MONTH_SQL = """
+COPY (
+    SELECT job_title_short, job_country, company_id, source_id, salary_year_avg
+    FROM job_postings_fact
+    WHERE job_posted_date >= '{start}' AND job_posted_date < '{end}'
+) TO STDOUT WITH (FORMAT csv)
+"""
+
+
+def hll_registers(groups, n_groups, hashes):
+    """HyperLogLog registers (one uint8 row per group) of the 64-bit hashes of each group's values"""
+    registers = np.zeros((n_groups, HLL_REGISTERS), dtype=np.uint8)
+    bucket = (hashes >> np.uint64(HLL_RANK_BITS)).astype(np.int64)
+    rest = hashes & np.uint64((1 << HLL_RANK_BITS) - 1)
+    # frexp returns the bit length of rest, so the rank is the position of its first 1 bit
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    rank = (HLL_RANK_BITS - bit_length + 1).astype(np.uint8)
+    np.maximum.at(registers, (groups, bucket), rank)
+    return registers
+
+
+def hll_estimate(registers):
+    """Distinct count estimate of HyperLogLog registers, with the small-range correction"""
+    registers = np.asarray(registers)
+    alpha = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+    raw = alpha * HLL_REGISTERS**2 / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    linear = HLL_REGISTERS * np.log(HLL_REGISTERS / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * HLL_REGISTERS) & (zeros > 0), linear, raw)
+
+
+def encode_hll(registers):
+    """Compress one group's registers; sparse groups shrink to a few dozen bytes"""
+    return zlib.compress(registers.tobytes())
+
+
+def decode_hll(blob):
+    """Registers of an encoded HyperLogLog sketch"""
+    return np.frombuffer(zlib.decompress(bytes(blob)), dtype=np.uint8)
+
+
+def salary_buckets(salaries):
+    """Logarithmic bucket index of every positive salary"""
+    return np.ceil(np.log(salaries) / LOG_GAMMA).astype(np.int32)
+
+
+def encode_histogram(buckets, counts):
+    """Serialize a (bucket, count) histogram as little-endian int32 buckets then int64 counts"""
+    return buckets.astype("<i4").tobytes() + counts.astype("<i8").tobytes()
+
+
+def decode_histogram(blob):
+    """Return the (buckets, counts) arrays of an encoded histogram"""
+    blob = bytes(blob)
+    size = len(blob) // 12
+    return np.frombuffer(blob[: 4 * size], dtype="<i4"), np.frombuffer(blob[4 * size :], dtype="<i8")
+
+
+def histogram_quantiles(buckets, counts, quantiles):
+    """Approximate quantiles of a histogram whose buckets need not be sorted or unique"""
+    if len(buckets) == 0 or counts.sum() == 0:
+        return [None] * len(quantiles)
+    order = np.argsort(buckets, kind="stable")
+    buckets, cumulative = buckets[order], np.cumsum(counts[order])
+    ranks = np.asarray(quantiles) * (cumulative[-1] - 1)
+    # Midpoint of the bucket holding each rank, in relative terms
+    chosen = buckets[np.searchsorted(cumulative, ranks, side="right")]
+    return list(np.round(2 * GAMMA ** chosen.astype(np.float64) / (GAMMA + 1), 0))
+
+
+def read_month(cur, month):
+    """Postings of one month as a DataFrame (title, country, company_id, source_id, salary)"""
+    buffer = io.StringIO()
+    cur.copy_expert(MONTH_SQL.format(start=month, end=add_months(month, 1)), buffer)
+    buffer.seek(0)
+    return pd.read_csv(
+        buffer,
+        names=["job_title_short", "job_country", "company_id", "source_id", "salary_year_avg"],
+        dtype={"job_title_short": object, "job_country": object, "company_id": "Int64", "source_id": "Int64"},
+        keep_default_na=False,
+        na_values={
+            "job_title_short": [""], "job_country": [""], "company_id": [""], "source_id": [""], "salary_year_avg": [""]
+        },
+    )
+
+
+def month_sketches(postings):
+    """Return one (title, country, postings, company_hll, source_hll, salary_sketch) tuple per group"""
+    grouped = postings.groupby(["job_title_short", "job_country"], dropna=False, sort=False)
+    groups = grouped.ngroup().to_numpy()
+    keys = grouped.size()
+    n_groups = len(keys)
+
+    companies = postings["company_id"].notna().to_numpy()
+    company_hll = hll_registers(
+        groups[companies], n_groups, pd.util.hash_array(postings["company_id"].to_numpy()[companies].astype(np.int64))
+    )
+    sources = postings["source_id"].notna().to_numpy()
+    source_hll = hll_registers(
+        groups[sources], n_groups, pd.util.hash_array(postings["source_id"].to_numpy()[sources].astype(np.int64))
+    )
+
+    # Histogram cells are (group, bucket) pairs counted in one np.unique
+    salaries = postings["salary_year_avg"].to_numpy(dtype=np.float64)
+    paid = salaries > 0
+    cells, counts = np.unique(
+        np.stack([groups[paid], salary_buckets(salaries[paid])], axis=1), axis=0, return_counts=True
+    )
+    cell_groups = cells[:, 0] if len(cells) else np.empty(0, dtype=np.int64)
+    bounds = np.searchsorted(cell_groups, np.arange(n_groups + 1))
+
+    rows = []
+    for group, ((title, country), size) in enumerate(keys.items()):
+        start, end = bounds[group], bounds[group + 1]
+        rows.append((
+            None if pd.isna(title) else title,
+            None if pd.isna(country) else country,
+            int(size),
+            encode_hll(company_hll[group]),
+            encode_hll(source_hll[group]),
+            encode_histogram(cells[start:end, 1], counts[start:end]),
+        ))
+    return rows
+
+
+def parse_month(value):
+    """First day of the month of a YYYY-MM or YYYY-MM-DD argument"""
+    return date.fromisoformat(value[:7] + "-01")
+
+
+def posting_months(cur):
+    """Every month that has postings"""
+    cur.execute(
+        """
+        SELECT DISTINCT date_trunc('month', job_posted_date)::date FROM job_postings_fact
+        WHERE job_posted_date IS NOT NULL ORDER BY 1
+        """
+    )
+    return [month for (month,) in cur.fetchall()]
+
+
+def build_sketches(conn, months=None):
+    """Replace the sketches of the given months (default: all), return {month: groups}"""
+    built = {}
+    with conn.cursor() as cur:
+        for month in months or posting_months(cur):
+            month = month.replace(day=1)
+            rows = month_sketches(read_month(cur, month))
+            cur.execute("DELETE FROM posting_sketches WHERE posting_month = %s", (month,))
+            execute_values(
+                cur,
+                """
+                INSERT INTO posting_sketches
+                    (posting_month, job_title_short, job_country, postings, company_hll, source_hll, salary_sketch)
+                VALUES %s
+                """,
+                [(month, *row) for row in rows],
+            )
+            # One transaction per month, so a long rebuild keeps the months it finished
+            conn.commit()
+            built[month] = len(rows)
+    return built
+
+
+def query_sketches(cur, by=("job_title",), quantiles=DEFAULT_QUANTILES, since=None, until=None):
+    """Merge the stored sketches per value of the by dimensions and return the estimates as a DataFrame"""
+    unknown = [dimension for dimension in by if dimension not in DIMENSIONS]
+    if unknown:
+        raise KeyError(f"Unknown dimensions: {', '.join(unknown)} (available: {', '.join(DIMENSIONS)})")
+    columns = [DIMENSIONS[dimension] for dimension in by]
+
+    window, params = [], []
+    if since is not None:
+        window.append("posting_month >= date_trunc('month', %s::date)")
+        params.append(since)
+    if until is not None:
+        window.append("posting_month < %s")
+        params.append(until)
+    cur.execute(
+        f"""
+        SELECT {''.join(f'{column}, ' for column in columns)}postings, company_hll, source_hll, salary_sketch
+        FROM posting_sketches
+        {'WHERE ' + ' AND '.join(window) if window else ''}
+        """,
+        params,
+    )
+
+    merged = {}
+    for row in cur:
+        key = tuple(row[: len(columns)])
+        postings, company_hll, source_hll, salary_sketch = row[len(columns) :]
+        buckets, counts = decode_histogram(salary_sketch)
+        if key not in merged:
+            merged[key] = [0, decode_hll(company_hll).copy(), decode_hll(source_hll).copy(), [buckets], [counts]]
+        else:
+            entry = merged[key]
+            np.maximum(entry[1], decode_hll(company_hll), out=entry[1])
+            np.maximum(entry[2], decode_hll(source_hll), out=entry[2])
+            entry[3].append(buckets)
+            entry[4].append(counts)
+        merged[key][0] += postings
+
+    records = []
+    for key, (postings, companies, sources, buckets, counts) in merged.items():
+        buckets, counts = np.concatenate(buckets), np.concatenate(counts)
+        records.append([
+            *key,
+            postings,
+            int(round(float(hll_estimate(companies)))),
+            int(round(float(hll_estimate(sources)))),
+            int(counts.sum()),
+            *histogram_quantiles(buckets, counts, quantiles),
+        ])
+    names = [
+        *by, "total_jobs", "distinct_companies", "distinct_sources", "salary_jobs",
+        *[f"salary_p{round(q * 100):g}" for q in quantiles],
+    ]
+    return pd.DataFrame(records, columns=names).sort_values("total_jobs", ascending=False, ignore_index=True)
+
+
+def run_sketch_query(by=("job_title",), quantiles=DEFAULT_QUANTILES, since=None, until=None, dsn=None,
+                     output_dir=RESULTS_DIR):
+    """Write one sketch breakdown to output_dir/sketch_metrics_by_<dimensions>.csv and return its entry"""
+    name = "sketch_metrics_by_" + "_".join(by) if by else "sketch_metrics"
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    conn = connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            frame = query_sketches(cur, by, quantiles, since, until)
+    finally:
+        conn.close()
+
+    output_path = output_dir / f"{name}.csv"
+    frame.to_csv(output_path, index=False)
+    entries = {
+        name: {
+            "source": "sketches.py",
+            "file": output_path.name,
+            "rows": len(frame),
+            "bytes": output_path.stat().st_size,
+            "seconds": round(time.perf_counter() - start, 3),
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+    }
+    update_manifest(output_dir, entries)
+    return entries
+
+
+def main():
+    """Main function to build the sketches or answer a query from them"""
+    parser = argparse.ArgumentParser(description="Approximate distinct counts and salary percentiles from sketches")
+    parser.add_argument("command", choices=["build", "query"], help="rebuild sketches or merge them for a query")
+    parser.add_argument("--months", nargs="+", type=parse_month, default=None,
+                        help="build: months to rebuild as YYYY-MM (default: all)")
+    parser.add_argument("--by", nargs="*", default=["job_title"], choices=list(DIMENSIONS), help="query: grouping")
+    parser.add_argument("--quantiles", nargs="+", type=float, default=DEFAULT_QUANTILES, help="query: quantiles")
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="query: first month (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, default=None, help="query: month to stop before")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="query: directory for the CSV file and manifest")
+    args = parser.parse_args()
+
+    if args.command == "query":
+        for name, entry in run_sketch_query(args.by, args.quantiles, args.since, args.until, args.dsn,
+                                            args.output_dir).items():
+            print(f"{name:<36} {entry['rows']:>10,} rows {entry['bytes']:>12,} bytes {entry['seconds']:8.2f}s")
+        return
+
+    start = time.perf_counter()
+    conn = connect(args.dsn)
+    try:
+        built = build_sketches(conn, args.months)
+    finally:
+        conn.close()
+    print(f"Built {sum(built.values()):,} sketch rows for {len(built)} months in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
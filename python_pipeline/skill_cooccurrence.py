@@ -0,0 +1,228 @@
+"""
+Skill Co-occurrence Engine
+
+This script answers "which skills are asked for together" without a SQL
+self-join on skills_job_dim. It:
+1. Splits skills_job_dim into job_id ranges and streams each range's
+   (job_id, skill_id, job_title_short) rows once, one worker process per shard
+2. Builds a sparse CSR job x skill matrix X per shard (one row per posting)
+3. Computes the skill x skill co-occurrence X.T @ X per job title in the shard;
+   the shard results are plain sums, so they are merged by adding them
+4. Ranks the top-k partner skills of every skill, overall and per job title,
+   with the number of postings asking for both, the confidence
+   (share of the skill's postings that also ask for the partner) and the lift
+   (how much more often the pair appears than if the skills were independent)
+
+Output: query_results/skill_cooccurrence.csv and query_results/skill_cooccurrence_by_title.csv
+Usage: python python_pipeline/skill_cooccurrence.py [--top-k 10] [--workers N] [--shards N] [--dsn DSN]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import RESULTS_DIR, connect, get_dsn
+from python_pipeline.ranking import top_k_indices
+from python_pipeline.run_queries import update_manifest
+
+DEFAULT_TOP_K = 10
+
+# Shards per worker, so one slow shard does not leave the other cores idle
+SHARDS_PER_WORKER = 4
+
+# Postings with a NULL job_title_short only count towards the overall matrix
+NO_TITLE = ""
+
+SHARD_SQL = """
+COPY (
+    SELECT link.job_id, link.skill_id, job.job_title_short
+    FROM skills_job_dim AS link
+        INNER JOIN job_postings_fact AS job ON job.job_id = link.job_id
+    WHERE link.job_id >= {low} AND link.job_id < {high}
+) TO STDOUT WITH (FORMAT csv)
+"""
+
+
+def shard_bounds(cur, shards):
+    """Split the job_id range of skills_job_dim into at most shards half-open ranges"""
+    cur.execute("SELECT MIN(job_id), MAX(job_id) FROM skills_job_dim")
+    low, high = cur.fetchone()
+    if low is None:
+        return []
+    edges = np.unique(np.linspace(low, high + 1, shards + 1).astype(np.int64))
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def job_skill_matrix(job_ids, skill_columns, n_skills):
+    """Binary CSR job x skill matrix, one row per distinct job_id, and the row of every pair"""
+    jobs, rows = np.unique(job_ids, return_inverse=True)
+    ones = np.ones(len(rows), dtype=np.int32)
+    matrix = sparse.csr_matrix((ones, (rows, skill_columns)), shape=(len(jobs), n_skills))
+    return matrix, rows
+
+
+def shard_cooccurrence(dsn, low, high, skill_ids):
+    """Return {job title: (postings, sparse skill x skill co-occurrence)} for one job_id range"""
+    conn = connect(dsn)
+    try:
+        buffer = io.StringIO()
+        with conn.cursor() as cur:
+            cur.copy_expert(SHARD_SQL.format(low=int(low), high=int(high)), buffer)
+    finally:
+        conn.close()
+    buffer.seek(0)
+    pairs = pd.read_csv(
+        buffer,
+        names=["job_id", "skill_id", "job_title"],
+        dtype={"job_id": np.int64, "skill_id": np.int64, "job_title": "string"},
+        keep_default_na=False,
+        na_values={"job_title": [""]},
+    )
+    if pairs.empty:
+        return {}
+
+    matrix, rows = job_skill_matrix(
+        pairs["job_id"].to_numpy(), np.searchsorted(skill_ids, pairs["skill_id"].to_numpy()), len(skill_ids)
+    )
+
+    # Every pair of a posting carries the same title, so the title of a row is the title of any of its pairs
+    row_titles = np.empty(matrix.shape[0], dtype=object)
+    row_titles[rows] = pairs["job_title"].fillna(NO_TITLE).to_numpy(dtype=object)
+
+    results = {}
+    for title in np.unique(row_titles):
+        title_rows = matrix[row_titles == title]
+        results[title] = (title_rows.shape[0], (title_rows.T @ title_rows).tocsr())
+    return results
+
+
+def merge_shards(shard_results):
+    """Add up the per-title results of every shard"""
+    merged = {}
+    for result in shard_results:
+        for title, (postings, cooccurrence) in result.items():
+            if title in merged:
+                merged_postings, merged_cooccurrence = merged[title]
+                merged[title] = (merged_postings + postings, merged_cooccurrence + cooccurrence)
+            else:
+                merged[title] = (postings, cooccurrence)
+    return merged
+
+
+def top_partners(postings, cooccurrence, skills, top_k=DEFAULT_TOP_K):
+    """Rank the top_k partner skills of every skill and return them as a DataFrame"""
+    # Ranked on the nonzero counts only, a dense n_skills x n_skills copy per title is never built
+    pairs = cooccurrence.tocoo()
+    support = cooccurrence.diagonal().astype(np.int64)
+    off_diagonal = (pairs.row != pairs.col) & (pairs.data > 0)
+    rows, cols = pairs.row[off_diagonal], pairs.col[off_diagonal]
+    values = pairs.data[off_diagonal].astype(np.int64)
+
+    keep, ranks = top_k_indices(rows, cols, values, top_k)
+    skill_idx, partner_idx, jobs_together = rows[keep], cols[keep], values[keep]
+
+    skill_jobs = support[skill_idx]
+    partner_jobs = support[partner_idx]
+    return pd.DataFrame(
+        {
+            "skill": skills[skill_idx],
+            "partner_skill": skills[partner_idx],
+            "rank": ranks,
+            "jobs_together": jobs_together,
+            "skill_jobs": skill_jobs,
+            "partner_jobs": partner_jobs,
+            "confidence": np.round(jobs_together / skill_jobs, 4),
+            "lift": np.round(jobs_together * postings / (skill_jobs * partner_jobs), 3),
+        }
+    )
+
+
+def compute_cooccurrence(dsn=None, workers=None, shards=None):
+    """Return (skills, {job title: (postings, co-occurrence)}) computed shard by shard"""
+    dsn = get_dsn(dsn)
+    conn = connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT skill_id, skills FROM skills_dim ORDER BY skill_id")
+            skill_ids, skills = map(np.array, zip(*cur.fetchall()))
+            workers = workers or os.cpu_count()
+            bounds = shard_bounds(cur, shards or workers * SHARDS_PER_WORKER)
+    finally:
+        conn.close()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(shard_cooccurrence, dsn, low, high, skill_ids) for low, high in bounds]
+        by_title = merge_shards(future.result() for future in futures)
+    return skills.astype(str), by_title
+
+
+def build_cooccurrence_outputs(dsn=None, output_dir=RESULTS_DIR, top_k=DEFAULT_TOP_K, workers=None, shards=None):
+    """Write the overall and per-title partner rankings and return their manifest entries"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    skills, by_title = compute_cooccurrence(dsn, workers, shards)
+    if not by_title:
+        raise ValueError("skills_job_dim has no rows to compute co-occurrence from")
+    postings = sum(count for count, _ in by_title.values())
+    cooccurrence = sum(matrix for _, matrix in by_title.values())
+
+    per_title = []
+    for title in sorted(by_title):
+        if title != NO_TITLE:
+            frame = top_partners(*by_title[title], skills, top_k)
+            frame.insert(0, "job_title", title)
+            per_title.append(frame)
+    frames = {
+        "skill_cooccurrence": top_partners(postings, cooccurrence, skills, top_k),
+        "skill_cooccurrence_by_title": pd.concat(per_title, ignore_index=True),
+    }
+
+    seconds = round(time.perf_counter() - start, 3)
+    generated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    entries = {}
+    for name, frame in frames.items():
+        frame.to_csv(output_dir / f"{name}.csv", index=False)
+        entries[name] = {
+            "source": "skill_cooccurrence.py",
+            "file": f"{name}.csv",
+            "rows": len(frame),
+            "bytes": (output_dir / f"{name}.csv").stat().st_size,
+            "seconds": seconds,
+            "generated_at": generated_at,
+        }
+    update_manifest(output_dir, entries)
+    return entries
+
+
+def main():
+    """Main function to rank skill partners overall and per job title"""
+    parser = argparse.ArgumentParser(description="Rank the skills asked for together, overall and per job title")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="partner skills kept per skill")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--shards", type=int, default=None, help="job_id ranges (default: 4 per worker)")
+    parser.add_argument("--dsn", default=None, help="libpq connection string (default: $DATABASE_URL)")
+    parser.add_argument("--output-dir", default=RESULTS_DIR, help="directory for the CSV files and manifest")
+    args = parser.parse_args()
+
+    entries = build_cooccurrence_outputs(args.dsn, args.output_dir, args.top_k, args.workers, args.shards)
+    for name, entry in entries.items():
+        print(f"{name:<28} {entry['rows']:>10,} rows {entry['bytes']:>12,} bytes {entry['seconds']:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Skill Demand Engine
+
+This script turns the long-format skill_demand result of sql_queries/skills.sql
+((job title, skill) -> count, aggregated in a single scan) into:
+1. A job title x skill NumPy count matrix covering every skill in skills_dim
+2. query_results/skill.csv, one "<skill>_count" column per skill
+3. query_results/skill_type.csv, one "<type>_count" column per skill type,
+   derived from the same matrix instead of a second scan
+4. Optionally the same two tables as typed Arrow IPC files (int64 count columns)
+
+run_queries.py calls build_skill_outputs() whenever it regenerates skill_demand.
+
+Input: query_results/skill_demand.csv
+Output: query_results/skill.csv and query_results/skill_type.csv (and .arrow)
+Usage: python python_pipeline/skill_demand.py
+"""
+
+import csv
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.arrow_io import table_to_arrow
+from python_pipeline.db import RESULTS_DIR
+
+# Spellings kept from the hand-written column names of the old CASE pivot
+COLUMN_REPLACEMENTS = [("++", "pp"), ("#", "_sharp")]
+
+
+def column_name(value):
+    """Turn a skill or skill type into its "<name>_count" CSV column"""
+    name = value.lower()
+    for old, new in COLUMN_REPLACEMENTS:
+        name = name.replace(old, new)
+    return re.sub(r"[^a-z0-9]+", "_", name).strip("_") + "_count"
+
+
+def unique_column_names(values, ids):
+    """Column names for values, suffixed with the id when two values collide"""
+    names = [column_name(value) for value in values]
+    seen = pd.Series(names).duplicated(keep=False).to_numpy()
+    return [f"{name[:-len('_count')]}_{id_}_count" if dup else name for name, id_, dup in zip(names, ids, seen)]
+
+
+def pivot_skill_demand(demand_df):
+    """Pivot the long (job_title, skill_id, skill, skill_type, skill_count) frame into a matrix"""
+    # One column per skill in skills_dim, in skill_id order
+    skills = (
+        demand_df[["skill_id", "skill", "skill_type"]]
+        .drop_duplicates("skill_id")
+        .sort_values("skill_id")
+        .reset_index(drop=True)
+    )
+    skill_ids = skills["skill_id"].to_numpy()
+
+    # Rows with a NULL job title only register skills nobody asks for
+    pairs = demand_df.dropna(subset=["job_title"])
+    titles, row_idx = np.unique(pairs["job_title"].to_numpy(dtype=str), return_inverse=True)
+    col_idx = np.searchsorted(skill_ids, pairs["skill_id"].to_numpy())
+
+    counts = np.zeros((len(titles), len(skill_ids)), dtype=np.int64)
+    np.add.at(counts, (row_idx, col_idx), pairs["skill_count"].to_numpy(dtype=np.int64))
+
+    return {
+        "titles": titles,
+        "skill_ids": skill_ids,
+        "skills": skills["skill"].to_numpy(dtype=str),
+        "skill_types": skills["skill_type"].fillna("other").to_numpy(dtype=str),
+        "columns": np.array(unique_column_names(skills["skill"], skill_ids)),
+        "counts": counts,
+    }
+
+
+def skill_type_counts(matrix):
+    """Collapse the skill columns into skill type columns with one matrix product"""
+    # Types keep the order in which they first appear in skills_dim
+    type_names, first_seen, type_idx = np.unique(matrix["skill_types"], return_index=True, return_inverse=True)
+    order = np.argsort(first_seen)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    one_hot = np.zeros((len(matrix["skill_types"]), len(type_names)), dtype=np.int64)
+    one_hot[np.arange(len(type_idx)), rank[type_idx]] = 1
+    return type_names[order], matrix["counts"] @ one_hot
+
+
+def write_counts_csv(path, titles, columns, counts):
+    """Write one row per job title with every field quoted like the pgAdmin exports"""
+    frame = pd.DataFrame(counts, columns=columns)
+    frame.insert(0, "job_title", titles)
+    frame.to_csv(path, index=False, quoting=csv.QUOTE_ALL)
+
+
+def write_counts_arrow(path, titles, columns, counts):
+    """Write the same table as write_counts_csv as an Arrow IPC file with int64 count columns"""
+    arrays = [pa.array(titles, type=pa.string())] + [pa.array(counts[:, i]) for i in range(counts.shape[1])]
+    table_to_arrow(pa.Table.from_arrays(arrays, names=["job_title", *columns]), path)
+
+
+def build_skill_outputs(demand_csv=RESULTS_DIR / "skill_demand.csv", output_dir=RESULTS_DIR, arrow=False):
+    """Build skill.csv and skill_type.csv (and their Arrow files) and return their manifest entries"""
+    output_dir = Path(output_dir)
+    start = time.perf_counter()
+
+    demand_df = pd.read_csv(demand_csv)
+    matrix = pivot_skill_demand(demand_df)
+    type_names, type_counts = skill_type_counts(matrix)
+
+    type_columns = [column_name(name) for name in type_names]
+    write_counts_csv(output_dir / "skill.csv", matrix["titles"], matrix["columns"], matrix["counts"])
+    write_counts_csv(output_dir / "skill_type.csv", matrix["titles"], type_columns, type_counts)
+    if arrow:
+        write_counts_arrow(output_dir / "skill.arrow", matrix["titles"], matrix["columns"], matrix["counts"])
+        write_counts_arrow(output_dir / "skill_type.arrow", matrix["titles"], type_columns, type_counts)
+    else:
+        # An Arrow file left from an earlier run would shadow the new CSV in the plotting scripts
+        for name in ("skill", "skill_type"):
+            (output_dir / f"{name}.arrow").unlink(missing_ok=True)
+
+    seconds = round(time.perf_counter() - start, 3)
+    generated_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return {
+        name: {
+            "source": Path(demand_csv).name,
+            "file": f"{name}.csv",
+            "rows": len(matrix["titles"]),
+            "bytes": (output_dir / f"{name}.csv").stat().st_size,
+            "seconds": seconds,
+            "generated_at": generated_at,
+            **({"arrow_file": f"{name}.arrow"} if arrow else {}),
+        }
+        for name in ("skill", "skill_type")
+    }
+
+
+def main():
+    """Main function to rebuild the skill outputs from skill_demand.csv"""
+    for name, entry in build_skill_outputs().items():
+        print(f"{name:<20} {entry['rows']:>10,} rows {entry['bytes']:>12,} bytes {entry['seconds']:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
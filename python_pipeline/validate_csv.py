@@ -0,0 +1,398 @@
+"""
+CSV Validation
+
+Checks the table CSVs batch by batch before they reach COPY, so one bad row
+no longer fails a whole load. For every batch of rows it checks, with
+vectorized Arrow kernels instead of a Python loop per row:
+1. Types: integers (in INT range), numerics, booleans and timestamps parse
+   the way PostgreSQL will parse them, and VARCHAR values fit their length
+2. Nulls: key columns are never NULL
+3. Keys: primary keys are unique across the whole file, and company_id,
+   job_id and skill_id references exist among the rows that passed in the
+   referenced table (in-memory sets of sorted id arrays)
+4. Ranges: yearly and hourly salaries within plausible bounds, posting dates
+   neither before 2000 nor in the future
+
+Rows that fail go to data/quarantine/<table>.csv with their row number and
+the reasons; the rows that pass are re-encoded as CSV and streamed on batch
+by batch, so no file is ever held in memory as a whole. load_tables.py
+streams them into COPY (unless run with --no-validate).
+
+Input: data/csv_files/*.csv
+Output: data/quarantine/<table>.csv (and the clean CSVs with --clean-dir)
+Usage: python python_pipeline/validate_csv.py [--csv-dir DIR] [--quarantine-dir DIR] [--clean-dir DIR]
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+# Add parent directory to path so python_pipeline can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_pipeline.db import CSV_DIR
+
+QUARANTINE_DIR = PROJECT_ROOT / "data" / "quarantine"
+
+# 16 MB of CSV per batch
+DEFAULT_BLOCK_SIZE = 16 * 1024 * 1024
+
+# Column types of data/sql_load/2_create_tables.sql; text columns need no check
+COLUMN_TYPES = {
+    "company_dim": {"company_id": "int"},
+    "skills_dim": {"skill_id": "int"},
+    "job_postings_fact": {
+        "job_id": "int",
+        "company_id": "int",
+        "job_work_from_home": "bool",
+        "job_posted_date": "timestamp",
+        "job_no_degree_mention": "bool",
+        "job_health_insurance": "bool",
+        "salary_year_avg": "numeric",
+        "salary_hour_avg": "numeric",
+    },
+    "skills_job_dim": {"job_id": "int", "skill_id": "int"},
+}
+MAX_LENGTHS = {"job_postings_fact": {"job_title_short": 255}}
+
+# In dependency order: a referenced table is validated before the tables referencing it
+PRIMARY_KEYS = {
+    "company_dim": ["company_id"],
+    "skills_dim": ["skill_id"],
+    "job_postings_fact": ["job_id"],
+    "skills_job_dim": ["job_id", "skill_id"],
+}
+# Table -> {column: referenced table}, checked against the referenced table's primary keys
+FOREIGN_KEYS = {
+    "job_postings_fact": {"company_id": "company_dim"},
+    "skills_job_dim": {"job_id": "job_postings_fact", "skill_id": "skills_dim"},
+}
+
+# Inclusive bounds of plausible values; anything outside is a unit or parsing error upstream
+VALUE_RANGES = {
+    "salary_year_avg": (1_000, 5_000_000),
+    "salary_hour_avg": (1, 2_500),
+}
+FIRST_POSTING_DATE = datetime(2000, 1, 1)
+
+INT_RANGE = (-(2 ** 31), 2 ** 31 - 1)
+INT_PATTERN = r"^\s*-?\d{1,10}\s*$"
+NUMERIC_PATTERN = r"^\s*-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$"
+BOOL_VALUES = pa.array(["t", "f", "true", "false", "y", "n", "yes", "no", "on", "off", "1", "0"])
+# Fractional seconds are dropped before parsing, PostgreSQL keeps them
+TIMESTAMP_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"]
+
+KIND_LABELS = {"int": "an integer", "numeric": "a number", "bool": "a boolean", "timestamp": "a timestamp"}
+
+
+def read_columns(csv_path):
+    """Column names from the header line of a CSV file"""
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        return [column.strip() for column in next(csv.reader(csv_file))]
+
+
+def open_text_csv(csv_path, columns, block_size=DEFAULT_BLOCK_SIZE):
+    """Batch reader over the given columns of a CSV file"""
+    return pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        # Everything stays text, and only an unquoted empty field is NULL, as in COPY
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: pa.string() for column in columns},
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+            null_values=[""],
+        ),
+    )
+
+
+def append_columns(batch, derived):
+    """The batch with the columns of derived ({column: function(batch) -> array}) appended"""
+    return pa.RecordBatch.from_arrays(
+        [*batch.columns, *(derive(batch) for derive in derived.values())],
+        names=[*batch.schema.names, *derived],
+    )
+
+
+def to_numpy(array, fill):
+    """An Arrow array as a NumPy array, with fill in place of NULL"""
+    return array.fill_null(fill).to_numpy(zero_copy_only=False)
+
+
+def parse_column(column, kind):
+    """Return (not NULL, parses as kind, parsed values) of a string column as NumPy arrays"""
+    present = to_numpy(pc.is_valid(column), False)
+    text = pc.utf8_trim_whitespace(column)
+    if kind == "bool":
+        return present, to_numpy(pc.is_in(pc.utf8_lower(text), value_set=BOOL_VALUES), False), None
+
+    if kind == "timestamp":
+        text = pc.replace_substring_regex(text, pattern=r"\.\d+$", replacement="")
+        parsed = pa.nulls(len(column), pa.timestamp("s"))
+        for timestamp_format in TIMESTAMP_FORMATS:
+            attempt = pc.strptime(text, format=timestamp_format, unit="s", error_is_null=True)
+            parsed = pc.coalesce(parsed, attempt)
+            # The other formats are only tried when some value is left unparsed
+            if parsed.null_count == column.null_count:
+                break
+        return present, to_numpy(pc.is_valid(parsed), False), to_numpy(parsed.cast(pa.int64()), 0)
+
+    pattern, target = (INT_PATTERN, pa.int64()) if kind == "int" else (NUMERIC_PATTERN, pa.float64())
+    parses = pc.fill_null(pc.match_substring_regex(text, pattern=pattern), False)
+    values = to_numpy(pc.if_else(parses, text, "0").cast(target), 0)
+    parses = parses.to_numpy(zero_copy_only=False)
+    if kind == "int":
+        parses &= (values >= INT_RANGE[0]) & (values <= INT_RANGE[1])
+    return present, parses, values
+
+
+def key_values(values):
+    """One int64 per row for a single key column, one uint64 per row for a (job_id, skill_id) pair"""
+    if len(values) == 1:
+        return values[0]
+    high, low = (column.astype(np.int64) - INT_RANGE[0] for column in values)
+    return (high.astype(np.uint64) << np.uint64(32)) | low.astype(np.uint64)
+
+
+class KeySet:
+    """Growing set of integer keys with vectorized membership tests
+
+    Keys are kept in sorted runs whose sizes at least double from the newest to
+    the oldest, like the digits of a binary counter, so adding a batch merges
+    O(log n) runs and a lookup is one searchsorted per run.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, keys):
+        """Boolean array: which keys are in the set"""
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            found |= run[positions] == keys
+        return found
+
+    def add(self, keys):
+        """Add an array of keys not in the set yet"""
+        run = np.sort(keys)
+        while self.runs and len(self.runs[-1]) <= len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind="stable")
+        if len(run):
+            self.runs.append(run)
+
+
+class CleanRows:
+    """Readable binary stream over the clean CSV chunks of a validation, for COPY FROM STDIN"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = bytearray()
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        size = len(self._buffer) if size < 0 else size
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def close(self):
+        self._chunks.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvValidator:
+    """Validates the table CSVs of one load, remembering the keys that passed for the foreign key checks"""
+
+    def __init__(self, quarantine_dir=QUARANTINE_DIR, block_size=DEFAULT_BLOCK_SIZE):
+        self.quarantine_dir = Path(quarantine_dir)
+        self.block_size = block_size
+        self.keys = {}
+        self.stats = {}
+        self.latest_posting = datetime.now() + timedelta(days=1)
+
+    def check_batch(self, table, batch):
+        """Return [(reason, rows failing it)] for one batch, the keys of its rows and whether they are usable"""
+        failures = []
+        parsed = {}
+        for column, kind in COLUMN_TYPES[table].items():
+            if column not in batch.schema.names:
+                continue
+            present, parses, values = parse_column(batch.column(column), kind)
+            parsed[column] = (present & parses, values)
+            failures.append((f"{column} is not {KIND_LABELS[kind]}", present & ~parses))
+            if column in PRIMARY_KEYS[table]:
+                failures.append((f"{column} is NULL", ~present))
+            if column in VALUE_RANGES:
+                low, high = VALUE_RANGES[column]
+                failures.append((f"{column} outside [{low:,}, {high:,}]",
+                                 present & parses & ((values < low) | (values > high))))
+            if kind == "timestamp":
+                low, high = (np.datetime64(bound, "s").astype(np.int64)
+                             for bound in (FIRST_POSTING_DATE, self.latest_posting))
+                failures.append((f"{column} before {FIRST_POSTING_DATE:%Y-%m-%d} or in the future",
+                                 present & parses & ((values < low) | (values > high))))
+
+        for column, limit in MAX_LENGTHS.get(table, {}).items():
+            if column in batch.schema.names:
+                lengths = to_numpy(pc.utf8_length(batch.column(column)), 0)
+                failures.append((f"{column} longer than {limit} characters", lengths > limit))
+
+        for column, referenced in FOREIGN_KEYS.get(table, {}).items():
+            # A reference to a table that is not part of this validation is left to the database
+            if column in parsed and referenced in self.keys:
+                usable, values = parsed[column]
+                failures.append((f"{column} not in {referenced}", usable & ~self.keys[referenced].contains(values)))
+
+        key_columns = PRIMARY_KEYS[table]
+        usable = np.logical_and.reduce([parsed[column][0] for column in key_columns])
+        keys = key_values([parsed[column][1] for column in key_columns])
+        # The first clean row of several with one key wins, within the batch and across the file;
+        # a copy failing another check does not count, whatever batch it falls in
+        clean = usable & ~np.logical_or.reduce([failing for _, failing in failures])
+        first = np.zeros(len(keys), dtype=bool)
+        first[np.flatnonzero(clean)[np.unique(keys[clean], return_index=True)[1]]] = True
+        seen = self.keys[table].contains(keys)
+        failures.append((f"duplicate {', '.join(key_columns)}", clean & (seen | ~first)))
+        return failures, keys, usable
+
+    def clean_chunks(self, table, csv_path, derived=None):
+        """Yield the header and clean rows (plus derived columns) of one table CSV as CSV bytes, quarantine the rest"""
+        columns = read_columns(csv_path)
+        missing = [column for column in PRIMARY_KEYS[table] if column not in columns]
+        if missing:
+            raise ValueError(f"{csv_path} has no {', '.join(missing)} column")
+
+        derived = derived or {}
+        self.keys[table] = KeySet()
+        stats = self.stats[table] = {"rows": 0, "clean": 0, "quarantined": 0, "reasons": Counter(), "seconds": 0.0}
+        quarantine_path = self.quarantine_dir / f"{table}.csv"
+        quarantine_path.unlink(missing_ok=True)
+        quarantine = None
+
+        start = time.perf_counter()
+        reader = open_text_csv(csv_path, columns, self.block_size)
+        try:
+            first_batch = True
+            for batch in reader:
+                failures, keys, usable = self.check_batch(table, batch)
+                bad = np.logical_or.reduce([rows for _, rows in failures])
+                self.keys[table].add(keys[usable & ~bad])
+
+                sink = io.BytesIO()
+                pa_csv.write_csv(append_columns(batch.filter(pa.array(~bad)), derived), sink,
+                                 write_options=pa_csv.WriteOptions(include_header=first_batch))
+                first_batch = False
+
+                if bad.any():
+                    rows = np.flatnonzero(bad)
+                    reasons = np.full(len(rows), "", dtype=object)
+                    for reason, failing in failures:
+                        hit = failing[rows]
+                        stats["reasons"][reason] += int(hit.sum())
+                        reasons[hit] += reason + "; "
+                    quarantined = batch.filter(pa.array(bad))
+                    quarantined = pa.RecordBatch.from_arrays(
+                        [pa.array(rows + stats["rows"] + 1), pa.array([text[:-2] for text in reasons]),
+                         *quarantined.columns],
+                        names=["row", "reason", *quarantined.schema.names],
+                    )
+                    if quarantine is None:
+                        self.quarantine_dir.mkdir(parents=True, exist_ok=True)
+                        quarantine = pa_csv.CSVWriter(quarantine_path, quarantined.schema)
+                    quarantine.write_batch(quarantined)
+
+                stats["rows"] += batch.num_rows
+                stats["quarantined"] += int(bad.sum())
+                stats["clean"] += batch.num_rows - int(bad.sum())
+                stats["seconds"] = time.perf_counter() - start
+                yield sink.getvalue()
+            if first_batch:
+                # A file without rows still passes its header on
+                sink = io.BytesIO()
+                pa_csv.write_csv(pa.table({column: pa.array([], pa.string()) for column in [*columns, *derived]}), sink)
+                yield sink.getvalue()
+        finally:
+            if quarantine is not None:
+                quarantine.close()
+
+    def clean_rows(self, table, csv_path, derived=None):
+        """Readable stream of the header and clean rows of one table CSV, with the derived columns appended"""
+        return CleanRows(self.clean_chunks(table, csv_path, derived))
+
+    def report(self):
+        """Lines describing the rows checked, passed and quarantined per table, with the reasons"""
+        lines = []
+        for table, stats in self.stats.items():
+            rate = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else float("inf")
+            lines.append(f"{table:<26} {stats['rows']:>12,} rows {stats['quarantined']:>10,} quarantined "
+                         f"{stats['seconds']:8.2f}s {rate:>12,.0f} rows/sec")
+            for reason, count in stats["reasons"].most_common():
+                if count:
+                    lines.append(f"    {count:>10,}  {reason}")
+        return lines
+
+
+def validate_csv_dir(csv_dir=CSV_DIR, quarantine_dir=QUARANTINE_DIR, clean_dir=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Validate the table CSVs of csv_dir in dependency order, optionally writing the clean rows to clean_dir"""
+    csv_dir = Path(csv_dir)
+    validator = CsvValidator(quarantine_dir, block_size)
+    if clean_dir is not None:
+        clean_dir = Path(clean_dir)
+        clean_dir.mkdir(parents=True, exist_ok=True)
+    for table in PRIMARY_KEYS:
+        csv_path = csv_dir / f"{table}.csv"
+        if not csv_path.exists():
+            continue
+        with validator.clean_rows(table, csv_path) as rows:
+            if clean_dir is None:
+                while rows.read(block_size):
+                    pass
+                continue
+            with open(clean_dir / f"{table}.csv", "wb") as clean_file:
+                while chunk := rows.read(block_size):
+                    clean_file.write(chunk)
+    return validator
+
+
+def main():
+    """Main function to validate the table CSVs and quarantine the bad rows"""
+    parser = argparse.ArgumentParser(description="Validate the table CSVs and quarantine the rows COPY would reject")
+    parser.add_argument("--csv-dir", default=CSV_DIR, help="directory holding the four table CSVs")
+    parser.add_argument("--quarantine-dir", default=QUARANTINE_DIR, help="directory for the quarantined rows")
+    parser.add_argument("--clean-dir", default=None, help="also write the rows that pass to this directory")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="bytes of CSV per batch")
+    args = parser.parse_args()
+
+    validator = validate_csv_dir(args.csv_dir, args.quarantine_dir, args.clean_dir, args.block_size)
+    for line in validator.report():
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,47 +7,61 @@ It creates three main visualizations:
 2. Top 50 companies hiring across all job categories (stacked bar chart)
 3. ML jobs distribution analysis (top 20 detailed view + histogram)
 
-Input: query_results/companies.csv
+Input: query_results/companies.arrow (or .csv)
 Output: PNG files in report/figures/ directory
 """
 
 import sys
+from functools import lru_cache
 from pathlib import Path
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import os
 
 
-# Add parent directory to path and set working directory
+# Add parent directory to path so python_visualization can be imported
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
-os.chdir(PROJECT_ROOT)
 
-# Create figures/ directory if it doesn't exist
-os.makedirs("report/figures/", exist_ok=True)
+from python_pipeline.ranking import top_k_rows
+from python_visualization.figure_build import FIGURES_DIR, figure_target
+from python_visualization.render_profile import figure_dpi, label_bars
+from python_visualization.results import read_result
 
-# Set style for better-looking plots
-plt.style.use("default")
-sns.set_palette("viridis")
 
-# Set high DPI for all figures
-plt.rcParams["figure.dpi"] = 600
-plt.rcParams["savefig.dpi"] = 600
+def set_plot_style():
+    """Apply the plot style shared by every figure in this script"""
+    # Set style for better-looking plots
+    plt.style.use("default")
+    sns.set_palette("viridis")
 
-# Read the companies data
-companies_df = pd.read_csv("query_results/companies.csv")
+    # Set high DPI for all figures
+    plt.rcParams["figure.dpi"] = figure_dpi(600)
+    plt.rcParams["savefig.dpi"] = figure_dpi(600)
 
 
+@lru_cache(maxsize=None)
+def load_companies():
+    """Read the companies data on first use"""
+    return read_result("companies")
+
+
+@lru_cache(maxsize=None)
+def top_companies(column, k):
+    """The k companies with the most jobs in column, selected once and shared by the figures"""
+    return top_k_rows(load_companies(), column, k)
+
+
+@figure_target(inputs=["companies"], outputs=["top_100_ml_companies.png"])
 def create_top_ml_companies_plot():
     """Create visualization for top 100 companies hiring in machine learning"""
     
-    # Sort companies by machine_learning_jobs and take top 100
-    top_ml_companies = companies_df.nlargest(100, "machine_learning_jobs")
+    # Companies with the most machine_learning_jobs, top 100
+    top_ml_companies = top_companies("machine_learning_jobs", 100)
 
-    # Create figure with optimal size for 100 companies
-    fig, ax = plt.subplots(1, 1, figsize=(16, 24))
+    # 100 bars fit in 18 inches at 8 pt labels; 300 DPI keeps the PNG a quarter of the old 16x24 in at 600 DPI
+    fig, ax = plt.subplots(1, 1, figsize=(12, 18))
 
     # Create a gradient color map for visual appeal
     colors = plt.cm.plasma(np.linspace(0.2, 0.9, 100))
@@ -66,15 +80,7 @@ def create_top_ml_companies_plot():
 
     # Add value labels on bars
     max_jobs = max(ml_jobs)
-    for i, (bar, count) in enumerate(zip(bars, ml_jobs)):
-        ax.text(
-            bar.get_width() + max_jobs * 0.005,
-            bar.get_y() + bar.get_height() / 2,
-            f"{count:,}",
-            va="center",
-            fontsize=7,
-            fontweight="bold",
-        )
+    label_bars(ax, bars, [f"{count:,}" for count in ml_jobs], padding=2, fontsize=7, fontweight="bold")
 
     # Invert y-axis so #1 company is on top
     ax.invert_yaxis()
@@ -90,15 +96,16 @@ def create_top_ml_companies_plot():
     plt.subplots_adjust(left=0.25, right=0.95, top=0.95, bottom=0.05)
 
     # Save with high DPI
-    plt.savefig("report/figures/top_100_ml_companies.png", dpi=600, bbox_inches="tight", facecolor="white", edgecolor="none")
+    plt.savefig(FIGURES_DIR / "top_100_ml_companies.png", dpi=figure_dpi(300), bbox_inches="tight", facecolor="white", edgecolor="none")
     plt.close()
 
 
+@figure_target(inputs=["companies"], outputs=["top_50_all_jobs_companies.png"])
 def create_top_50_all_jobs_plot():
     """Create visualization for top 50 companies hiring across all job types"""
     
-    # Sort companies by total_jobs and take top 50
-    top_50_companies = companies_df.nlargest(50, "total_jobs")
+    # Companies with the most total_jobs, top 50
+    top_50_companies = top_companies("total_jobs", 50)
 
     # Define job categories and their colors
     job_categories = [
@@ -141,8 +148,8 @@ def create_top_50_all_jobs_plot():
     total_jobs = top_50_companies["total_jobs"].tolist()
     max_total = max(total_jobs)
 
-    for i, total in enumerate(total_jobs):
-        ax.text(total + max_total * 0.01, i, f"{total:,}", va="center", fontsize=9, fontweight="bold")
+    # The last stacked segment ends at the company total
+    label_bars(ax, bars[-1], [f"{total:,}" for total in total_jobs], padding=4, fontsize=9, fontweight="bold")
 
     # Invert y-axis so top company is on top
     ax.invert_yaxis()
@@ -161,15 +168,16 @@ def create_top_50_all_jobs_plot():
     plt.subplots_adjust(left=0.25, right=0.95, top=0.95, bottom=0.05)
 
     # Save with high DPI
-    plt.savefig("report/figures/top_50_all_jobs_companies.png", dpi=600, bbox_inches="tight", facecolor="white", edgecolor="none")
+    plt.savefig(FIGURES_DIR / "top_50_all_jobs_companies.png", dpi=figure_dpi(600), bbox_inches="tight", facecolor="white", edgecolor="none")
     plt.close()
 
 
+@figure_target(inputs=["companies"], outputs=["ml_companies_analysis.png"])
 def create_ml_jobs_distribution_plot():
     """Create ML jobs distribution analysis with top 20 detailed view and histogram"""
     
-    # Sort companies by machine_learning_jobs and take top 100
-    top_ml_companies = companies_df.nlargest(100, "machine_learning_jobs")
+    # Companies with the most machine_learning_jobs, top 100
+    top_ml_companies = top_companies("machine_learning_jobs", 100)
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
 
@@ -186,15 +194,8 @@ def create_ml_jobs_distribution_plot():
     ax1.grid(axis="x", alpha=0.3, linestyle="--")
 
     # Add value labels for top 20
-    for bar, count in zip(bars1, top_20["machine_learning_jobs"]):
-        ax1.text(
-            bar.get_width() + max(top_20["machine_learning_jobs"]) * 0.01,
-            bar.get_y() + bar.get_height() / 2,
-            f"{count:,}",
-            va="center",
-            fontsize=9,
-            fontweight="bold",
-        )
+    label_bars(ax1, bars1, [f"{count:,}" for count in top_20["machine_learning_jobs"]], padding=3,
+               fontsize=9, fontweight="bold")
 
     # Plot 2: Distribution histogram
     ax2.hist(top_ml_companies["machine_learning_jobs"], bins=20, color="skyblue", alpha=0.7, edgecolor="black")
@@ -204,12 +205,16 @@ def create_ml_jobs_distribution_plot():
     ax2.grid(axis="y", alpha=0.3, linestyle="--")
 
     plt.tight_layout()
-    plt.savefig("report/figures/ml_companies_analysis.png", dpi=600, bbox_inches="tight", facecolor="white", edgecolor="none")
+    plt.savefig(FIGURES_DIR / "ml_companies_analysis.png", dpi=figure_dpi(600), bbox_inches="tight", facecolor="white", edgecolor="none")
     plt.close()
 
 
 # Execute all visualizations
 if __name__ == "__main__":
+    # Create figures/ directory if it doesn't exist
+    os.makedirs(FIGURES_DIR, exist_ok=True)
+    set_plot_style()
+
     create_top_ml_companies_plot()
     create_top_50_all_jobs_plot()
     create_ml_jobs_distribution_plot()
\ No newline at end of file
@@ -7,9 +7,9 @@ This script creates basic exploratory visualizations from job market data:
 3. Jobs per website (vertical bar chart, top 100)
 
 Input files: 
-- query_results/jobs_per_year.csv
-- query_results/jobs_per_country.csv
-- query_results/jobs_per_website.csv
+- query_results/jobs_per_year.arrow (or .csv)
+- query_results/jobs_per_country.arrow (or .csv)
+- query_results/jobs_per_website.arrow (or .csv)
 
 Output: PNG files in report/figures/ directory
 """
@@ -21,41 +21,43 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 
-# Add parent directory to path and set working directory
+# Add parent directory to path so python_visualization can be imported
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
-os.chdir(PROJECT_ROOT)
 
-# Set high DPI and clean theme
-plt.rcParams["figure.dpi"] = 600
-plt.rcParams["savefig.dpi"] = 600
-plt.rcParams["axes.grid"] = True
-plt.rcParams["grid.alpha"] = 0.3
-plt.rcParams["axes.facecolor"] = "white"
-plt.rcParams["figure.facecolor"] = "white"
-plt.rcParams["figure.figsize"] = (12, 8)
+from python_visualization.figure_build import FIGURES_DIR, figure_target
+from python_visualization.render_profile import figure_dpi, label_bars
+from python_visualization.results import read_result
 
-# Create figures directory if it doesn't exist
-os.makedirs("report/figures", exist_ok=True)
 
+def set_plot_style():
+    """Apply the plot style shared by every figure in this script"""
+    # Set high DPI and clean theme
+    plt.rcParams["figure.dpi"] = figure_dpi(600)
+    plt.rcParams["savefig.dpi"] = figure_dpi(600)
+    plt.rcParams["axes.grid"] = True
+    plt.rcParams["grid.alpha"] = 0.3
+    plt.rcParams["axes.facecolor"] = "white"
+    plt.rcParams["figure.facecolor"] = "white"
+    plt.rcParams["figure.figsize"] = (12, 8)
 
-def load_csv_without_headers(filename, col1_name, col2_name):
-    """Load CSV without headers and assign column names"""
+
+def load_counts(name, col1_name, col2_name):
+    """Load a (label, count) query result with typed columns and assign column names"""
     try:
-        df = pd.read_csv(filename, header=None, names=[col1_name, col2_name])
-        
-        # Convert the count column to numeric, handling any non-numeric values
-        df.iloc[:, 1] = pd.to_numeric(df.iloc[:, 1], errors="coerce")
-        
-        # Remove rows with NaN values and convert to int
-        df = df.dropna()
-        df.iloc[:, 1] = df.iloc[:, 1].astype(int)
-        
-        return df
+        df = read_result(name)
     except FileNotFoundError:
         return None
-    except Exception as e:
-        return None
+    df.columns = [col1_name, col2_name]
+
+    # Remove rows without a label (e.g. postings without a country)
+    df = df.dropna().astype({col2_name: int})
+
+    # EXTRACT(YEAR ...) is numeric, so years arrive as floats from the Arrow file
+    if pd.api.types.is_float_dtype(df[col1_name]):
+        df[col1_name] = df[col1_name].astype(int)
+
+    return df
 
 
 def create_pie_chart(df, title, filename):
@@ -74,7 +76,7 @@ def create_pie_chart(df, title, filename):
     plt.axis("equal")
     plt.tight_layout()
     
-    plt.savefig(f"report/figures/{filename}", dpi=300, bbox_inches="tight", format="png")
+    plt.savefig(FIGURES_DIR / filename, dpi=figure_dpi(300), bbox_inches="tight", format="png")
     plt.close()
 
 
@@ -96,18 +98,10 @@ def create_horizontal_bar_plot(df, title, filename, limit=100):
     plt.title(title, fontsize=16, fontweight="bold", pad=20)
 
     # Add value labels on bars
-    max_value = df_subset.iloc[:, 1].max()
-    for i, bar in enumerate(bars):
-        plt.text(
-            bar.get_width() + max_value * 0.01,
-            bar.get_y() + bar.get_height() / 2,
-            f"{int(df_subset.iloc[i, 1])}",
-            va="center",
-            fontsize=8,
-        )
+    label_bars(plt.gca(), bars, df_subset.iloc[:, 1].astype(int).astype(str), padding=3, fontsize=8)
 
     plt.tight_layout()
-    plt.savefig(f"report/figures/{filename}", dpi=300, bbox_inches="tight", format="png")
+    plt.savefig(FIGURES_DIR / filename, dpi=figure_dpi(300), bbox_inches="tight", format="png")
     plt.close()
 
 
@@ -132,41 +126,47 @@ def create_vertical_bar_plot(df, title, filename, limit=100):
     plt.xticks(range(len(df_subset)), df_subset.iloc[:, 0], rotation=90, ha="right", fontsize=8)
 
     # Add value labels on top of bars
-    max_value = df_subset.iloc[:, 1].max()
-    for i, bar in enumerate(bars):
-        plt.text(
-            bar.get_x() + bar.get_width() / 2,
-            bar.get_height() + max_value * 0.01,
-            f"{int(df_subset.iloc[i, 1])}",
-            ha="center",
-            va="bottom",
-            fontsize=8,
-            rotation=90,
-        )
+    label_bars(plt.gca(), bars, df_subset.iloc[:, 1].astype(int).astype(str), padding=3, fontsize=8, rotation=90)
 
     plt.tight_layout()
-    plt.savefig(f"report/figures/{filename}", dpi=300, bbox_inches="tight", format="png")
+    plt.savefig(FIGURES_DIR / filename, dpi=figure_dpi(300), bbox_inches="tight", format="png")
     plt.close()
 
 
-def main():
-    """Main function to create all visualizations"""
-    
-    # Load the CSV files
-    jobs_per_year = load_csv_without_headers("query_results/jobs_per_year.csv", "Year", "Count")
-    jobs_per_country = load_csv_without_headers("query_results/jobs_per_country.csv", "Country", "Count")
-    jobs_per_website = load_csv_without_headers("query_results/jobs_per_website.csv", "Website", "Count")
-
-    # Create visualizations
+@figure_target(inputs=["jobs_per_year"], outputs=["jobs_per_year_pie.png"])
+def create_jobs_per_year_plot():
+    """Create the jobs per year pie chart"""
+    jobs_per_year = load_counts("jobs_per_year", "Year", "Count")
     if jobs_per_year is not None:
         create_pie_chart(jobs_per_year, "Jobs Distribution by Year", "jobs_per_year_pie.png")
 
+
+@figure_target(inputs=["jobs_per_country"], outputs=["jobs_per_country_bar.png"])
+def create_jobs_per_country_plot():
+    """Create the jobs per country bar chart"""
+    jobs_per_country = load_counts("jobs_per_country", "Country", "Count")
     if jobs_per_country is not None:
         create_horizontal_bar_plot(jobs_per_country, "Jobs per Country (Top 100)", "jobs_per_country_bar.png", 100)
 
+
+@figure_target(inputs=["jobs_per_website"], outputs=["jobs_per_website_bar.png"])
+def create_jobs_per_website_plot():
+    """Create the jobs per website bar chart"""
+    jobs_per_website = load_counts("jobs_per_website", "Website", "Count")
     if jobs_per_website is not None:
         create_vertical_bar_plot(jobs_per_website, "Jobs per Website (Top 100)", "jobs_per_website_bar.png", 100)
 
 
+def main():
+    """Main function to create all visualizations"""
+    # Create figures directory if it doesn't exist
+    os.makedirs(FIGURES_DIR, exist_ok=True)
+    set_plot_style()
+
+    create_jobs_per_year_plot()
+    create_jobs_per_country_plot()
+    create_jobs_per_website_plot()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
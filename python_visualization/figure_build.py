@@ -0,0 +1,135 @@
+"""
+Figure Build Graph
+
+Records which query results (query_results/<name>.csv or .arrow) feed which
+report/figures/*.png files and decides which figures need to be redrawn. Every
+figure function in the plotting scripts is tagged with
+@figure_target(inputs=[...], outputs=[...]).
+
+A figure is stale when one of its outputs is missing, the content of one of its
+inputs changed, the code that draws it changed (the function itself, its
+script's set_plot_style() and every function of python_visualization and
+python_pipeline they call, directly or through other helpers) or it was last
+rendered with another rendering profile (see render_profile.py).
+
+Build state: .cache/figure_build.json
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from pathlib import Path
+
+from python_visualization.render_profile import current_profile
+from python_visualization.results import result_path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+# The benchmark suite points the figures at a scratch directory
+FIGURES_DIR = Path(os.environ.get("FIGURE_OUTPUT_DIR", PROJECT_ROOT / "report" / "figures"))
+BUILD_STATE_PATH = PROJECT_ROOT / ".cache" / "figure_build.json"
+
+# Packages whose functions count as figure code; a figure script run directly is __main__
+CODE_PACKAGES = ("python_visualization", "python_pipeline", "__main__")
+
+
+def figure_target(inputs, outputs):
+    """Tag a figure function with the query results it reads and the figures it writes"""
+
+    def decorator(func):
+        func.figure_inputs = list(inputs)
+        func.figure_outputs = list(outputs)
+        return func
+
+    return decorator
+
+
+def file_hash(path):
+    """SHA-256 of a file's content, None when it does not exist"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def in_code_packages(value):
+    """Whether a function or module belongs to one of CODE_PACKAGES"""
+    module = value.__name__ if inspect.ismodule(value) else value.__module__
+    return (module or "").split(".")[0] in CODE_PACKAGES
+
+
+def project_function(value):
+    """The plain function behind value (unwrapping lru_cache and the like) if it is project code, else None"""
+    if callable(value):
+        value = inspect.unwrap(value)
+    return value if inspect.isfunction(value) and in_code_packages(value) else None
+
+
+def referenced_functions(func, seen=None):
+    """{module.qualname: function} of the project functions reachable from func through global lookups"""
+    seen = {} if seen is None else seen
+    namespace = func.__globals__
+    codes = [func.__code__]
+    while codes:
+        code = codes.pop()
+        # Nested functions, lambdas and comprehensions have their own code objects
+        codes.extend(const for const in code.co_consts if inspect.iscode(const))
+        for name in code.co_names:
+            value = namespace.get(name)
+            # Imported helpers are followed through their own module's globals; a project
+            # module used as module.function contributes the attributes the code names
+            values = [value]
+            if inspect.ismodule(value) and in_code_packages(value):
+                values = [getattr(value, attribute, None) for attribute in code.co_names]
+            for target in filter(None, map(project_function, values)):
+                key = f"{target.__module__}.{target.__qualname__}"
+                if key not in seen:
+                    seen[key] = target
+                    referenced_functions(target, seen)
+    return seen
+
+
+def code_hash(func):
+    """Hash of the source of func, its script's set_plot_style() and the project functions they call"""
+    functions = {}
+    for root in (func, func.__globals__.get("set_plot_style")):
+        if inspect.isfunction(root):
+            functions[f"{root.__module__}.{root.__qualname__}"] = root
+            referenced_functions(root, functions)
+    digest = hashlib.sha256()
+    for key in sorted(functions):
+        digest.update(key.encode("utf-8"))
+        digest.update(inspect.getsource(functions[key]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def figure_fingerprint(func):
+    """Current input hashes, code hash and rendering profile of one figure function"""
+    return {
+        "inputs": {name: file_hash(result_path(name)) for name in func.figure_inputs},
+        "code": code_hash(func),
+        "profile": current_profile(),
+    }
+
+
+def load_build_state(path=BUILD_STATE_PATH):
+    """Return {figure: fingerprint} recorded by the last successful renders"""
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_build_state(state, path=BUILD_STATE_PATH):
+    """Persist the build state"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(state, indent=2, sort_keys=True) + "\n")
+
+
+def is_stale(key, func, state, fingerprint=None):
+    """Whether the figure registered under key has to be rendered again"""
+    if not all((FIGURES_DIR / name).exists() for name in func.figure_outputs):
+        return True
+    return state.get(key) != (fingerprint or figure_fingerprint(func))
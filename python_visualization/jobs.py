@@ -8,55 +8,63 @@ This script creates comprehensive visualizations for job market analysis includi
 4. Benefits and requirements analysis
 5. Executive summary table
 
-Input: query_results/job_analysis.csv
+Input: query_results/job_analysis.arrow (or .csv)
 Output: PNG files in report/figures/ directory
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
-# Add parent directory to path and set working directory
+# Add parent directory to path so python_visualization can be imported
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
-os.chdir(PROJECT_ROOT)
 
-# Create figures directory if it doesn't exist
-os.makedirs("report/figures", exist_ok=True)
+from python_visualization.figure_build import FIGURES_DIR, figure_target
+from python_visualization.render_profile import draw_table, figure_dpi, label_bars
+from python_visualization.results import read_result
 
-# Set high DPI for all figures
-plt.rcParams["figure.dpi"] = 600
-plt.rcParams["savefig.dpi"] = 600
 
-# Load and preprocess data
-df = pd.read_csv("query_results/job_analysis.csv")
+def set_plot_style():
+    """Apply the plot style shared by every figure in this script"""
+    # Set high DPI for all figures
+    plt.rcParams["figure.dpi"] = figure_dpi(600)
+    plt.rcParams["savefig.dpi"] = figure_dpi(600)
 
-# Data preprocessing
-df["degree_percentage"] = (df["degree"] / df["total_jobs"]) * 100
-df["health_percentage"] = (df["health_insurance"] / df["total_jobs"]) * 100
-df["remote_percentage"] = (df["remote"] / df["total_jobs"]) * 100
-df["salary_k"] = df["average_salary"] / 1000
-df["short_title"] = df["job_title"].str.replace(r"Senior |Machine Learning |Business ", "", regex=True).str[:12]
+    # Set style for better-looking plots
+    plt.style.use("seaborn-v0_8")
+    sns.set_palette("husl")
 
-# Create sorted versions for different metrics
-df_by_jobs = df.sort_values("total_jobs", ascending=True)
-df_by_salary = df.sort_values("average_salary", ascending=False)
-df_by_degree = df.sort_values("degree_percentage", ascending=False)
-df_by_remote = df.sort_values("remote_percentage", ascending=False)
-df_by_health = df.sort_values("health_percentage", ascending=False)
 
-# Set style for better-looking plots
-plt.style.use("seaborn-v0_8")
-sns.set_palette("husl")
+@lru_cache(maxsize=None)
+def load_job_analysis():
+    """Load and preprocess the job analysis data on first use"""
+    df = read_result("job_analysis")
 
+    # Data preprocessing
+    df["degree_percentage"] = (df["degree"] / df["total_jobs"]) * 100
+    df["health_percentage"] = (df["health_insurance"] / df["total_jobs"]) * 100
+    df["remote_percentage"] = (df["remote"] / df["total_jobs"]) * 100
+    df["salary_k"] = df["average_salary"] / 1000
+    df["short_title"] = df["job_title"].str.replace(r"Senior |Machine Learning |Business ", "", regex=True).str[:12]
+    return df
 
+
+JOB_ANALYSIS = ["job_analysis"]
+
+
+@figure_target(inputs=JOB_ANALYSIS, outputs=["job_market_dashboard.png"])
 def create_main_dashboard():
     """Create comprehensive 6-panel dashboard"""
     
+    df = load_job_analysis()
+    df_by_salary = df.sort_values("average_salary", ascending=False)
+    df_by_degree = df.sort_values("degree_percentage", ascending=False)
+
     fig, axes = plt.subplots(2, 3, figsize=(18, 12))
     fig.suptitle("Job Market Analysis Dashboard", fontsize=16, fontweight="bold")
 
@@ -118,13 +126,15 @@ def create_main_dashboard():
     axes[1, 2].legend()
 
     plt.tight_layout()
-    plt.savefig("report/figures/job_market_dashboard.png", dpi=300, bbox_inches="tight")
+    plt.savefig(FIGURES_DIR / "job_market_dashboard.png", dpi=figure_dpi(300), bbox_inches="tight")
     plt.close()
 
 
+@figure_target(inputs=JOB_ANALYSIS, outputs=["salary_comparison.png"])
 def create_salary_comparison():
     """Create detailed salary comparison chart"""
     
+    df = load_job_analysis()
     plt.figure(figsize=(12, 8))
     df_salary_sorted = df.sort_values("average_salary", ascending=True)
     colors_salary = plt.cm.viridis(np.linspace(0, 1, len(df_salary_sorted)))
@@ -134,18 +144,19 @@ def create_salary_comparison():
     plt.ylabel("Job Role")
 
     # Add value labels on bars
-    for i, (bar, value) in enumerate(zip(bars, df_salary_sorted["salary_k"])):
-        plt.text(value + 2, bar.get_y() + bar.get_height() / 2, f"${value:.0f}K", 
-                va="center", fontweight="bold")
+    label_bars(plt.gca(), bars, [f"${value:.0f}K" for value in df_salary_sorted["salary_k"]], padding=4,
+               fontweight="bold")
 
     plt.tight_layout()
-    plt.savefig("report/figures/salary_comparison.png", dpi=300, bbox_inches="tight")
+    plt.savefig(FIGURES_DIR / "salary_comparison.png", dpi=figure_dpi(300), bbox_inches="tight")
     plt.close()
 
 
+@figure_target(inputs=JOB_ANALYSIS, outputs=["job_volume.png"])
 def create_job_volume_chart():
     """Create job volume analysis chart"""
     
+    df = load_job_analysis()
     plt.figure(figsize=(14, 8))
     df_volume_sorted = df.sort_values("total_jobs", ascending=False)
     colors_volume = plt.cm.Blues(np.linspace(0.4, 1, len(df_volume_sorted)))
@@ -156,18 +167,19 @@ def create_job_volume_chart():
     plt.xticks(rotation=45, ha="right")
 
     # Add value labels on bars
-    for bar, value in zip(bars, df_volume_sorted["total_jobs"]):
-        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 3000, 
-                f"{value:,}", ha="center", va="bottom", fontweight="bold")
+    label_bars(plt.gca(), bars, [f"{value:,}" for value in df_volume_sorted["total_jobs"]], padding=4,
+               fontweight="bold")
 
     plt.tight_layout()
-    plt.savefig("report/figures/job_volume.png", dpi=300, bbox_inches="tight")
+    plt.savefig(FIGURES_DIR / "job_volume.png", dpi=figure_dpi(300), bbox_inches="tight")
     plt.close()
 
 
+@figure_target(inputs=JOB_ANALYSIS, outputs=["benefits_requirements_analysis.png"])
 def create_benefits_requirements_analysis():
     """Create comprehensive benefits and requirements analysis"""
     
+    df = load_job_analysis()
     fig, axes = plt.subplots(3, 1, figsize=(14, 14))
 
     # Health Insurance Coverage
@@ -197,13 +209,16 @@ def create_benefits_requirements_analysis():
     axes[2].tick_params(axis="x", rotation=45)
 
     plt.tight_layout()
-    plt.savefig("report/figures/benefits_requirements_analysis.png", dpi=300, bbox_inches="tight")
+    plt.savefig(FIGURES_DIR / "benefits_requirements_analysis.png", dpi=figure_dpi(300), bbox_inches="tight")
     plt.close()
 
 
+@figure_target(inputs=JOB_ANALYSIS, outputs=["executive_summary.png"])
 def create_executive_summary():
     """Create executive summary table visualization"""
     
+    df_by_salary = load_job_analysis().sort_values("average_salary", ascending=False)
+
     fig, ax = plt.subplots(figsize=(14, 10))
 
     # Create comprehensive overview table
@@ -212,7 +227,7 @@ def create_executive_summary():
         summary_data.append([
             row["job_title"],
             f"{row['total_jobs']:,}",
-            f"${row['average_salary']:,}",
+            f"${row['average_salary']:,.0f}",
             f"{row['degree_percentage']:.0f}%",
             f"{row['remote_percentage']:.1f}%",
             f"{row['health_percentage']:.1f}%",
@@ -220,37 +235,26 @@ def create_executive_summary():
 
     columns = ["Role", "Jobs Available", "Avg Salary", "Degree Req", "Remote Rate", "Health Coverage"]
 
-    # Create table visualization
-    table = ax.table(cellText=summary_data, colLabels=columns, cellLoc="center", 
-                    loc="center", colColours=["lightblue"] * 6)
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1.2, 2)
-
-    # Style the table
-    for i in range(len(columns)):
-        table[(0, i)].set_facecolor("#4472C4")
-        table[(0, i)].set_text_props(weight="bold", color="white")
-
-    # Alternate row colors
-    for i in range(1, len(summary_data) + 1):
-        for j in range(len(columns)):
-            if i % 2 == 0:
-                table[(i, j)].set_facecolor("#F2F2F2")
-            else:
-                table[(i, j)].set_facecolor("white")
+    # Alternate row colors; every cell is drawn in one pass instead of one Cell artist each
+    row_colors = np.where(np.arange(len(summary_data)) % 2 == 1, "#F2F2F2", "white")
+    cell_colors = np.repeat(row_colors[:, None], len(columns), axis=1)
+    draw_table(ax, summary_data, columns, cell_colors, header_color="#4472C4", fontsize=10)
 
     ax.set_title("Job Market Executive Summary\n(Ranked by Average Salary)", 
                 fontsize=16, fontweight="bold", pad=20)
     ax.axis("off")
 
     plt.tight_layout()
-    plt.savefig("report/figures/executive_summary.png", dpi=300, bbox_inches="tight")
+    plt.savefig(FIGURES_DIR / "executive_summary.png", dpi=figure_dpi(300), bbox_inches="tight")
     plt.close()
 
 
 # Execute all visualizations
 if __name__ == "__main__":
+    # Create figures directory if it doesn't exist
+    os.makedirs(FIGURES_DIR, exist_ok=True)
+    set_plot_style()
+
     create_main_dashboard()
     create_salary_comparison()
     create_job_volume_chart()
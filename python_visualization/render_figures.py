@@ -0,0 +1,130 @@
+"""
+Figure Rendering Script
+
+This script incrementally regenerates the figures in report/figures/ in parallel:
+1. Discovers the figure functions (tagged with @figure_target) in companies.py,
+   exploration.py, jobs.py and skills.py; importing them draws nothing
+2. Skips every figure whose outputs exist and whose input CSVs and drawing code
+   are unchanged since its last render (see figure_build.py)
+3. Renders the stale ones in a process pool with the Agg backend, each figure
+   starting from matplotlib's defaults plus its own script's set_plot_style()
+   and the selected rendering profile (draft or publication, see render_profile.py)
+4. Records the fingerprint of every rendered figure and prints its render time
+
+Output: PNG files in report/figures/ directory, build state in .cache/figure_build.json
+Usage: python python_visualization/render_figures.py [figure ...] [--workers N] [--profile draft] [--force] [--list]
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import matplotlib
+
+# Select the non-interactive backend before any script imports pyplot
+matplotlib.use("Agg")
+
+# Add parent directory to path so python_visualization can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from python_visualization.figure_build import (
+    FIGURES_DIR,
+    figure_fingerprint,
+    is_stale,
+    load_build_state,
+    save_build_state,
+)
+from python_visualization.render_profile import DEFAULT_PROFILE, PROFILES
+
+FIGURE_MODULES = ["companies", "exploration", "jobs", "skills"]
+
+
+def discover_figures(modules=FIGURE_MODULES):
+    """Return {"module.function": function} for every function tagged with @figure_target"""
+    figures = {}
+    for module_name in modules:
+        module = importlib.import_module(f"python_visualization.{module_name}")
+        for name, func in vars(module).items():
+            if callable(func) and hasattr(func, "figure_outputs"):
+                figures[f"{module_name}.{name}"] = func
+    return figures
+
+
+def render_figure(module_name, function_name):
+    """Render one figure in the current (worker) process and return its timing"""
+    import matplotlib.pyplot as plt
+
+    module = importlib.import_module(f"python_visualization.{module_name}")
+    start = time.perf_counter()
+
+    # Workers render figures of different scripts, so every figure gets its own rcParams
+    with plt.rc_context():
+        matplotlib.rcdefaults()
+        module.set_plot_style()
+        getattr(module, function_name)()
+    plt.close("all")
+
+    return f"{module_name}.{function_name}", time.perf_counter() - start, os.getpid()
+
+
+def render_figures(names=None, workers=None, force=False):
+    """Render the selected stale figures (all of them by default) and return {figure: seconds}"""
+    figures = discover_figures()
+    unknown = [name for name in names or [] if name not in figures]
+    if unknown:
+        raise KeyError(f"Unknown figures: {', '.join(unknown)} (available: {', '.join(figures)})")
+    selected = names or list(figures)
+
+    # Fingerprints are taken before rendering so an input rewritten mid-build is picked up next time
+    state = load_build_state()
+    fingerprints = {name: figure_fingerprint(figures[name]) for name in selected}
+    stale = [name for name in selected if force or is_stale(name, figures[name], state, fingerprints[name])]
+    if not stale:
+        return {}
+
+    os.makedirs(FIGURES_DIR, exist_ok=True)
+    timings = {}
+    with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(stale))) as pool:
+        futures = [pool.submit(render_figure, *name.split(".")) for name in stale]
+        for future in as_completed(futures):
+            figure, seconds, pid = future.result()
+            timings[figure] = seconds
+            state[figure] = fingerprints[figure]
+            save_build_state(state)
+            print(f"{figure:<55} {seconds:8.2f}s  (pid {pid})")
+    return timings
+
+
+def main():
+    """Main function to render the figures in parallel"""
+    parser = argparse.ArgumentParser(description="Render the report figures in a process pool")
+    parser.add_argument("figures", nargs="*", help="figures to render, e.g. jobs.create_main_dashboard (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--profile", default=None, choices=list(PROFILES),
+                        help=f"rendering profile (default: $FIGURE_PROFILE or {DEFAULT_PROFILE})")
+    parser.add_argument("--force", action="store_true", help="render the figures even when they are up to date")
+    parser.add_argument("--list", action="store_true", help="list the discovered figures and exit")
+    args = parser.parse_args()
+
+    # Worker processes inherit the environment, so the profile reaches every figure
+    if args.profile:
+        os.environ["FIGURE_PROFILE"] = args.profile
+
+    if args.list:
+        print("\n".join(discover_figures()))
+        return
+
+    start = time.perf_counter()
+    timings = render_figures(args.figures, args.workers, args.force)
+    print(f"Rendered {len(timings)} figures in {time.perf_counter() - start:.2f}s")
+    if not timings:
+        print("All figures are up to date (use --force to render them anyway)")
+
+
+if __name__ == "__main__":
+    main()
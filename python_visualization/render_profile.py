@@ -0,0 +1,128 @@
+"""
+Rendering Profiles
+
+Two rendering tiers shared by every plotting script:
+- publication: the DPI each figure asks for and every value label (default)
+- draft: 100 DPI and no per-bar value labels, for quick iterations on a chart
+
+Select the tier with the FIGURE_PROFILE environment variable or with
+render_figures.py --profile.
+
+Annotations are drawn in batches: label_bars() turns the value labels of a
+whole bar container into one PathCollection of glyph outlines, and
+draw_table() draws every cell background in one PolyCollection and the cell
+texts in one PathCollection per style, instead of one Text (and one Rectangle)
+artist per bar or cell.
+
+Usage: FIGURE_PROFILE=draft python python_visualization/jobs.py
+"""
+
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import PathCollection, PolyCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D
+
+PROFILES = {
+    "draft": {"dpi": 100, "labels": False},
+    "publication": {"dpi": None, "labels": True},
+}
+DEFAULT_PROFILE = "publication"
+
+
+def current_profile():
+    """Name of the rendering profile selected by $FIGURE_PROFILE"""
+    name = os.environ.get("FIGURE_PROFILE", DEFAULT_PROFILE)
+    if name not in PROFILES:
+        raise KeyError(f"Unknown rendering profile '{name}' (available: {', '.join(PROFILES)})")
+    return name
+
+
+def figure_dpi(dpi):
+    """DPI to render with: the figure's own DPI in publication, the profile's DPI otherwise"""
+    return PROFILES[current_profile()]["dpi"] or dpi
+
+
+def text_collection(ax, xy, labels, transform=None, ha="center", va="center", offsets=(0, 0), fontsize=None,
+                    fontweight="normal", color="black", rotation=0):
+    """One artist drawing every label at its xy point, shifted by offsets points, aligned by ha/va (one or per label)"""
+    prop = FontProperties(size=fontsize or plt.rcParams["font.size"], weight=fontweight)
+    offsets = np.broadcast_to(np.asarray(offsets, dtype=float), (len(xy), 2))
+    ha, va = np.broadcast_to(ha, len(xy)), np.broadcast_to(va, len(xy))
+    paths = []
+    for label, (dx, dy), ha, va in zip(labels, offsets, ha, va):
+        path = TextPath((0, 0), str(label), prop=prop).transformed(Affine2D().rotate_deg(rotation))
+        box = path.get_extents()
+        shift_x = {"left": -box.x0, "center": -(box.x0 + box.x1) / 2, "right": -box.x1}[ha]
+        shift_y = {"bottom": -box.y0, "center": -(box.y0 + box.y1) / 2, "top": -box.y1}[va]
+        paths.append(path.transformed(Affine2D().translate(shift_x + dx, shift_y + dy)))
+
+    # Glyph outlines are in points, placed at their data (or axes) point by the offset transform
+    collection = PathCollection(
+        paths,
+        offsets=np.asarray(xy, dtype=float),
+        offset_transform=transform or ax.transData,
+        transform=Affine2D().scale(1 / 72) + ax.figure.dpi_scale_trans,
+        facecolors=color,
+        edgecolors="none",
+    )
+    ax.add_collection(collection, autolim=False)
+    # Like bar_label() annotations, labels past the end of the longest bar stay visible
+    collection.set_clip_on(False)
+    return collection
+
+
+def label_bars(ax, bars, labels, padding=0, **kwargs):
+    """Label every bar of a container with one batched artist, skipped by the draft profile"""
+    if not PROFILES[current_profile()]["labels"]:
+        return None
+    patches = bars.patches
+    values = np.asarray(bars.datavalues, dtype=float)
+    x = np.array([patch.get_x() for patch in patches])
+    y = np.array([patch.get_y() for patch in patches])
+    width = np.array([patch.get_width() for patch in patches])
+    height = np.array([patch.get_height() for patch in patches])
+
+    # Labels sit past the end of each bar, on the side its value points to
+    if bars.orientation == "vertical":
+        outward = np.where(values < 0, -1, 1) * (-1 if ax.yaxis_inverted() else 1)
+        xy = np.column_stack([x + width / 2, y + height])
+        offsets = np.column_stack([np.zeros(len(values)), outward * padding])
+        return text_collection(ax, xy, labels, va=np.where(outward > 0, "bottom", "top"), offsets=offsets, **kwargs)
+    outward = np.where(values < 0, -1, 1) * (-1 if ax.xaxis_inverted() else 1)
+    xy = np.column_stack([x + width, y + height / 2])
+    offsets = np.column_stack([outward * padding, np.zeros(len(values))])
+    return text_collection(ax, xy, labels, ha=np.where(outward > 0, "left", "right"), offsets=offsets, **kwargs)
+
+
+def draw_table(ax, cell_text, columns, cell_colors, header_color, fontsize=10, row_height=0.07):
+    """Draw a table centred in ax in one pass: one collection for the cell backgrounds, one per text style"""
+    cell_text = np.asarray(cell_text, dtype=object)
+    rows = len(cell_text) + 1
+    # Columns as wide as their longest text, rows of equal height, in axes coordinates
+    chars = np.array([max(len(str(value)) for value in [column, *cell_text[:, i]])
+                      for i, column in enumerate(columns)], dtype=float) + 4
+    widths = chars / chars.sum()
+    left = np.r_[0, np.cumsum(widths)[:-1]]
+    top = 0.5 + rows * row_height / 2 - np.arange(rows) * row_height
+
+    col_left, row_top = np.meshgrid(left, top)
+    col_width = np.broadcast_to(widths, col_left.shape)
+    corners = np.stack([
+        np.stack([col_left, row_top - row_height], axis=-1),
+        np.stack([col_left + col_width, row_top - row_height], axis=-1),
+        np.stack([col_left + col_width, row_top], axis=-1),
+        np.stack([col_left, row_top], axis=-1),
+    ], axis=2).reshape(-1, 4, 2)
+    colors = np.vstack([np.full((1, len(columns)), header_color, dtype=object),
+                        np.asarray(cell_colors, dtype=object)]).ravel()
+    ax.add_collection(PolyCollection(corners, facecolors=list(colors), edgecolors="black", linewidths=0.5,
+                                     transform=ax.transAxes))
+
+    centers = np.stack([col_left + col_width / 2, row_top - row_height / 2], axis=-1)
+    text_collection(ax, centers[0], columns, transform=ax.transAxes, fontsize=fontsize, fontweight="bold",
+                    color="white")
+    text_collection(ax, centers[1:].reshape(-1, 2), cell_text.ravel(), transform=ax.transAxes, fontsize=fontsize)
@@ -0,0 +1,40 @@
+"""
+Query Result Access
+
+Loads query results for the plotting scripts. When run_queries.py --arrow has
+written a typed Arrow IPC file (query_results/<name>.arrow), it is memory-mapped
+and its columns are used in place: no text is parsed and numeric columns are
+handed to pandas without a copy. Otherwise the CSV is parsed as before.
+"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# The benchmark suite points the figures at another scale's results
+RESULTS_DIR = Path(os.environ.get("FIGURE_RESULTS_DIR", PROJECT_ROOT / "query_results"))
+
+
+def result_path(name):
+    """File a result is read from: its Arrow file when there is one, its CSV otherwise"""
+    arrow_path = RESULTS_DIR / f"{name}.arrow"
+    return arrow_path if arrow_path.exists() else RESULTS_DIR / f"{name}.csv"
+
+
+def read_arrow(path, columns=None):
+    """Memory-map an Arrow IPC file and return its table (the buffers stay backed by the file)"""
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    return table.select(columns) if columns else table
+
+
+def read_result(name, columns=None):
+    """Load one query result as a DataFrame, from its Arrow file when available"""
+    path = result_path(name)
+    if path.suffix == ".arrow":
+        # split_blocks keeps every column in its own block, so numeric columns are not consolidated (copied)
+        return read_arrow(path, columns).to_pandas(split_blocks=True)
+    return pd.read_csv(path, usecols=columns)
@@ -6,13 +6,12 @@ This script creates visualizations for skills analysis across different job titl
 2. Skill categories distribution per job title (grouped by skill types)
 
 Input files:
-- query_results/skill.csv (individual skills data)
-- query_results/skill_type.csv (skill categories data)
+- query_results/skill.arrow or .csv (individual skills data)
+- query_results/skill_type.arrow or .csv (skill categories data)
 
 Output: PNG files in report/figures/ directory
 """
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
@@ -20,138 +19,130 @@ import os
 import sys
 from pathlib import Path
 
-# Set high DPI for all figures
-plt.rcParams["figure.dpi"] = 600
-plt.rcParams["savefig.dpi"] = 600
+# Add parent directory to path so python_visualization can be imported
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
 
+from python_pipeline.ranking import top_k_matrix
+from python_visualization.figure_build import FIGURES_DIR, figure_target
+from python_visualization.render_profile import figure_dpi, label_bars
+from python_visualization.results import read_result
 
-def main():
-    """Main function to create skills visualizations"""
-    
-    # Add parent directory to path and set working directory
-    PROJECT_ROOT = Path(__file__).parent.parent
-    sys.path.insert(0, str(PROJECT_ROOT))
-    os.chdir(PROJECT_ROOT)
 
-    # Create report/figures/ directory if it doesn't exist
-    os.makedirs("report/figures/", exist_ok=True)
+def set_plot_style():
+    """Apply the plot style shared by every figure in this script"""
+    # Set high DPI for all figures
+    plt.rcParams["figure.dpi"] = figure_dpi(600)
+    plt.rcParams["savefig.dpi"] = figure_dpi(600)
 
     # Set style for better-looking plots
     plt.style.use("default")
     sns.set_palette("husl")
 
-    # Read the data
-    skills_df = pd.read_csv("query_results/skill.csv")
-    skill_types_df = pd.read_csv("query_results/skill_type.csv")
-
-    def create_individual_skills_plot():
-        """Create visualization for top 10 individual skills per job title"""
-
-        job_titles = skills_df["job_title"].tolist()
-        n_jobs = len(job_titles)
-
-        # Calculate figure size based on number of job titles
-        fig_height = max(6, n_jobs * 4)
-        fig, axes = plt.subplots(n_jobs, 1, figsize=(14, fig_height))
-
-        # Handle single job title case
-        if n_jobs == 1:
-            axes = [axes]
-
-        colors = plt.cm.Set3(np.linspace(0, 1, 10))  # Colors for top 10 skills
-
-        for idx, job_title in enumerate(job_titles):
-            job_row = skills_df[skills_df["job_title"] == job_title].iloc[0]
-            skill_columns = [col for col in skills_df.columns if col != "job_title"]
-            skill_values = [
-                (col.replace("_count", "").replace("_", " ").title(), job_row[col])
-                for col in skill_columns
-            ]
-            skill_values.sort(key=lambda x: x[1], reverse=True)
-            top_10 = skill_values[:10]
-            skill_names = [item[0] for item in top_10]
-            skill_counts = [item[1] for item in top_10]
-
-            bars = axes[idx].barh(range(len(skill_names)), skill_counts, color=colors)
-            axes[idx].set_yticks(range(len(skill_names)))
-            axes[idx].set_yticklabels(skill_names, fontsize=10)
-            axes[idx].set_xlabel("Count", fontsize=11, fontweight="bold")
-            axes[idx].set_title(f"Top 10 Skills for {job_title}", fontsize=12, fontweight="bold", pad=15)
-
-            # Add value labels on bars
-            for i, (bar, count) in enumerate(zip(bars, skill_counts)):
-                axes[idx].text(
-                    bar.get_width() + max(skill_counts) * 0.01,
-                    bar.get_y() + bar.get_height() / 2,
-                    f"{count:,}",
-                    va="center",
-                    fontsize=9,
-                    fontweight="bold",
-                )
-
-            axes[idx].invert_yaxis()
-            axes[idx].grid(axis="x", alpha=0.3, linestyle="--")
-            axes[idx].set_axisbelow(True)
-            axes[idx].set_xlim(0, max(skill_counts) * 1.15)
-
-        plt.tight_layout()
-        plt.savefig("report/figures/top_10_individual_skills.png", dpi=600, bbox_inches="tight", 
-                   facecolor="white", edgecolor="none")
-        plt.close()
-
-    def create_skill_types_plot():
-        """Create visualization for all skill types per job title"""
-
-        job_titles = skill_types_df["job_title"].tolist()
-        n_jobs = len(job_titles)
-
-        fig_height = max(6, n_jobs * 3.5)
-        fig, axes = plt.subplots(n_jobs, 1, figsize=(12, fig_height))
-
-        if n_jobs == 1:
-            axes = [axes]
-
-        skill_type_colors = plt.cm.Set2(np.linspace(0, 1, 10))
-
-        for idx, job_title in enumerate(job_titles):
-            job_row = skill_types_df[skill_types_df["job_title"] == job_title].iloc[0]
-            type_columns = [col for col in skill_types_df.columns if col != "job_title"]
-            type_values = [
-                (col.replace("_count", "").replace("_", " ").title(), job_row[col])
-                for col in type_columns
-            ]
-            type_values.sort(key=lambda x: x[1], reverse=True)
-            type_names = [item[0] for item in type_values]
-            type_counts = [item[1] for item in type_values]
-
-            bars = axes[idx].barh(range(len(type_names)), type_counts, 
-                                color=skill_type_colors[:len(type_names)])
-            axes[idx].set_yticks(range(len(type_names)))
-            axes[idx].set_yticklabels(type_names, fontsize=11)
-            axes[idx].set_xlabel("Count", fontsize=12, fontweight="bold")
-            axes[idx].set_title(f"Skill Categories Distribution for {job_title}", 
-                              fontsize=13, fontweight="bold", pad=15)
-
-            # Add value labels on bars
-            for i, (bar, count) in enumerate(zip(bars, type_counts)):
-                axes[idx].text(
-                    bar.get_width() + max(type_counts) * 0.01,
-                    bar.get_y() + bar.get_height() / 2,
-                    f"{count:,}",
-                    va="center",
-                    fontsize=10,
-                    fontweight="bold",
-                )
-
-            axes[idx].invert_yaxis()
-            axes[idx].grid(axis="x", alpha=0.3, linestyle="--")
-            axes[idx].set_axisbelow(True)
-            axes[idx].set_xlim(0, max(type_counts) * 1.12)
-
-        plt.tight_layout()
-        plt.savefig("report/figures/skill_types_distribution.png", dpi=600, bbox_inches="tight", 
-                   facecolor="white", edgecolor="none")
-        plt.close()
+
+@figure_target(inputs=["skill"], outputs=["top_10_individual_skills.png"])
+def create_individual_skills_plot():
+    """Create visualization for top 10 individual skills per job title"""
+
+    skills_df = read_result("skill")
+    job_titles = skills_df["job_title"].tolist()
+    n_jobs = len(job_titles)
+
+    # Calculate figure size based on number of job titles
+    fig_height = max(6, n_jobs * 4)
+    fig, axes = plt.subplots(n_jobs, 1, figsize=(14, fig_height))
+
+    # Handle single job title case
+    if n_jobs == 1:
+        axes = [axes]
+
+    colors = plt.cm.Set3(np.linspace(0, 1, 10))  # Colors for top 10 skills
+
+    # Read the job title x skill matrix once and select the top 10 of every row at once, highest count first
+    skill_columns = skills_df.columns.drop("job_title")
+    skill_labels = np.array([col.replace("_count", "").replace("_", " ").title() for col in skill_columns])
+    top_10_idx, top_10_counts = top_k_matrix(skills_df[skill_columns].to_numpy(), 10)
+
+    for idx, job_title in enumerate(job_titles):
+        skill_names = skill_labels[top_10_idx[idx]].tolist()
+        skill_counts = top_10_counts[idx].tolist()
+
+        bars = axes[idx].barh(range(len(skill_names)), skill_counts, color=colors)
+        axes[idx].set_yticks(range(len(skill_names)))
+        axes[idx].set_yticklabels(skill_names, fontsize=10)
+        axes[idx].set_xlabel("Count", fontsize=11, fontweight="bold")
+        axes[idx].set_title(f"Top 10 Skills for {job_title}", fontsize=12, fontweight="bold", pad=15)
+
+        # Add value labels on bars
+        label_bars(axes[idx], bars, [f"{count:,}" for count in skill_counts], padding=3, fontsize=9,
+                   fontweight="bold")
+
+        axes[idx].invert_yaxis()
+        axes[idx].grid(axis="x", alpha=0.3, linestyle="--")
+        axes[idx].set_axisbelow(True)
+        axes[idx].set_xlim(0, max(skill_counts) * 1.15)
+
+    plt.tight_layout()
+    plt.savefig(FIGURES_DIR / "top_10_individual_skills.png", dpi=figure_dpi(600), bbox_inches="tight", 
+                facecolor="white", edgecolor="none")
+    plt.close()
+
+
+@figure_target(inputs=["skill_type"], outputs=["skill_types_distribution.png"])
+def create_skill_types_plot():
+    """Create visualization for all skill types per job title"""
+
+    skill_types_df = read_result("skill_type")
+    job_titles = skill_types_df["job_title"].tolist()
+    n_jobs = len(job_titles)
+
+    fig_height = max(6, n_jobs * 3.5)
+    fig, axes = plt.subplots(n_jobs, 1, figsize=(12, fig_height))
+
+    if n_jobs == 1:
+        axes = [axes]
+
+    skill_type_colors = plt.cm.Set2(np.linspace(0, 1, 10))
+
+    # Rank the skill types of every job title at once, highest count first
+    type_columns = skill_types_df.columns.drop("job_title")
+    type_labels = np.array([col.replace("_count", "").replace("_", " ").title() for col in type_columns])
+    type_idx, type_matrix = top_k_matrix(skill_types_df[type_columns].to_numpy(), len(type_columns))
+
+    for idx, job_title in enumerate(job_titles):
+        type_names = type_labels[type_idx[idx]].tolist()
+        type_counts = type_matrix[idx].tolist()
+
+        bars = axes[idx].barh(range(len(type_names)), type_counts, 
+                            color=skill_type_colors[:len(type_names)])
+        axes[idx].set_yticks(range(len(type_names)))
+        axes[idx].set_yticklabels(type_names, fontsize=11)
+        axes[idx].set_xlabel("Count", fontsize=12, fontweight="bold")
+        axes[idx].set_title(f"Skill Categories Distribution for {job_title}", 
+                          fontsize=13, fontweight="bold", pad=15)
+
+        # Add value labels on bars
+        label_bars(axes[idx], bars, [f"{count:,}" for count in type_counts], padding=3, fontsize=10,
+                   fontweight="bold")
+
+        axes[idx].invert_yaxis()
+        axes[idx].grid(axis="x", alpha=0.3, linestyle="--")
+        axes[idx].set_axisbelow(True)
+        axes[idx].set_xlim(0, max(type_counts) * 1.12)
+
+    plt.tight_layout()
+    plt.savefig(FIGURES_DIR / "skill_types_distribution.png", dpi=figure_dpi(600), bbox_inches="tight", 
+                facecolor="white", edgecolor="none")
+    plt.close()
+
+
+def main():
+    """Main function to create skills visualizations"""
+
+    # Create report/figures/ directory if it doesn't exist
+    os.makedirs(FIGURES_DIR, exist_ok=True)
+
+    set_plot_style()
 
     # Create both visualizations
     create_individual_skills_plot()
@@ -159,4 +150,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -11,31 +11,48 @@ SELECT DISTINCT job_title_short FROM job_postings_fact;
 -- ONLY 729 NOW 
 SELECT 
     comp.name,
-    COUNT(job.job_id) AS job_count
-FROM job_postings_fact AS job
-INNER JOIN company_dim AS comp ON job.company_id = comp.company_id
-GROUP BY comp.name
-HAVING COUNT(job.job_id) >=100
-ORDER BY job_count DESC;
+    counts.job_count
+FROM (
+    SELECT company_id, COUNT(*) AS job_count
+    FROM job_postings_fact
+    GROUP BY company_id
+    HAVING COUNT(*) >= 100
+) AS counts
+INNER JOIN company_dim AS comp ON counts.company_id = comp.company_id
+ORDER BY counts.job_count DESC;
 
 -- now we need to get the number of jobs specialization per company
+-- Every job title maps to one category at load time (job_title_category, data/sql_load/4_job_categories.sql),
+-- so the category counts are read from company_cube, the postings per company and job title, joined to that
+-- mapping instead of scanning the fact table.
+-- Category ids: 1 analyst, 2 scientist, 3 machine_learning, 4 cloud, 5 software, 6 other_engineer
 
 
+-- name: companies
+WITH company_counts AS (
+    SELECT
+        cube.company_id,
+        SUM(cube.postings)::bigint AS total_jobs,
+        COALESCE(SUM(cube.postings) FILTER (WHERE map.job_category_id = 1), 0)::bigint AS analyst_jobs,
+        COALESCE(SUM(cube.postings) FILTER (WHERE map.job_category_id = 2), 0)::bigint AS scientist_jobs,
+        COALESCE(SUM(cube.postings) FILTER (WHERE map.job_category_id = 3), 0)::bigint AS machine_learning_jobs,
+        COALESCE(SUM(cube.postings) FILTER (WHERE map.job_category_id = 4), 0)::bigint AS cloud_jobs,
+        COALESCE(SUM(cube.postings) FILTER (WHERE map.job_category_id = 5), 0)::bigint AS software_jobs,
+        COALESCE(SUM(cube.postings) FILTER (WHERE map.job_category_id = 6), 0)::bigint AS other_engineer_jobs
+    FROM company_cube AS cube
+    LEFT JOIN job_title_category AS map ON map.job_title_short = cube.job_title_short
+    GROUP BY cube.company_id
+    HAVING SUM(cube.postings) >= 100
+)
 SELECT 
     comp.name,
-    COUNT(job.job_id) AS total_jobs,
-    SUM(CASE WHEN job.job_title_short ILIKE '%analyst%' THEN 1 ELSE 0 END) AS analyst_jobs,
-    SUM(CASE WHEN job.job_title_short ILIKE '%scientist%' THEN 1 ELSE 0 END) AS scientist_jobs,
-    SUM(CASE WHEN job.job_title_short ILIKE '%machine%' THEN 1 ELSE 0 END) AS machine_learning_jobs,
-    SUM(CASE WHEN job.job_title_short ILIKE '%cloud%' THEN 1 ELSE 0 END) AS cloud_jobs,
-    SUM(CASE WHEN job.job_title_short ILIKE '%software%' THEN 1 ELSE 0 END) AS software_jobs,
-    SUM(CASE WHEN job.job_title_short ILIKE '%engineer%' AND 
-             job.job_title_short NOT ILIKE '%machine%' AND 
-             job.job_title_short NOT ILIKE '%software%' AND 
-             job.job_title_short NOT ILIKE '%cloud%' THEN 1 ELSE 0 END) AS other_engineer_jobs
-
-FROM job_postings_fact AS job
-INNER JOIN company_dim AS comp ON job.company_id = comp.company_id
-GROUP BY comp.name
-HAVING COUNT(job.job_id) >= 100
-ORDER BY total_jobs DESC;
+    counts.total_jobs,
+    counts.analyst_jobs,
+    counts.scientist_jobs,
+    counts.machine_learning_jobs,
+    counts.cloud_jobs,
+    counts.software_jobs,
+    counts.other_engineer_jobs
+FROM company_counts AS counts
+INNER JOIN company_dim AS comp ON counts.company_id = comp.company_id
+ORDER BY counts.total_jobs DESC;
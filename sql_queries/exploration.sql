@@ -4,47 +4,54 @@
     - Time Range: Specifies the period during which this data was collected.
     - Country Distribution: Lists all countries included in the dataset and the number of jobs per country.
     - Source Websites: Identifies the websites from which the data was gathered and provides the job count per website.
+
+    Every count here is read from posting_cube (data/sql_load/5_incremental.sql), which holds the postings rolled up
+    by month, title, country, source website and remote flag and is kept current by the loader and ingest_delta.py,
+    so no query scans job_postings_fact.
 */
 
 
 
 -- Time Range  and jobs per year 
 
-SELECT COUNT(*) AS total_jobs FROM job_postings_fact;
+SELECT SUM(postings)::bigint AS total_jobs FROM posting_cube;
 
 --- count the salary available across all jobs 
 
-SELECT COUNT(*) AS salary_year_avg FROM job_postings_fact
-WHERE salary_year_avg IS NOT NULL;
+SELECT SUM(salary_year_count)::bigint AS salary_year_avg FROM posting_cube;
 
+-- name: jobs_per_year
 SELECT 
      EXTRACT(
         YEAR
-        FROM job_posted_date
+        FROM posting_month
     ) AS year ,
-    COUNT(*) AS job_count
-FROM job_postings_fact
+    SUM(postings)::bigint AS job_count
+FROM posting_cube
 GROUP BY EXTRACT(
         YEAR
-        FROM job_posted_date
+        FROM posting_month
     );
 
 -- Country Distribution and jobs per country
  
+-- name: jobs_per_country
 SELECT 
     job_country ,
-    COUNT(*) AS job_count
-FROM job_postings_fact
+    SUM(postings)::bigint AS job_count
+FROM posting_cube
 GROUP BY job_country
 ORDER BY job_count DESC ;
 
 
 -- Source Websites and jobs per source website
 
+-- name: jobs_per_website
 SELECT 
-    SPLIT_PART(job_via, ' ', 2) AS source_website,
-    COUNT(*) AS job_count
-FROM job_postings_fact
-GROUP BY SPLIT_PART(job_via, ' ', 2)
-HAVING COUNT(*) > 100
+    source.source_name AS source_website,
+    SUM(cube.postings)::bigint AS job_count
+FROM posting_cube AS cube
+    LEFT JOIN source_dim AS source ON source.source_id = cube.source_id
+GROUP BY source.source_id, source.source_name
+HAVING SUM(cube.postings) > 100
 ORDER BY job_count DESC;
\ No newline at end of file
@@ -8,49 +8,27 @@
     - Distribution of remote vs onsite jobs per job title
 
     The results are grouped by job title and sorted by the total number of job offerings in descending order.
+    python_pipeline/job_metrics.py builds the same query for other groupings (country, source website, year, ...)
+    and extra metrics such as salary percentiles, hourly-salary coverage and schedule types.
 */
 
-WITH JobData AS (
-    SELECT
-        job_title_short AS job_title,
-        COUNT(*) AS job_count,
-        ROUND(AVG(salary_year_avg), 0) AS average_salary,
-        SUM(CASE WHEN job_no_degree_mention IS TRUE THEN 1 ELSE 0 END) AS no_degree,
-        SUM(CASE WHEN job_no_degree_mention IS FALSE THEN 1 ELSE 0 END) AS degree,
-        SUM(CASE WHEN job_health_insurance IS TRUE THEN 1 ELSE 0 END) AS health_insurance,
-        SUM(CASE WHEN job_health_insurance IS FALSE THEN 1 ELSE 0 END) AS no_health_insurance
-
-    FROM 
-        job_postings_fact
-    -- WHERE 
-    --     job_title LIKE '%data%' 
-    --     OR job_title LIKE '%machine learning%' 
-    --     OR job_title LIKE '%artificial intelligence%' 
-    --     OR job_title LIKE '%computer vision%'
-    GROUP BY job_title_short
-), 
-Remote AS (
-    SELECT
-        job_title_short AS job_title,
-        SUM(CASE WHEN job_work_from_home IS TRUE THEN 1 ELSE 0 END) AS remote_jobs,
-        SUM(CASE WHEN job_work_from_home IS FALSE THEN 1 ELSE 0 END) AS non_remote_jobs
-    FROM 
-        job_postings_fact
-    GROUP BY 
-        job_title_short 
-)
-SELECT 
-    JobData.job_title AS job_title,
-    JobData.job_count AS total_jobs,
-    JobData.no_degree AS no_degree,
-    JobData.degree AS degree,
-    JobData.health_insurance AS health_insurance,
-    JobData.no_health_insurance AS no_health_insurance,
-    JobData.average_salary AS average_salary,
-    Remote.remote_jobs AS remote,
-    Remote.non_remote_jobs AS onsite 
+-- name: job_analysis
+-- posting_cube already holds the degree, health insurance and salary tallies per title (and month, country,
+-- source and remote flag), so this sums a few thousand cube rows instead of scanning the fact table.
+-- The average salary is the summed salaries over the postings that have one, exactly AVG(salary_year_avg).
+SELECT
+    job_title_short AS job_title,
+    SUM(postings)::bigint AS total_jobs,
+    SUM(no_degree)::bigint AS no_degree,
+    SUM(degree)::bigint AS degree,
+    SUM(health_insurance)::bigint AS health_insurance,
+    SUM(no_health_insurance)::bigint AS no_health_insurance,
+    ROUND(SUM(salary_year_sum) / NULLIF(SUM(salary_year_count), 0), 0) AS average_salary,
+    COALESCE(SUM(postings) FILTER (WHERE job_work_from_home IS TRUE), 0)::bigint AS remote,
+    COALESCE(SUM(postings) FILTER (WHERE job_work_from_home IS FALSE), 0)::bigint AS onsite
 FROM 
-    JobData 
-    INNER JOIN Remote ON JobData.job_title = Remote.job_title 
+    posting_cube
+GROUP BY 
+    job_title_short
 ORDER BY 
-    JobData.job_count DESC;
+    total_jobs DESC;